@@ -10,6 +10,8 @@ try:
     from .reminder_system import ReminderSystem
     from .voice_assistant import VoiceAssistant
     from .database_handler import DatabaseHandler
+    from .interaction_checker import InteractionChecker
+    from .medicine_catalog import MedicineCatalog
 except ImportError as e:
     # Handle relative import issues
     import sys
@@ -21,13 +23,17 @@ except ImportError as e:
     from reminder_system import ReminderSystem
     from voice_assistant import VoiceAssistant
     from database_handler import DatabaseHandler
+    from interaction_checker import InteractionChecker
+    from medicine_catalog import MedicineCatalog
 
 __all__ = [
     'OCRProcessor',
     'MedicineExtractor', 
     'ReminderSystem',
     'VoiceAssistant',
-    'DatabaseHandler'
+    'DatabaseHandler',
+    'InteractionChecker',
+    'MedicineCatalog'
 ]
 
 __version__ = "1.0.0"
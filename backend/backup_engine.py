@@ -0,0 +1,367 @@
+"""
+Backup Engine Module for MediScan
+Incremental, compressed, content-addressed snapshots of the data directory
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import logging
+
+try:
+    from .file_lock import get_file_lock
+except ImportError:
+    from file_lock import get_file_lock
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CHUNK_DIR = "chunks"
+MANIFEST_DIR = "manifests"
+MANIFEST_SUFFIX = ".json.gz"
+
+# Compression name -> chunk file extension
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+MANIFEST_VERSION = 1
+
+# Average records per chunk from chunk_records
+CHUNK_RECORDS = 256
+
+
+def chunk_bytes(payload: Any) -> bytes:
+    """Canonical serialization of a chunk payload (stable for hashing)"""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def chunk_records(records: Iterable[Dict], key: str = 'id', average: int = CHUNK_RECORDS) -> Iterator[List[Dict]]:
+    """
+    Group records into content-defined chunks
+
+    Records are ordered by key and a chunk ends after every record whose
+    key hashes to 0 modulo average. Boundaries depend only on the keys, so
+    adding, changing or removing a record changes only the chunk holding
+    it, and a snapshot writes one chunk per change instead of one file
+    per record.
+
+    Args:
+        records: Records to group
+        key: Field ordering records and anchoring chunk boundaries
+        average: Average number of records per chunk
+
+    Yields:
+        Lists of records
+    """
+    chunk: List[Dict] = []
+    for record in sorted(records, key=lambda item: str(item.get(key, ''))):
+        chunk.append(record)
+        digest = hashlib.blake2b(str(record.get(key, '')).encode('utf-8'), digest_size=8).digest()
+        if int.from_bytes(digest, 'big') % average == 0:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BackupEngine:
+    """
+    Incremental backups built from content-addressed chunks
+
+    A snapshot is a manifest listing, per section, the SHA-256 of each of
+    its chunks; chunk payloads are stored once under chunks/ab/<hash>,
+    compressed with gzip (or zstd when the zstandard package is
+    installed). A chunk that already exists is never rewritten, so a
+    snapshot writes only what changed since any kept snapshot, plus its
+    manifest; chunks the latest snapshot references are not even looked
+    up on disk. Chunks are compressed and decompressed as streams, and a
+    restore reads a snapshot one chunk at a time.
+
+    prune() keeps the newest snapshots and deletes chunks no remaining
+    manifest references. Snapshots may be taken concurrently (also from
+    several processes); pruning excludes them through a file lock on the
+    backup directory.
+    """
+
+    def __init__(self, backup_dir: str, compression: str = "gzip", keep_last: Optional[int] = 14,
+                 sync_chunks: bool = False):
+        """
+        Initialize the backup engine
+
+        Args:
+            backup_dir: Directory holding chunks and manifests
+            compression: 'gzip' or 'zstd' (falls back to gzip without zstandard)
+            keep_last: Snapshots kept by prune() (None keeps all)
+            sync_chunks: fsync every chunk, not just manifests (slow for
+                the first snapshot of a large data set)
+        """
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Unknown backup compression: {compression}")
+        if compression == 'zstd' and not ZSTD_AVAILABLE:
+            logger.warning("zstandard not installed; backups use gzip")
+            compression = 'gzip'
+
+        self.backup_dir = backup_dir
+        self.compression = compression
+        self.keep_last = keep_last
+        self.sync_chunks = sync_chunks
+        self.chunk_dir = os.path.join(backup_dir, CHUNK_DIR)
+        self.manifest_dir = os.path.join(backup_dir, MANIFEST_DIR)
+
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        self._file_lock = get_file_lock(backup_dir)
+        self._lock = threading.Lock()
+
+    # Chunk files
+
+    def _chunk_path(self, digest: str, compression: Optional[str] = None) -> str:
+        """Path of a chunk file"""
+        extension = COMPRESSION_EXTENSIONS[compression or self.compression]
+        return os.path.join(self.chunk_dir, digest[:2], digest + extension)
+
+    def _find_chunk(self, digest: str) -> Optional[str]:
+        """Existing chunk file for a digest in any compression"""
+        for compression in (self.compression,) + tuple(c for c in COMPRESSION_EXTENSIONS if c != self.compression):
+            path = self._chunk_path(digest, compression)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _open_reader(self, path: str):
+        """Decompressing stream over a file, codec chosen by extension"""
+        if path.endswith(COMPRESSION_EXTENSIONS['zstd']):
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError(f"zstandard is required to read {path}")
+            return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return gzip.open(path, 'rb')
+
+    def _write_compressed(self, path: str, data: bytes, sync: bool = True):
+        """Compress data into path atomically, codec chosen by extension"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".chunk.", suffix=".tmp", dir=directory)
+
+        try:
+            with os.fdopen(fd, 'wb') as raw:
+                if path.endswith(COMPRESSION_EXTENSIONS['zstd']):
+                    with zstandard.ZstdCompressor().stream_writer(raw, closefd=False) as stream:
+                        stream.write(data)
+                else:
+                    with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as stream:
+                        stream.write(data)
+                if sync:
+                    raw.flush()
+                    os.fsync(raw.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _read_chunk(self, digest: str) -> Any:
+        """Decompress and parse one chunk"""
+        path = self._find_chunk(digest)
+        if path is None:
+            raise FileNotFoundError(f"Backup chunk missing: {digest}")
+        with self._open_reader(path) as stream:
+            return json.loads(stream.read())
+
+    # Snapshots
+
+    def _manifest_path(self, snapshot_id: str) -> str:
+        """Path of a snapshot manifest"""
+        return os.path.join(self.manifest_dir, snapshot_id + MANIFEST_SUFFIX)
+
+    def create_snapshot(self, sections: Dict[str, Iterable[Any]], metadata: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Take a snapshot
+
+        Args:
+            sections: Section name -> iterable of chunk payloads (any
+                JSON-serializable values; one chunk each)
+            metadata: Extra fields stored in the manifest
+
+        Returns:
+            Manifest summary with id, timestamp and write statistics
+        """
+        start = time.perf_counter()
+        stats = {'chunks': 0, 'chunks_written': 0, 'bytes_written': 0}
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'id': datetime.now().strftime('%Y%m%dT%H%M%S%f'),
+            'timestamp': datetime.now().isoformat(),
+            'compression': self.compression,
+            'sections': {}
+        }
+        manifest.update(metadata or {})
+
+        with self._file_lock.shared():
+            # Pruning is excluded while the shared lock is held, so chunks
+            # of the latest snapshot stay on disk
+            latest = self.latest_snapshot()
+            try:
+                known = self._referenced([latest]) if latest else set()
+            except Exception as e:
+                logger.error(f"Error reading backup manifest {latest}: {e}")
+                known = set()
+
+            for name, payloads in sections.items():
+                digests = []
+                for payload in payloads:
+                    data = chunk_bytes(payload)
+                    digest = hashlib.sha256(data).hexdigest()
+                    digests.append(digest)
+                    stats['chunks'] += 1
+
+                    if digest not in known and self._find_chunk(digest) is None:
+                        path = self._chunk_path(digest)
+                        self._write_compressed(path, data, sync=self.sync_chunks)
+                        stats['chunks_written'] += 1
+                        stats['bytes_written'] += os.path.getsize(path)
+                    known.add(digest)
+                manifest['sections'][name] = digests
+
+            stats['seconds'] = round(time.perf_counter() - start, 3)
+            manifest['stats'] = stats
+            self._write_compressed(self._manifest_path(manifest['id']), json.dumps(manifest).encode('utf-8'))
+
+        logger.info(f"Backup snapshot {manifest['id']}: {stats['chunks_written']}/{stats['chunks']} "
+                    f"chunks written, {stats['bytes_written']} bytes")
+        return {key: value for key, value in manifest.items() if key != 'sections'}
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        """
+        Summaries of all snapshots
+
+        Returns:
+            List of manifest summaries (without chunk lists), oldest first
+        """
+        snapshots = []
+        for snapshot_id in self._snapshot_ids():
+            try:
+                manifest = self.load_manifest(snapshot_id)
+                snapshots.append({key: value for key, value in manifest.items() if key != 'sections'})
+            except Exception as e:
+                logger.error(f"Error reading backup manifest {snapshot_id}: {e}")
+        return snapshots
+
+    def _snapshot_ids(self) -> List[str]:
+        """Sorted snapshot ids (ids sort chronologically)"""
+        return sorted(
+            name[:-len(MANIFEST_SUFFIX)] for name in os.listdir(self.manifest_dir)
+            if name.endswith(MANIFEST_SUFFIX)
+        )
+
+    def has_snapshot(self, snapshot_id: str) -> bool:
+        """True if a snapshot with this id exists"""
+        return bool(snapshot_id) and os.path.exists(self._manifest_path(os.path.basename(snapshot_id)))
+
+    def latest_snapshot(self) -> Optional[str]:
+        """Id of the newest snapshot, or None"""
+        ids = self._snapshot_ids()
+        return ids[-1] if ids else None
+
+    def load_manifest(self, snapshot_id: str) -> Dict[str, Any]:
+        """Full manifest of a snapshot"""
+        with self._open_reader(self._manifest_path(snapshot_id)) as stream:
+            return json.loads(stream.read())
+
+    def iter_section(self, snapshot_id: str, section: str) -> Iterator[Any]:
+        """
+        Stream a section of a snapshot, one chunk payload at a time
+
+        Args:
+            snapshot_id: Snapshot to read
+            section: Section name
+
+        Yields:
+            Chunk payloads in snapshot order
+        """
+        manifest = self.load_manifest(snapshot_id)
+        for digest in manifest['sections'].get(section, []):
+            yield self._read_chunk(digest)
+
+    def sections(self, snapshot_id: str) -> List[str]:
+        """Section names stored in a snapshot"""
+        return list(self.load_manifest(snapshot_id)['sections'])
+
+    def missing_chunks(self, snapshot_id: str) -> List[str]:
+        """Digests of a snapshot's chunks that are not on disk"""
+        return [digest for digest in sorted(self._referenced([snapshot_id])) if self._find_chunk(digest) is None]
+
+    def _referenced(self, snapshot_ids: Iterable[str]) -> set:
+        """Digests of every chunk the given snapshots reference"""
+        referenced = set()
+        for snapshot_id in snapshot_ids:
+            for digests in self.load_manifest(snapshot_id)['sections'].values():
+                referenced.update(digests)
+        return referenced
+
+    def prune(self, keep_last: Optional[int] = None) -> Dict[str, int]:
+        """
+        Delete old snapshots and chunks no kept snapshot references
+
+        Args:
+            keep_last: Snapshots to keep (defaults to self.keep_last)
+
+        Returns:
+            Dictionary with counts of removed snapshots and chunks
+        """
+        keep_last = self.keep_last if keep_last is None else keep_last
+        removed = {'snapshots': 0, 'chunks': 0}
+        if keep_last is None:
+            return removed
+
+        with self._lock, self._file_lock.exclusive():
+            ids = self._snapshot_ids()
+            cut = max(0, len(ids) - keep_last)
+            expired, kept = ids[:cut], ids[cut:]
+            if not expired:
+                return removed
+
+            referenced = self._referenced(kept)
+
+            for snapshot_id in expired:
+                os.remove(self._manifest_path(snapshot_id))
+                removed['snapshots'] += 1
+
+            for fan_out in os.listdir(self.chunk_dir):
+                fan_out_dir = os.path.join(self.chunk_dir, fan_out)
+                if not os.path.isdir(fan_out_dir):
+                    continue
+                for name in os.listdir(fan_out_dir):
+                    digest = name.split('.', 1)[0]
+                    if digest not in referenced and not name.startswith('.'):
+                        os.remove(os.path.join(fan_out_dir, name))
+                        removed['chunks'] += 1
+
+        if removed['snapshots']:
+            logger.info(f"Pruned {removed['snapshots']} backup snapshots and {removed['chunks']} chunks")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get backup storage statistics
+
+        Returns:
+            Dictionary with snapshot count, chunk count and bytes on disk
+        """
+        chunks = 0
+        size = 0
+        for root, _, files in os.walk(self.backup_dir):
+            for name in files:
+                size += os.path.getsize(os.path.join(root, name))
+                if root != self.manifest_dir and not name.startswith('.'):
+                    chunks += 1
+        return {'snapshots': len(self._snapshot_ids()), 'chunks': chunks, 'bytes': size}
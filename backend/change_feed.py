@@ -0,0 +1,199 @@
+"""
+Change Feed Module for MediScan
+Versioned insert/update/delete events with subscriptions and a replay buffer
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHANGE_ACTIONS = ('insert', 'update', 'delete', 'reset')
+
+# Events kept for changes_since(); older versions need a full reload
+DEFAULT_REPLAY_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """
+    One committed change
+
+    action is 'insert', 'update' or 'delete' for the listed ids, or
+    'reset' when the entity changed in bulk (restore, cleanup, another
+    process) and everything derived from it must be reloaded.
+    """
+    version: int
+    entity: str
+    action: str
+    ids: Tuple[str, ...]
+    timestamp: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Event as a plain dictionary"""
+        event = asdict(self)
+        event['ids'] = list(self.ids)
+        return event
+
+
+class ChangeFeed:
+    """
+    In-memory feed of changes to a component's data
+
+    Every published event gets the next version number, so a reader that
+    remembers the version it last saw can ask for exactly what changed
+    since (changes_since) instead of reloading everything. The last
+    replay_size events are kept; a reader that fell further behind, or
+    holds a version from another process lifetime, gets None and reloads.
+
+    Subscribers are called with each event, in version order, by
+    dispatch(). Writers publish while holding their write lock (so
+    versions follow commit order) and dispatch after releasing it, so
+    callbacks may read from or write to the component that published.
+    """
+
+    def __init__(self, replay_size: int = DEFAULT_REPLAY_SIZE):
+        """
+        Initialize the change feed
+
+        Args:
+            replay_size: Events kept for changes_since
+        """
+        self._lock = threading.Lock()
+        # Held while delivering, so subscribers see events in order;
+        # re-entrant for callbacks that write and dispatch again
+        self._dispatch_lock = threading.RLock()
+        self._version = 0
+        self._events: Deque[ChangeEvent] = deque(maxlen=max(1, replay_size))
+        self._undelivered: Deque[ChangeEvent] = deque()
+        self._subscribers: Dict[int, Tuple[Callable[[ChangeEvent], Any], Optional[frozenset]]] = {}
+        self._next_token = 1
+
+    @property
+    def version(self) -> int:
+        """Version of the latest event (0 before any change)"""
+        with self._lock:
+            return self._version
+
+    def publish(self, entity: str, action: str, ids: Iterable[str] = ()) -> Optional[ChangeEvent]:
+        """
+        Record a committed change
+
+        Args:
+            entity: What changed, e.g. 'medicine' or 'reminder'
+            action: One of CHANGE_ACTIONS
+            ids: Ids of the changed records (empty for 'reset')
+
+        Returns:
+            The event, or None if an insert/update/delete had no ids
+        """
+        if action not in CHANGE_ACTIONS:
+            raise ValueError(f"Unknown change action: {action}")
+
+        ids = tuple(ids)
+        if not ids and action != 'reset':
+            return None
+
+        with self._lock:
+            self._version += 1
+            event = ChangeEvent(self._version, entity, action, ids, datetime.now().isoformat())
+            self._events.append(event)
+            if self._subscribers:
+                self._undelivered.append(event)
+        return event
+
+    def dispatch(self):
+        """Deliver published events to subscribers, oldest first"""
+        with self._dispatch_lock:
+            while True:
+                with self._lock:
+                    if not self._undelivered:
+                        return
+                    event = self._undelivered.popleft()
+                    subscribers = list(self._subscribers.values())
+
+                for callback, entities in subscribers:
+                    if entities is not None and event.entity not in entities:
+                        continue
+                    try:
+                        callback(event)
+                    except Exception as e:
+                        logger.error(f"Error in change subscriber for {event.entity}: {e}")
+
+    def subscribe(self, callback: Callable[[ChangeEvent], Any], entities: Optional[Iterable[str]] = None) -> int:
+        """
+        Call a function for every future change
+
+        Args:
+            callback: Called with each ChangeEvent
+            entities: Only events for these entities (None for all)
+
+        Returns:
+            Token for unsubscribe
+        """
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._subscribers[token] = (callback, frozenset(entities) if entities is not None else None)
+            return token
+
+    def unsubscribe(self, token: int) -> bool:
+        """
+        Stop calling a subscriber
+
+        Args:
+            token: Token returned by subscribe
+
+        Returns:
+            True if the subscriber was removed
+        """
+        with self._lock:
+            removed = self._subscribers.pop(token, None) is not None
+            if not self._subscribers:
+                self._undelivered.clear()
+            return removed
+
+    def changes_since(self, version: int, entities: Optional[Iterable[str]] = None) -> Optional[List[ChangeEvent]]:
+        """
+        Events after a version
+
+        Args:
+            version: Version the caller last saw
+            entities: Only events for these entities (None for all)
+
+        Returns:
+            Events newer than version, oldest first (empty if nothing
+            changed), or None if they are no longer all in the replay
+            buffer and the caller must reload everything
+        """
+        wanted = frozenset(entities) if entities is not None else None
+        with self._lock:
+            if version > self._version:
+                return None
+            if version == self._version:
+                return []
+            if not self._events or self._events[0].version > version + 1:
+                return None
+            return [
+                event for event in self._events
+                if event.version > version and (wanted is None or event.entity in wanted)
+            ]
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get change feed statistics
+
+        Returns:
+            Dictionary with version, buffered events and subscribers
+        """
+        with self._lock:
+            return {
+                'version': self._version,
+                'buffered': len(self._events),
+                'oldest_version': self._events[0].version if self._events else 0,
+                'subscribers': len(self._subscribers)
+            }
@@ -3,55 +3,245 @@ Database Handler Module for MediScan
 Handles data persistence and retrieval with enhanced functionality
 """
 
+import itertools
 import json
 import os
-import sqlite3
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Any
 import logging
 import uuid
 import threading
 
+try:
+    from .similarity_index import SimilarityIndex
+    from .search_index import SearchIndex
+    from .expiry_index import ExpiryIndex
+    from .statistics_counters import MedicineCounters, ScanCounters, EXPIRING_SOON_DAYS
+    from .scan_analytics import ScanColumns, DEFAULT_PERCENTILES
+    from .medicine_store import create_store
+    from .medicine_record import Medicine, CALCULATED_FIELDS, calculated_fields
+    from .storage import atomic_write_json, get_writer
+    from .serializers import data_file, get_serializer, migrate_data_file
+    from .file_lock import get_file_lock
+    from .backup_engine import BackupEngine, chunk_records
+    from .export_engine import stream_records, write_parquet, DEFAULT_CHUNK_SIZE
+    from .change_feed import ChangeEvent, ChangeFeed
+    from .medicine_query import MedicineQuery
+    from .retention import RetentionCompactor, add_reclaim, empty_reclaim
+except ImportError:
+    from similarity_index import SimilarityIndex
+    from search_index import SearchIndex
+    from expiry_index import ExpiryIndex
+    from statistics_counters import MedicineCounters, ScanCounters, EXPIRING_SOON_DAYS
+    from scan_analytics import ScanColumns, DEFAULT_PERCENTILES
+    from medicine_store import create_store
+    from medicine_record import Medicine, CALCULATED_FIELDS, calculated_fields
+    from storage import atomic_write_json, get_writer
+    from serializers import data_file, get_serializer, migrate_data_file
+    from file_lock import get_file_lock
+    from backup_engine import BackupEngine, chunk_records
+    from export_engine import stream_records, write_parquet, DEFAULT_CHUNK_SIZE
+    from change_feed import ChangeEvent, ChangeFeed
+    from medicine_query import MedicineQuery
+    from retention import RetentionCompactor, add_reclaim, empty_reclaim
+
 logger = logging.getLogger(__name__)
 
+# In-memory read indexes kept in step with the store (name -> class with
+# rebuild/add/remove)
+READ_INDEXES = {
+    'search': SearchIndex,
+    'expiry': ExpiryIndex,
+    'stats': MedicineCounters,
+}
+
 class DatabaseHandler:
     """
     Handles database operations for MediScan
-    Uses JSON files for simplicity with option to extend to SQLite
+    Medicines and scan history live in a pluggable store (JSON files by
+    default, or SQLite); settings and users stay in JSON files
+
+    Several processes may share one data directory: writes hold an
+    exclusive file lock on it and reloads hold a shared one, and caches
+    and indexes are keyed by the store generation, so other processes'
+    writes are picked up on the next read.
+
+    Every write is published on a change feed (see ChangeFeed) with
+    entity 'medicine', 'scan', 'settings' or 'user': callers remember
+    change_version() and ask changes_since() what to refresh, or
+    subscribe() to be told. Other processes' medicine writes show up as
+    a 'medicine' reset.
     """
 
-    def __init__(self, data_dir: str = "data"):
-        """Initialize database handler"""
+    def __init__(self, data_dir: str = "data", interaction_checker=None, dedupe_policy: str = "flag",
+                 storage_backend: str = "json", scan_retention_days: Optional[int] = None,
+                 durability: str = "normal", backup_compression: str = "gzip", backup_keep: Optional[int] = 14,
+                 serializer: str = "json"):
+        """
+        Initialize database handler
+
+        Args:
+            data_dir: Directory holding the data files
+            interaction_checker: Optional InteractionChecker used to flag
+                interactions with already saved medicines on save
+            dedupe_policy: What save_medicine does with near-duplicates of
+                saved medicines: 'flag' (keep both, marking the new one
+                duplicate_of), 'merge' (fold it into the saved record) or 'off'
+            storage_backend: 'json' or 'sqlite' (existing JSON data is
+                imported into SQLite on first use)
+            scan_retention_days: Drop scan history older than this many
+                days (None keeps all history)
+            durability: 'full', 'normal' or 'deferred' (see storage.DURABILITY_LEVELS)
+            backup_compression: 'gzip' or 'zstd' for backup snapshots
+            backup_keep: Backup snapshots kept (None keeps all)
+            serializer: Format of the whole-file data files: 'json',
+                'orjson' (same files, faster) or 'msgpack' (compact binary);
+                files in another format are converted on first load
+        """
+        if dedupe_policy not in ('merge', 'flag', 'off'):
+            raise ValueError(f"Unknown dedupe policy: {dedupe_policy}")
+
         self.data_dir = data_dir
-        self.medicines_file = os.path.join(data_dir, "medicines.json")
-        self.users_file = os.path.join(data_dir, "users.json")
-        self.settings_file = os.path.join(data_dir, "settings.json")
-        self.scan_history_file = os.path.join(data_dir, "scan_history.json")
+        self.interaction_checker = interaction_checker
+        self.dedupe_policy = dedupe_policy
+        self.storage_backend = storage_backend
+        self.durability = durability
+        self.backup_compression = backup_compression
+        self.backup_keep = backup_keep
+        self.scan_retention_days = scan_retention_days
+        self._writer = get_writer(durability)
+        self.serializer = get_serializer(serializer)
+        self.medicines_file = data_file(data_dir, "medicines", self.serializer)
+        self.users_file = data_file(data_dir, "users", self.serializer)
+        self.settings_file = data_file(data_dir, "settings", self.serializer)
 
         self._lock = threading.Lock()
+        # save_medicine calls waiting to be saved together, and whether one
+        # of them is saving a batch (see save_medicine)
+        self._save_cond = threading.Condition()
+        self._save_queue: List[Dict] = []
+        self._save_leader = False
+        self._similarity_index: Optional[SimilarityIndex] = None
+        self._similarity_index_generation = None
+        # Store generations our writes left while the write lock is held
+        self._own_generations = set()
+        self._backup_engine: Optional[BackupEngine] = None
+        # Read indexes (see READ_INDEXES) and the store generation each reflects
+        self._index_lock = threading.RLock()
+        self._read_indexes: Dict[str, Any] = {}
+        self._read_index_generations: Dict[str, Any] = {}
+        # Recent scan counts, rebuilt from the store once per day
+        self._scan_counters: Optional[ScanCounters] = None
+        # Columnar scan history for analytics, rebuilt from the store once
+        # per day; its own lock, as a rebuild over a long history is slow
+        self._analytics_lock = threading.Lock()
+        self._scan_columns: Optional[ScanColumns] = None
+
+        # Medicine records, valid while the store generation is unchanged
+        # (each record caches its own expiry fields for the day)
+        self._cache_lock = threading.Lock()
+        self._medicines_cache: Optional[List[Medicine]] = None
+        self._medicines_cache_by_id: Dict[str, Medicine] = {}
+        self._medicines_cache_generation = None
+        self._medicines_cache_stats = {'hits': 0, 'misses': 0}
+
+        # Change feed, and the store generation as of our last write (a
+        # different one means another process wrote)
+        self._changes = ChangeFeed()
+        self._feed_generation = None
+
+        # Reclaims the space of expired scans off the write path; the day
+        # of the last scheduled run, for the daily retention compaction
+        self._compactor = RetentionCompactor()
+        self._compaction_day: Optional[date] = None
+        self._retention_lock = threading.Lock()
+        self._retention_stats: Dict[str, int] = {'runs': 0, 'medicines': 0, 'scans': 0, 'bytes': 0, 'partitions': 0}
 
         self._ensure_data_directory()
-        self._initialize_files()
+        self._file_lock = get_file_lock(data_dir)
+        with self._file_lock.exclusive():
+            self._initialize_files()
+            self._store = create_store(storage_backend, data_dir, scan_retention_days=scan_retention_days,
+                                       durability=durability, file_lock=self._file_lock,
+                                       serializer=self.serializer)
+            self._feed_generation = self._store.generation()
 
     def _ensure_data_directory(self):
         """Ensure data directory exists"""
         os.makedirs(self.data_dir, exist_ok=True)
         logger.info(f"Data directory ensured: {self.data_dir}")
 
+    @contextmanager
+    def _write_lock(self):
+        """
+        Hold the in-process write lock and the exclusive data directory lock
+
+        Deferred writes are flushed before the lock is released, so the
+        next process to take it reads them from disk. Caches and indexes
+        patched with our writes (see _own_generation) move on to the final
+        generation, which a flush changes. Changes published inside are
+        delivered to subscribers after the lock is released.
+        """
+        try:
+            with self._lock, self._file_lock.exclusive():
+                self._own_generations.clear()
+                self._publish_foreign_changes()
+                yield
+                if self.durability == 'deferred':
+                    self._writer.flush()
+                self._feed_generation = self._store.generation()
+                if self._own_generations:
+                    self._advance_generation(self._own_generations, self._feed_generation)
+        finally:
+            self._changes.dispatch()
+
+    def _own_generation(self) -> Any:
+        """
+        Store generation right after one of our writes (self._lock held)
+
+        Caches and indexes patched with the write are stamped with it. It
+        is noted so _write_lock can move them on to the generation the
+        write finally leaves, as a deferred write changes the file's
+        signature again when it is flushed.
+        """
+        generation = self._store.generation()
+        self._own_generations.add(generation)
+        return generation
+
+    def _advance_generation(self, own: Any, new: Any):
+        """Move caches and indexes stamped with one of the own generations to new (self._lock held)"""
+        if self._similarity_index_generation in own:
+            self._similarity_index_generation = new
+        with self._index_lock:
+            for name, generation in self._read_index_generations.items():
+                if generation in own:
+                    self._read_index_generations[name] = new
+        with self._cache_lock:
+            if self._medicines_cache_generation in own:
+                self._medicines_cache_generation = new
+
+    def _publish_foreign_changes(self):
+        """Publish a medicine reset if another process wrote since our last write (self._lock held)"""
+        generation = self._store.generation()
+        if generation != self._feed_generation:
+            self._feed_generation = generation
+            self._changes.publish('medicine', 'reset')
+
     def _initialize_files(self):
-        """Initialize data files if they don't exist"""
+        """Convert data files to the configured format and create missing ones"""
+        for stem in ("users", "settings"):
+            migrate_data_file(self.data_dir, stem, self.serializer)
+
         files_to_init = [
-            (self.medicines_file, []),
             (self.users_file, {}),
-            (self.settings_file, self._get_default_settings()),
-            (self.scan_history_file, [])
+            (self.settings_file, self._get_default_settings())
         ]
 
         for file_path, default_data in files_to_init:
             if not os.path.exists(file_path):
                 try:
-                    with open(file_path, 'w') as f:
-                        json.dump(default_data, f, indent=2)
+                    self._writer.write(file_path, default_data, serializer=self.serializer)
                     logger.info(f"Initialized {file_path}")
                 except Exception as e:
                     logger.error(f"Error creating {file_path}: {e}")
@@ -77,49 +267,382 @@ class DatabaseHandler:
         """
         Save medicine data to database
 
+        A new medicine that is a near-duplicate of a saved one (same name,
+        batch and manufacturer up to small OCR differences, and no other
+        batch or expiry date) is flagged or merged into the saved record,
+        depending on dedupe_policy.
+
+        Concurrent calls are group committed: the first caller saves every
+        medicine queued so far as one save_medicines batch (one store write
+        and one sync), and calls arriving meanwhile queue for the next.
+
         Args:
             medicine_data: Dictionary containing medicine information
 
         Returns:
             True if successful, False otherwise
         """
+        entry = {'medicine': medicine_data, 'result': None}
+        with self._save_cond:
+            self._save_queue.append(entry)
+            while entry['result'] is None:
+                if self._save_leader:
+                    self._save_cond.wait()
+                    continue
+
+                self._save_leader = True
+                batch, self._save_queue = self._save_queue, []
+                results = None
+                self._save_cond.release()
+                try:
+                    results = self.save_medicines([queued['medicine'] for queued in batch])
+                finally:
+                    self._save_cond.acquire()
+                    self._save_leader = False
+                    for queued, result in zip(batch, results or [{'success': False}] * len(batch)):
+                        queued['result'] = result
+                    self._save_cond.notify_all()
+
+        return entry['result']['success']
+
+    def save_medicines(self, medicines: List[Dict], transactional: bool = False) -> List[Dict]:
+        """
+        Save a batch of medicines with one lookup pass and one store write
+
+        Each medicine goes through the same id assignment, near-duplicate
+        handling and interaction checks as save_medicine, including against
+        earlier medicines in the same batch. Caller dictionaries are updated
+        with the id, timestamps and flags of the saved record.
+
+        Args:
+            medicines: List of medicine dictionaries
+            transactional: If True, save nothing unless every medicine can be
+                saved; otherwise skip the medicines that fail
+
+        Returns:
+            One result per input medicine, in order, with 'id', 'name',
+            'success', 'action' (saved, updated, merged or flagged) and 'error'
+        """
+        results = [
+            {'id': medicine.get('id'), 'name': medicine.get('name', 'Unknown'),
+             'success': False, 'action': None, 'error': None}
+            for medicine in medicines
+        ]
+        if not medicines:
+            return results
+
         try:
-            with self._lock:
-                # Add metadata if not present
-                if 'id' not in medicine_data:
-                    medicine_data['id'] = str(uuid.uuid4())
+            with self._write_lock():
+                # Signing records is most of a bulk save; skip it when unused
+                index = self._get_similarity_index() if self.dedupe_policy != 'off' else None
+                stored = self._cached_medicines_by_id()
+                generation = self._store.generation()
+
+                # id -> record to write, in first-seen order
+                pending: Dict[str, Dict] = {}
+                for medicine_data, result in zip(medicines, results):
+                    try:
+                        record, action = self._prepare_medicine(medicine_data, index, stored, pending)
+                    except Exception as e:
+                        result['error'] = str(e)
+                        logger.error(f"Error preparing medicine {result['name']}: {e}")
+                        if transactional:
+                            # Drop the batch's records from the similarity index
+                            self._similarity_index = None
+                            for other in results:
+                                other['action'] = None
+                                other['error'] = other['error'] or 'batch aborted'
+                            return results
+                        continue
 
-                if 'created_at' not in medicine_data:
-                    medicine_data['created_at'] = datetime.now().isoformat()
+                    pending[record['id']] = record
+                    if index is not None:
+                        index.add(record['id'], record)
+                    result.update(id=record['id'], action=action)
+
+                if pending:
+                    self._store.upsert_medicines(list(pending.values()))
+                    self._update_medicines_cache(generation, records=list(pending.values()))
+                    if index is not None:
+                        self._similarity_index_generation = self._own_generation()
+                    for record in pending.values():
+                        generation = self._update_read_indexes(generation, record=record)
+
+                    inserted = [r['id'] for r in results if r['action'] in ('saved', 'flagged')]
+                    updated = [r['id'] for r in results if r['action'] in ('updated', 'merged')]
+                    self._changes.publish('medicine', 'insert', dict.fromkeys(inserted))
+                    self._changes.publish('medicine', 'update', dict.fromkeys(updated))
+
+                for result in results:
+                    if result['action'] is not None:
+                        result['success'] = True
+                        logger.info(f"{result['action'].capitalize()} medicine: {result['name']}")
+                return results
 
-                medicine_data['updated_at'] = datetime.now().isoformat()
+        except Exception as e:
+            self._invalidate_indexes()
+            logger.error(f"Error saving medicines: {e}")
+            for result in results:
+                result['success'] = False
+                result['action'] = None
+                result['error'] = result['error'] or str(e)
+            return results
+
+    def _prepare_medicine(self, medicine_data: Dict, index: Optional[SimilarityIndex],
+                          stored: Dict[str, Medicine], pending: Dict[str, Dict]):
+        """
+        Build the record to write for one medicine of a batch
 
-                # Load existing medicines
-                medicines = self.load_medicines()
+        Args:
+            medicine_data: Caller's medicine dictionary (updated in place)
+            index: Similarity index including earlier records of the batch
+                (None when dedupe_policy is 'off')
+            stored: Cached medicines by id
+            pending: Records already prepared in this batch, by id
+
+        Returns:
+            Tuple of (record, action)
+        """
+        # Add metadata if not present
+        if 'id' not in medicine_data:
+            medicine_data['id'] = str(uuid.uuid4())
+
+        if 'created_at' not in medicine_data:
+            medicine_data['created_at'] = datetime.now().isoformat()
+
+        medicine_data['updated_at'] = datetime.now().isoformat()
+
+        def lookup(medicine_id):
+            if medicine_id in pending:
+                return pending[medicine_id]
+            if medicine_id in stored:
+                return stored[medicine_id].to_dict(calculated=False)
+            return None
+
+        # Check if medicine already exists (update if found)
+        action = 'updated' if lookup(medicine_data['id']) is not None else 'saved'
+
+        record = self._strip_calculated_fields(medicine_data)
+        if action == 'saved' and self.dedupe_policy != 'off':
+            duplicate_id = index.find_duplicate(record)
+            duplicate = lookup(duplicate_id) if duplicate_id else None
+
+            if duplicate is not None:
+                if self.dedupe_policy == 'merge':
+                    record = self._merge_medicine(duplicate, record)
+                    action = 'merged'
+                    # Point the caller's copy at the surviving record
+                    medicine_data['id'] = record['id']
+                    medicine_data['created_at'] = record['created_at']
+                    logger.info(f"Merged near-duplicate into medicine {duplicate_id}")
+                else:
+                    record['duplicate_of'] = medicine_data['duplicate_of'] = duplicate_id
+                    action = 'flagged'
+                    logger.info(f"Flagged near-duplicate of medicine {duplicate_id}")
+
+        # Flag interactions with the rest of the cabinet
+        if self.interaction_checker is not None:
+            warnings = []
+            if self.interaction_checker.has_interactions(record):
+                others = [m for medicine_id, m in stored.items()
+                          if medicine_id != record['id'] and medicine_id not in pending]
+                others.extend(m for medicine_id, m in pending.items() if medicine_id != record['id'])
+                warnings = self.interaction_checker.check_against_cabinet(record, others)
+            record['interaction_warnings'] = medicine_data['interaction_warnings'] = warnings
+            for warning in warnings:
+                logger.warning(
+                    f"Interaction ({warning['severity']}): {warning['medicine']} "
+                    f"with {warning['interacts_with']}"
+                )
+
+        return record, action
+
+    def _get_similarity_index(self) -> SimilarityIndex:
+        """
+        Return the near-duplicate index, rebuilding it if the store changed
 
-                # Check if medicine already exists (update if found)
-                updated = False
-                for i, existing in enumerate(medicines):
-                    if existing.get('id') == medicine_data.get('id'):
-                        medicines[i] = medicine_data
-                        updated = True
-                        break
+        Called with the write lock held.
+        """
+        generation = self._store.generation()
+        if self._similarity_index is None or self._similarity_index_generation != generation:
+            self._similarity_index = SimilarityIndex()
+            self._similarity_index.rebuild(self._store.load_medicines())
+            self._similarity_index_generation = generation
+        return self._similarity_index
+
+    def _get_read_index(self, name: str):
+        """
+        Return a read index, rebuilding it if the store changed underneath
 
-                # Add new medicine if not updated
-                if not updated:
-                    medicines.append(medicine_data)
+        Callers use the index under self._index_lock. A rebuild holds the
+        shared file lock, which is always taken before self._index_lock.
+        """
+        generation = self._store.generation()
+        with self._index_lock:
+            if name in self._read_indexes and self._read_index_generations[name] == generation:
+                return self._read_indexes[name]
+
+        with self._file_lock.shared(), self._index_lock:
+            generation = self._store.generation()
+            if name not in self._read_indexes or self._read_index_generations[name] != generation:
+                index = READ_INDEXES[name]()
+                index.rebuild(self._cached_medicines())
+                self._read_indexes[name] = index
+                self._read_index_generations[name] = generation
+            return self._read_indexes[name]
+
+    def _update_read_indexes(self, generation: Any, record: Optional[Dict] = None,
+                             removed_id: Optional[str] = None) -> Any:
+        """
+        Apply one of our own writes to the built read indexes
 
-                # Save back to file
-                with open(self.medicines_file, 'w') as f:
-                    json.dump(medicines, f, indent=2, default=str)
+        Args:
+            generation: Store generation read just before the write
+            record: Saved medicine to (re)index
+            removed_id: Deleted medicine id
 
-                action = 'Updated' if updated else 'Saved'
-                logger.info(f"{action} medicine: {medicine_data.get('name', 'Unknown')}")
-                return True
+        Returns:
+            Store generation the indexes now reflect
+        """
+        with self._index_lock:
+            new_generation = self._own_generation()
+            for name, index in list(self._read_indexes.items()):
+                if self._read_index_generations[name] != generation:
+                    # Someone else wrote in between; rebuild on next use
+                    del self._read_indexes[name]
+                    continue
+
+                if removed_id is not None:
+                    index.remove(removed_id)
+                if record is not None:
+                    index.add(record['id'], record)
+                self._read_index_generations[name] = new_generation
+        return new_generation
+
+    def _invalidate_indexes(self):
+        """Drop in-memory indexes so they are rebuilt from the store"""
+        self._similarity_index = None
+        with self._index_lock:
+            self._read_indexes.clear()
+        self._reset_scan_aggregates()
+
+    def _reset_scan_aggregates(self):
+        """Drop scan counters and columns so they are rebuilt from the store"""
+        with self._index_lock:
+            self._scan_counters = None
+        with self._analytics_lock:
+            self._scan_columns = None
+
+    def _get_scan_counters(self) -> ScanCounters:
+        """
+        Return the recent scan counters, rebuilding them on a new day
+
+        Callers use the counters under self._index_lock. The daily rebuild
+        also picks up scans appended by other processes.
+        """
+        with self._index_lock:
+            counters = self._scan_counters
+            if counters is not None and counters.is_current():
+                return counters
+
+        with self._file_lock.shared(), self._index_lock:
+            counters = self._scan_counters
+            if counters is None or not counters.is_current():
+                counters = ScanCounters()
+                counters.rebuild(self._store.load_scans(since=counters.window_start()))
+                self._scan_counters = counters
+            return counters
+
+    def _get_scan_columns(self) -> ScanColumns:
+        """
+        Return the columnar scan history, rebuilding it on a new day
+
+        Callers use the columns under self._analytics_lock. As with the scan
+        counters, the daily rebuild picks up other processes' scans.
+        """
+        with self._analytics_lock:
+            columns = self._scan_columns
+            if columns is not None and columns.is_current():
+                return columns
+
+        with self._file_lock.shared(), self._analytics_lock:
+            columns = self._scan_columns
+            if columns is None or not columns.is_current():
+                columns = ScanColumns()
+                columns.rebuild(self._store.iter_scans())
+                self._scan_columns = columns
+            return columns
+
+    def _strip_calculated_fields(self, medicine: Dict) -> Dict:
+        """Copy of a medicine without read-time calculated fields"""
+        return {key: value for key, value in medicine.items() if key not in CALCULATED_FIELDS}
+
+    def _merge_medicine(self, existing: Dict, incoming: Dict) -> Dict:
+        """Merge non-empty fields of an incoming record into an existing one"""
+        merged = dict(existing)
+        for key, value in incoming.items():
+            if key in ('id', 'created_at'):
+                continue
+            if value is None or value == '' or value == [] or value == {}:
+                continue
+            merged[key] = value
+        return merged
+
+    def deduplicate_medicines(self) -> Dict[str, int]:
+        """
+        Merge near-duplicate medicines already in the store
+
+        Records are visited oldest first; each one is merged into the
+        earliest saved record it duplicates.
+
+        Returns:
+            Dictionary with counts of scanned, merged and remaining records
+        """
+        try:
+            with self._write_lock():
+                medicines = self._store.load_medicines()
+                medicines.sort(key=lambda m: m.get('created_at') or '')
+
+                index = SimilarityIndex()
+                kept: List[Dict] = []
+                positions: Dict[str, int] = {}
+
+                for medicine in medicines:
+                    if not medicine.get('id'):
+                        medicine['id'] = str(uuid.uuid4())
+
+                    duplicate_id = index.find_duplicate(medicine)
+                    if duplicate_id is not None:
+                        position = positions[duplicate_id]
+                        kept[position] = self._merge_medicine(kept[position], medicine)
+                        index.add(duplicate_id, kept[position])
+                        continue
+
+                    positions[medicine['id']] = len(kept)
+                    kept.append(medicine)
+                    index.add(medicine['id'], medicine)
+
+                merged_count = len(medicines) - len(kept)
+                if merged_count > 0:
+                    self._store.replace_medicines(kept)
+                    logger.info(f"Merged {merged_count} duplicate medicines")
+
+                self._similarity_index = index
+                self._similarity_index_generation = self._own_generation()
+                with self._index_lock:
+                    self._read_indexes.clear()
+                if merged_count > 0:
+                    self._changes.publish('medicine', 'reset')
+
+                return {
+                    'scanned': len(medicines),
+                    'merged': merged_count,
+                    'remaining': len(kept)
+                }
 
         except Exception as e:
-            logger.error(f"Error saving medicine: {e}")
-            return False
+            logger.error(f"Error deduplicating medicines: {e}")
+            return {'scanned': 0, 'merged': 0, 'remaining': 0}
 
     def load_medicines(self) -> List[Dict]:
         """
@@ -129,20 +652,182 @@ class DatabaseHandler:
             List of medicine dictionaries with calculated fields
         """
         try:
-            if os.path.exists(self.medicines_file):
-                with open(self.medicines_file, 'r') as f:
-                    medicines = json.load(f)
+            return [medicine.to_dict() for medicine in self._cached_medicines()]
 
-                # Add calculated fields to each medicine
-                for medicine in medicines:
-                    self._add_calculated_fields(medicine)
+        except Exception as e:
+            logger.error(f"Error loading medicines: {e}")
+            return []
 
-                return medicines
-            else:
-                return []
+    def _cached_medicines(self) -> List[Medicine]:
+        """
+        Shared cached medicine records (internal, never hand out to callers)
+
+        Reloaded when the store generation changes. Reloads hold the
+        shared file lock, taken before self._cache_lock.
+        """
+        generation = self._store.generation()
+
+        with self._cache_lock:
+            if self._medicines_cache is not None and self._medicines_cache_generation == generation:
+                self._medicines_cache_stats['hits'] += 1
+                return self._medicines_cache
+
+        with self._file_lock.shared(), self._cache_lock:
+            generation = self._store.generation()
+            if self._medicines_cache is not None and self._medicines_cache_generation == generation:
+                # Another thread reloaded while we waited
+                self._medicines_cache_stats['hits'] += 1
+                return self._medicines_cache
+
+            self._medicines_cache_stats['misses'] += 1
+            medicines = [Medicine.from_dict(medicine) for medicine in self._store.load_medicines()]
+
+            self._medicines_cache = medicines
+            self._medicines_cache_by_id = {m['id']: m for m in medicines if m.get_stored('id')}
+            self._medicines_cache_generation = generation
+            return medicines
+
+    def _update_medicines_cache(self, generation: Any, records: Sequence[Dict] = (),
+                                removed_ids: Sequence[str] = ()):
+        """
+        Apply one of our own writes to the medicine cache
+
+        The cached list and id map are replaced rather than modified, as
+        readers use them without the cache lock.
+
+        Args:
+            generation: Store generation read just before the write
+            records: Saved medicine records (replaced by id, new ones appended)
+            removed_ids: Deleted medicine ids
+        """
+        with self._cache_lock:
+            if self._medicines_cache is None or self._medicines_cache_generation != generation:
+                # Not loaded, or someone else wrote in between; reload on next use
+                self._medicines_cache = None
+                return
+
+            by_id = dict(self._medicines_cache_by_id)
+            replaced: Dict[int, Medicine] = {}
+            appended: List[Medicine] = []
+            for record in records:
+                medicine = Medicine.from_dict(record)
+                previous = by_id.get(record['id'])
+                if previous is not None:
+                    replaced[id(previous)] = medicine
+                else:
+                    appended.append(medicine)
+                by_id[record['id']] = medicine
+
+            removed = {id(by_id.pop(medicine_id)) for medicine_id in removed_ids if medicine_id in by_id}
+            medicines = [replaced.get(id(m), m) for m in self._medicines_cache if id(m) not in removed]
+            medicines.extend(appended)
+
+            self._medicines_cache = medicines
+            self._medicines_cache_by_id = by_id
+            self._medicines_cache_generation = self._own_generation()
+
+    def _cached_medicines_by_id(self) -> Dict[str, Medicine]:
+        """Id -> cached medicine (internal, same rules as _cached_medicines)"""
+        self._cached_medicines()
+        return self._medicines_cache_by_id
+
+    def _medicines_for_ids(self, medicine_ids: List[str]) -> List[Dict]:
+        """Copies of cached medicines in the given id order"""
+        by_id = self._cached_medicines_by_id()
+        return [by_id[medicine_id].to_dict() for medicine_id in medicine_ids if medicine_id in by_id]
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get medicine cache statistics
+
+        Returns:
+            Dictionary with hits, misses, hit_rate and size
+        """
+        with self._cache_lock:
+            stats = dict(self._medicines_cache_stats)
+            stats['size'] = len(self._medicines_cache) if self._medicines_cache is not None else 0
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def change_version(self) -> int:
+        """
+        Current change feed version
+
+        Returns:
+            Version of the latest published change (0 before any)
+        """
+        return self._changes.version
+
+    def changes_since(self, version: int, entities: Optional[Sequence[str]] = None) -> Optional[List[ChangeEvent]]:
+        """
+        Changes published after a version
+
+        A caller caching what it loaded remembers change_version() from
+        before the load; an empty list means the cache is still valid.
+
+        Args:
+            version: Version the caller last saw
+            entities: Only these entities, e.g. ['medicine'] (None for all)
+
+        Returns:
+            Change events, oldest first, or None if the caller must reload
+            everything (the version is too old for the replay buffer)
+        """
+        try:
+            with self._lock:
+                self._publish_foreign_changes()
+            self._changes.dispatch()
+            return self._changes.changes_since(version, entities)
 
         except Exception as e:
-            logger.error(f"Error loading medicines: {e}")
+            logger.error(f"Error reading changes: {e}")
+            return None
+
+    def subscribe(self, callback: Callable[[ChangeEvent], Any], entities: Optional[Sequence[str]] = None) -> int:
+        """
+        Call a function after every committed change
+
+        Callbacks run on the writing thread once the write lock is
+        released, in version order; exceptions are logged and ignored.
+
+        Args:
+            callback: Called with each ChangeEvent
+            entities: Only these entities (None for all)
+
+        Returns:
+            Token for unsubscribe
+        """
+        return self._changes.subscribe(callback, entities)
+
+    def unsubscribe(self, token: int) -> bool:
+        """Stop calling a subscriber; True if it was subscribed"""
+        return self._changes.unsubscribe(token)
+
+    def check_interactions(self, medicine_data: Dict, medicines: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        Check a medicine against the saved cabinet for interactions
+
+        Args:
+            medicine_data: Medicine to check (e.g. a fresh scan result)
+            medicines: Cabinet to check against (defaults to all saved medicines)
+
+        Returns:
+            List of interaction warnings, most severe first
+        """
+        if self.interaction_checker is None:
+            return []
+
+        try:
+            if medicines is None:
+                medicines = self.load_medicines()
+
+            others = [m for m in medicines if m.get('id') is None or m.get('id') != medicine_data.get('id')]
+            return self.interaction_checker.check_against_cabinet(medicine_data, others)
+
+        except Exception as e:
+            logger.error(f"Error checking interactions: {e}")
             return []
 
     def get_medicine_by_id(self, medicine_id: str) -> Optional[Dict]:
@@ -155,11 +840,13 @@ class DatabaseHandler:
         Returns:
             Medicine dictionary or None if not found
         """
-        medicines = self.load_medicines()
-        for medicine in medicines:
-            if medicine.get('id') == medicine_id:
-                return medicine
-        return None
+        try:
+            medicine = self._cached_medicines_by_id().get(medicine_id)
+            return medicine.to_dict() if medicine is not None else None
+
+        except Exception as e:
+            logger.error(f"Error getting medicine {medicine_id}: {e}")
+            return None
 
     def delete_medicine(self, medicine_id: str) -> bool:
         """
@@ -172,14 +859,15 @@ class DatabaseHandler:
             True if successful, False otherwise
         """
         try:
-            with self._lock:
-                medicines = self.load_medicines()
-                original_count = len(medicines)
-                medicines = [m for m in medicines if m.get('id') != medicine_id]
-
-                if len(medicines) < original_count:
-                    with open(self.medicines_file, 'w') as f:
-                        json.dump(medicines, f, indent=2, default=str)
+            with self._write_lock():
+                generation = self._store.generation()
+                if self._store.delete_medicines([medicine_id]) > 0:
+                    self._update_medicines_cache(generation, removed_ids=[medicine_id])
+                    if self._similarity_index is not None and self._similarity_index_generation == generation:
+                        self._similarity_index.remove(medicine_id)
+                        self._similarity_index_generation = self._own_generation()
+                    self._update_read_indexes(generation, removed_id=medicine_id)
+                    self._changes.publish('medicine', 'delete', [medicine_id])
                     logger.info(f"Deleted medicine with ID: {medicine_id}")
                     return True
                 else:
@@ -190,39 +878,72 @@ class DatabaseHandler:
             logger.error(f"Error deleting medicine: {e}")
             return False
 
-    def search_medicines(self, query: str) -> List[Dict]:
+    def search_medicines(self, query: str, limit: Optional[int] = None, max_typos: int = 0) -> List[Dict]:
         """
         Search medicines by name, manufacturer, or other fields
 
+        Every word must match a word of the medicine; the last word also
+        matches as a prefix, so partial input works as you type. Results
+        are ranked (name and batch matches first).
+
         Args:
             query: Search query string
+            limit: Maximum number of results (None for all)
+            max_typos: Allow words to match within this many edits (0 or 1)
 
         Returns:
-            List of matching medicine dictionaries
+            List of matching medicine dictionaries, best match first
+        """
+        return [medicine for medicine, _ in self.search_medicines_scored(query, limit=limit, max_typos=max_typos)]
+
+    def search_medicines_scored(self, query: str, limit: Optional[int] = None,
+                                max_typos: int = 0) -> List[Tuple[Dict, float]]:
+        """
+        Search medicines like search_medicines, keeping each match's score
+
+        Scores of different handlers are comparable, so ranked results of
+        several handlers can be merged by score.
+
+        Args:
+            query: Search query string
+            limit: Maximum number of results (None for all)
+            max_typos: Allow words to match within this many edits (0 or 1)
+
+        Returns:
+            List of (medicine dictionary, score), best match first
         """
         if not query or not query.strip():
             return []
 
-        medicines = self.load_medicines()
-        query_lower = query.lower().strip()
-        matching_medicines = []
+        try:
+            index = self._get_read_index('search')
+            with self._index_lock:
+                hits = index.search(query, limit=limit, max_typos=max_typos)
+            by_id = self._cached_medicines_by_id()
+            return [(by_id[medicine_id].to_dict(), score) for medicine_id, score in hits if medicine_id in by_id]
 
-        for medicine in medicines:
-            # Search in multiple fields
-            search_fields = [
-                medicine.get('name', ''),
-                medicine.get('manufacturer', ''),
-                medicine.get('batch_no', ''),
-                medicine.get('dosage', ''),
-                medicine.get('form', ''),
-                medicine.get('instructions', '')
-            ]
+        except Exception as e:
+            logger.error(f"Error searching medicines: {e}")
+            return []
 
-            # Check if query matches any field
-            if any(query_lower in str(field).lower() for field in search_fields if field):
-                matching_medicines.append(medicine)
+    def suggest_search_terms(self, partial: str, limit: int = 5) -> List[str]:
+        """
+        Type-ahead completions for the last word of a search box
+
+        Args:
+            partial: Search text as typed so far
+            limit: Maximum number of suggestions
 
-        return matching_medicines
+        Returns:
+            Indexed words completing the last word, most common first
+        """
+        try:
+            index = self._get_read_index('search')
+            with self._index_lock:
+                return index.suggest(partial, limit)
+        except Exception as e:
+            logger.error(f"Error suggesting search terms: {e}")
+            return []
 
     def get_expiring_medicines(self, days_ahead: int = 7) -> List[Dict]:
         """
@@ -234,33 +955,30 @@ class DatabaseHandler:
         Returns:
             List of expiring medicine dictionaries sorted by expiry date
         """
-        medicines = self.load_medicines()
-        expiring_medicines = []
-
-        for medicine in medicines:
-            days_until_expiry = medicine.get('days_until_expiry')
-            if days_until_expiry is not None and 0 <= days_until_expiry <= days_ahead:
-                expiring_medicines.append(medicine)
-
-        # Sort by days until expiry (most urgent first)
-        return sorted(expiring_medicines, key=lambda x: x.get('days_until_expiry', float('inf')))
+        try:
+            index = self._get_read_index('expiry')
+            with self._index_lock:
+                medicine_ids = index.expiring(days_ahead)
+            return self._medicines_for_ids(medicine_ids)
+        except Exception as e:
+            logger.error(f"Error getting expiring medicines: {e}")
+            return []
 
     def get_expired_medicines(self) -> List[Dict]:
         """
         Get all expired medicines
 
         Returns:
-            List of expired medicine dictionaries
+            List of expired medicine dictionaries, earliest expiry first
         """
-        medicines = self.load_medicines()
-        expired_medicines = []
-
-        for medicine in medicines:
-            days_until_expiry = medicine.get('days_until_expiry')
-            if days_until_expiry is not None and days_until_expiry < 0:
-                expired_medicines.append(medicine)
-
-        return expired_medicines
+        try:
+            index = self._get_read_index('expiry')
+            with self._index_lock:
+                medicine_ids = index.expired()
+            return self._medicines_for_ids(medicine_ids)
+        except Exception as e:
+            logger.error(f"Error getting expired medicines: {e}")
+            return []
 
     def get_medicines_by_form(self, form: str) -> List[Dict]:
         """
@@ -272,8 +990,7 @@ class DatabaseHandler:
         Returns:
             List of medicine dictionaries
         """
-        medicines = self.load_medicines()
-        return [m for m in medicines if m.get('form', '').lower() == form.lower()]
+        return self.query_medicines(MedicineQuery().form(form).limit(None))['medicines']
 
     def get_medicines_by_manufacturer(self, manufacturer: str) -> List[Dict]:
         """
@@ -285,8 +1002,57 @@ class DatabaseHandler:
         Returns:
             List of medicine dictionaries
         """
-        medicines = self.load_medicines()
-        return [m for m in medicines if manufacturer.lower() in m.get('manufacturer', '').lower()]
+        return self.query_medicines(MedicineQuery().manufacturer(manufacturer).limit(None))['medicines']
+
+    def query_medicines(self, query: MedicineQuery) -> Dict[str, Any]:
+        """
+        Run a composed medicine query (see MedicineQuery)
+
+        Text and expiry filters are answered by the search and expiry
+        indexes and intersected; the cached records left are filtered,
+        keyed and paged in one pass, and only the page is copied.
+
+        Args:
+            query: Filters, order, page size and cursor
+
+        Returns:
+            Dictionary with 'medicines' (the page, with calculated
+            fields), 'next_cursor' (pass to query.after() for the next
+            page; None on the last) and 'total' (matches on every page)
+        """
+        try:
+            candidate_ids = None
+            scores = None
+
+            if query.text_query:
+                index = self._get_read_index('search')
+                with self._index_lock:
+                    scores = dict(index.search(query.text_query, max_typos=query.max_typos))
+                candidate_ids = list(scores)
+
+            if query.has_expiry_filter:
+                index = self._get_read_index('expiry')
+                with self._index_lock:
+                    expiring = index.within(query.expiry_min_days, query.expiry_max_days)
+                if candidate_ids is None:
+                    candidate_ids = expiring
+                else:
+                    expiring = set(expiring)
+                    candidate_ids = [medicine_id for medicine_id in candidate_ids if medicine_id in expiring]
+
+            if candidate_ids is None:
+                candidates = self._cached_medicines()
+            else:
+                by_id = self._cached_medicines_by_id()
+                candidates = [by_id[medicine_id] for medicine_id in candidate_ids if medicine_id in by_id]
+
+            page = query.run(candidates, scores)
+            page['medicines'] = [medicine.to_dict() for medicine in page['medicines']]
+            return page
+
+        except Exception as e:
+            logger.error(f"Error querying medicines: {e}")
+            return {'medicines': [], 'next_cursor': None, 'total': 0}
 
     def save_scan_history(self, scan_data: Dict) -> bool:
         """
@@ -298,43 +1064,61 @@ class DatabaseHandler:
         Returns:
             True if successful, False otherwise
         """
-        try:
-            with self._lock:
-                # Add metadata
-                scan_entry = {
-                    'id': str(uuid.uuid4()),
-                    'timestamp': datetime.now().isoformat(),
-                    'scan_type': scan_data.get('scan_type', 'unknown'),
-                    'success': scan_data.get('success', False),
-                    'medicines_found': scan_data.get('medicines_found', 0),
-                    'confidence': scan_data.get('confidence', 0.0),
-                    'ocr_engine': scan_data.get('ocr_engine', 'unknown'),
-                    'processing_time': scan_data.get('processing_time', 0.0),
-                    'error': scan_data.get('error', None)
-                }
-
-                # Load existing history
-                history = []
-                if os.path.exists(self.scan_history_file):
-                    with open(self.scan_history_file, 'r') as f:
-                        history = json.load(f)
+        return self.save_scan_history_batch([scan_data])
 
-                history.append(scan_entry)
+    def save_scan_history_batch(self, scans: List[Dict]) -> bool:
+        """
+        Save several scan history entries with one store write
 
-                # Keep only last 500 entries
-                if len(history) > 500:
-                    history = history[-500:]
+        Args:
+            scans: Dictionaries containing scan information; a 'timestamp'
+                (ISO) is kept, e.g. when entries were queued earlier
 
-                # Save history
-                with open(self.scan_history_file, 'w') as f:
-                    json.dump(history, f, indent=2, default=str)
+        Returns:
+            True if successful, False otherwise
+        """
+        if not scans:
+            return True
 
-                return True
+        try:
+            with self._write_lock():
+                scan_entries = [self._scan_entry(scan_data) for scan_data in scans]
+
+                self._store.append_scans(scan_entries)
+                with self._index_lock:
+                    if self._scan_counters is not None:
+                        for scan_entry in scan_entries:
+                            self._scan_counters.add(scan_entry)
+                with self._analytics_lock:
+                    if self._scan_columns is not None:
+                        for scan_entry in scan_entries:
+                            self._scan_columns.add(scan_entry)
+                self._changes.publish('scan', 'insert', [entry['id'] for entry in scan_entries])
+
+            if self.scan_retention_days is not None and self._compaction_day != date.today():
+                # The retention cutoff moves daily; reclaim behind it in the background
+                self._compaction_day = date.today()
+                self._compactor.schedule('scan_history', self._store.compact_scans)
+            return True
 
         except Exception as e:
             logger.error(f"Error saving scan history: {e}")
             return False
 
+    def _scan_entry(self, scan_data: Dict) -> Dict:
+        """Scan history entry for scan data, with id and timestamp"""
+        return {
+            'id': str(uuid.uuid4()),
+            'timestamp': scan_data.get('timestamp') or datetime.now().isoformat(),
+            'scan_type': scan_data.get('scan_type', 'unknown'),
+            'success': scan_data.get('success', False),
+            'medicines_found': scan_data.get('medicines_found', 0),
+            'confidence': scan_data.get('confidence', 0.0),
+            'ocr_engine': scan_data.get('ocr_engine', 'unknown'),
+            'processing_time': scan_data.get('processing_time', 0.0),
+            'error': scan_data.get('error', None)
+        }
+
     def get_scan_history(self, days: int = 30) -> List[Dict]:
         """
         Get scan history for specified days
@@ -346,19 +1130,10 @@ class DatabaseHandler:
             List of scan history entries
         """
         try:
-            if not os.path.exists(self.scan_history_file):
-                return []
-
-            with open(self.scan_history_file, 'r') as f:
-                history = json.load(f)
-
             # Filter by date if specified
-            if days > 0:
-                cutoff_date = datetime.now() - timedelta(days=days)
-                history = [
-                    entry for entry in history
-                    if datetime.fromisoformat(entry['timestamp']) >= cutoff_date
-                ]
+            cutoff_date = datetime.now() - timedelta(days=days) if days > 0 else None
+            with self._file_lock.shared():
+                history = self._store.load_scans(since=cutoff_date)
 
             return sorted(history, key=lambda x: x['timestamp'], reverse=True)
 
@@ -377,7 +1152,7 @@ class DatabaseHandler:
             True if successful, False otherwise
         """
         try:
-            with self._lock:
+            with self._write_lock():
                 # Load current settings
                 current_settings = self.load_settings()
 
@@ -386,8 +1161,8 @@ class DatabaseHandler:
                 current_settings['last_updated'] = datetime.now().isoformat()
 
                 # Save settings
-                with open(self.settings_file, 'w') as f:
-                    json.dump(current_settings, f, indent=2)
+                self._writer.write(self.settings_file, current_settings, serializer=self.serializer)
+                self._changes.publish('settings', 'update', settings.keys())
 
                 logger.info("Settings saved successfully")
                 return True
@@ -404,50 +1179,81 @@ class DatabaseHandler:
             Settings dictionary
         """
         try:
-            if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r') as f:
-                    return json.load(f)
-            else:
-                return self._get_default_settings()
+            with self._file_lock.shared():
+                settings = self._writer.read(self.settings_file, serializer=self.serializer)
+            return settings if settings is not None else self._get_default_settings()
 
         except Exception as e:
             logger.error(f"Error loading settings: {e}")
             return self._get_default_settings()
 
+    def _get_backup_engine(self) -> BackupEngine:
+        """Return the snapshot engine for data_dir/backups, creating it on first use"""
+        if self._backup_engine is None:
+            self._backup_engine = BackupEngine(
+                os.path.join(self.data_dir, "backups"),
+                compression=self.backup_compression,
+                keep_last=self.backup_keep
+            )
+        return self._backup_engine
+
     def backup_data(self, backup_path: str = None) -> bool:
         """
         Create backup of all data
 
+        Without a path this takes an incremental snapshot in
+        data_dir/backups: medicines are grouped into compressed,
+        content-addressed chunks by id range, so only the chunks holding
+        changes since the last snapshot are written, and snapshots beyond
+        backup_keep are pruned.
+        With a path a full JSON backup file is written instead.
+
         Args:
-            backup_path: Path for backup file (optional)
+            backup_path: Path for a full backup file (optional)
 
         Returns:
             True if successful, False otherwise
         """
         try:
+            # Collect all data as one consistent snapshot
+            with self._file_lock.shared():
+                medicines = self._store.load_medicines()
+                scan_history = self._store.load_scans()
+                settings = self.load_settings()
+                users = self._writer.read(self.users_file, serializer=self.serializer)
+
             if backup_path is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                backup_dir = os.path.join(self.data_dir, "backups")
-                os.makedirs(backup_dir, exist_ok=True)
-                backup_path = os.path.join(backup_dir, f"mediscan_backup_{timestamp}.json")
+                engine = self._get_backup_engine()
+                # Scans are chunked per day: past days never change
+                scans_by_day = [
+                    list(entries)
+                    for _, entries in itertools.groupby(
+                        sorted(scan_history, key=lambda scan: scan['timestamp']),
+                        key=lambda scan: scan['timestamp'][:10]
+                    )
+                ]
+                sections = {'medicines': chunk_records(medicines), 'scan_history': scans_by_day,
+                            'settings': [settings]}
+                if users is not None:
+                    sections['users'] = [users]
+
+                snapshot = engine.create_snapshot(sections, metadata={'app_version': '1.0.0'})
+                engine.prune()
+                logger.info(f"Backup snapshot created: {snapshot['id']}")
+                return True
 
-            # Collect all data
             backup_data = {
                 'timestamp': datetime.now().isoformat(),
                 'version': '1.0.0',
-                'medicines': self.load_medicines(),
-                'settings': self.load_settings(),
-                'scan_history': self.get_scan_history(days=0)  # All history
+                'medicines': medicines,
+                'settings': settings,
+                'scan_history': sorted(scan_history, key=lambda x: x['timestamp'], reverse=True)
             }
+            if users is not None:
+                backup_data['users'] = users
 
-            # Load users data if exists
-            if os.path.exists(self.users_file):
-                with open(self.users_file, 'r') as f:
-                    backup_data['users'] = json.load(f)
-
-            # Save backup
-            with open(backup_path, 'w') as f:
-                json.dump(backup_data, f, indent=2, default=str)
+            # Save backup (never leaves a partial backup file behind)
+            atomic_write_json(backup_path, backup_data, durability='full')
 
             logger.info(f"Backup created: {backup_path}")
             return True
@@ -456,44 +1262,93 @@ class DatabaseHandler:
             logger.error(f"Error creating backup: {e}")
             return False
 
+    def list_backups(self) -> List[Dict]:
+        """
+        List incremental backup snapshots
+
+        Returns:
+            Snapshot summaries (id, timestamp, write statistics), oldest first
+        """
+        try:
+            return self._get_backup_engine().list_snapshots()
+        except Exception as e:
+            logger.error(f"Error listing backups: {e}")
+            return []
+
     def restore_data(self, backup_path: str) -> bool:
         """
         Restore data from backup
 
         Args:
-            backup_path: Path to backup file
+            backup_path: Snapshot id (see list_backups) or path to a full
+                backup file
 
         Returns:
             True if successful, False otherwise
         """
         try:
-            if not os.path.exists(backup_path):
+            engine = self._get_backup_engine()
+            if engine.has_snapshot(backup_path):
+                snapshot_id = os.path.basename(backup_path)
+                # Chunks are streamed into the store below; check they all
+                # exist first so a restore never stops halfway
+                missing = engine.missing_chunks(snapshot_id)
+                if missing:
+                    logger.error(f"Backup {snapshot_id} is missing {len(missing)} chunks")
+                    return False
+
+                sections = engine.sections(snapshot_id)
+                backup_data = {}
+                if 'medicines' in sections:
+                    # Older snapshots hold one medicine per chunk
+                    backup_data['medicines'] = (
+                        medicine
+                        for chunk in engine.iter_section(snapshot_id, 'medicines')
+                        for medicine in (chunk if isinstance(chunk, list) else [chunk])
+                    )
+                if 'scan_history' in sections:
+                    # Day chunks are stored oldest first
+                    backup_data['scan_history'] = (
+                        scan for day in engine.iter_section(snapshot_id, 'scan_history') for scan in day
+                    )
+                for name in ('settings', 'users'):
+                    if name in sections:
+                        backup_data[name] = next(engine.iter_section(snapshot_id, name))
+
+            elif os.path.exists(backup_path):
+                with open(backup_path, 'r') as f:
+                    backup_data = json.load(f)
+                if 'scan_history' in backup_data:
+                    backup_data['scan_history'] = sorted(backup_data['scan_history'], key=lambda x: x['timestamp'])
+
+            else:
                 logger.error(f"Backup file not found: {backup_path}")
                 return False
 
-            with open(backup_path, 'r') as f:
-                backup_data = json.load(f)
-
-            with self._lock:
+            with self._write_lock():
                 # Restore medicines
                 if 'medicines' in backup_data:
-                    with open(self.medicines_file, 'w') as f:
-                        json.dump(backup_data['medicines'], f, indent=2, default=str)
+                    self._store.replace_medicines(
+                        self._strip_calculated_fields(m) for m in backup_data['medicines']
+                    )
+                    self._invalidate_indexes()
+                    self._changes.publish('medicine', 'reset')
 
                 # Restore settings
                 if 'settings' in backup_data:
-                    with open(self.settings_file, 'w') as f:
-                        json.dump(backup_data['settings'], f, indent=2)
+                    self._writer.write(self.settings_file, backup_data['settings'], serializer=self.serializer)
+                    self._changes.publish('settings', 'reset')
 
                 # Restore scan history
                 if 'scan_history' in backup_data:
-                    with open(self.scan_history_file, 'w') as f:
-                        json.dump(backup_data['scan_history'], f, indent=2, default=str)
+                    self._store.replace_scans(backup_data['scan_history'])
+                    self._reset_scan_aggregates()
+                    self._changes.publish('scan', 'reset')
 
                 # Restore users
                 if 'users' in backup_data:
-                    with open(self.users_file, 'w') as f:
-                        json.dump(backup_data['users'], f, indent=2, default=str)
+                    self._writer.write(self.users_file, backup_data['users'], serializer=self.serializer)
+                    self._changes.publish('user', 'reset')
 
             logger.info(f"Data restored from backup: {backup_path}")
             return True
@@ -506,136 +1361,308 @@ class DatabaseHandler:
         """
         Get database statistics
 
+        Counts come from incrementally maintained counters, and the
+        expired and expiring soon counts from the expiry index; see
+        verify_statistics for a check against a full recount.
+
         Returns:
             Statistics dictionary
         """
-        medicines = self.load_medicines()
-        scan_history = self.get_scan_history(days=30)
-
         stats = {
-            'total_medicines': len(medicines),
-            'expired_medicines': len(self.get_expired_medicines()),
-            'expiring_soon': len(self.get_expiring_medicines()),
-            'scans_last_30_days': len(scan_history),
-            'successful_scans': len([s for s in scan_history if s.get('success', False)]),
+            'total_medicines': 0,
+            'expired_medicines': 0,
+            'expiring_soon': 0,
+            'scans_last_30_days': 0,
+            'successful_scans': 0,
             'by_form': {},
             'by_manufacturer': {},
             'by_scan_type': {}
         }
 
-        # Count by form and manufacturer
-        for medicine in medicines:
-            form = medicine.get('form', 'Unknown')
-            manufacturer = medicine.get('manufacturer', 'Unknown')
-            scan_type = medicine.get('scan_type', 'Unknown')
+        try:
+            counters = self._get_read_index('stats')
+            expiry = self._get_read_index('expiry')
+            with self._index_lock:
+                stats.update(counters.snapshot())
+                stats['expired_medicines'] = expiry.count_expired()
+                stats['expiring_soon'] = expiry.count_expiring(EXPIRING_SOON_DAYS)
+        except Exception as e:
+            logger.error(f"Error counting medicines for statistics: {e}")
 
-            stats['by_form'][form] = stats['by_form'].get(form, 0) + 1
-            stats['by_manufacturer'][manufacturer] = stats['by_manufacturer'].get(manufacturer, 0) + 1
-            stats['by_scan_type'][scan_type] = stats['by_scan_type'].get(scan_type, 0) + 1
+        try:
+            counters = self._get_scan_counters()
+            with self._index_lock:
+                stats.update(counters.snapshot())
+        except Exception as e:
+            logger.error(f"Error counting scans for statistics: {e}")
 
         return stats
 
-    def cleanup_old_data(self, days_old: int = 365) -> int:
+    def get_scan_analytics(self, days: int = 30, bins: int = 10,
+                           percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
         """
-        Clean up old data
+        Aggregate scan history: daily counts, success rate, per-engine
+        latency percentiles and a confidence histogram
+
+        Computed with vectorized passes over a columnar copy of the scan
+        history (see ScanColumns).
 
         Args:
-            days_old: Remove data older than this many days
+            days: Number of past days covered (0 for all history)
+            bins: Confidence histogram bins
+            percentiles: Processing time percentiles (0-100)
 
         Returns:
-            Number of records removed
+            Dictionary with daily_counts, success, latency_by_engine,
+            confidence_histogram, by_engine and by_scan_type
         """
         try:
-            with self._lock:
-                removed_count = 0
-                cutoff_date = datetime.now() - timedelta(days=days_old)
+            since = datetime.now() - timedelta(days=days) if days > 0 else None
+            columns = self._get_scan_columns()
+            with self._analytics_lock:
+                return columns.summary(since, bins, percentiles)
 
-                # Clean medicines
-                medicines = self.load_medicines()
-                original_count = len(medicines)
+        except Exception as e:
+            logger.error(f"Error computing scan analytics: {e}")
+            return {}
 
-                medicines = [
-                    m for m in medicines
-                    if datetime.fromisoformat(m.get('created_at', datetime.now().isoformat())) >= cutoff_date
-                ]
+    def verify_statistics(self) -> bool:
+        """
+        Recount statistics from the store and compare with the live counters
 
-                if len(medicines) < original_count:
-                    with open(self.medicines_file, 'w') as f:
-                        json.dump(medicines, f, indent=2, default=str)
-                    removed_count += original_count - len(medicines)
+        On a mismatch the recounted values replace the live counters.
 
-                # Clean scan history
-                scan_history = self.get_scan_history(days=0)
-                original_history_count = len(scan_history)
+        Returns:
+            True if the live counters matched the recount, False otherwise
+        """
+        try:
+            with self._lock, self._file_lock.shared(), self._index_lock:
+                live = self.get_statistics()
+
+                generation = self._store.generation()
+                medicines = self._store.load_medicines()
+                medicine_counters = MedicineCounters()
+                medicine_counters.rebuild(medicines)
+                expiry_index = ExpiryIndex()
+                expiry_index.rebuild(medicines)
+                scan_counters = ScanCounters()
+                scan_counters.rebuild(self._store.load_scans(since=scan_counters.window_start()))
+
+                recount = dict(live)
+                recount.update(medicine_counters.snapshot())
+                recount['expired_medicines'] = expiry_index.count_expired()
+                recount['expiring_soon'] = expiry_index.count_expiring(EXPIRING_SOON_DAYS)
+                recount.update(scan_counters.snapshot())
+
+                mismatched = sorted(key for key in recount if recount[key] != live[key])
+                if mismatched:
+                    logger.warning(f"Statistics counters drifted ({', '.join(mismatched)}); using recount")
+                    self._read_indexes['stats'] = medicine_counters
+                    self._read_indexes['expiry'] = expiry_index
+                    self._read_index_generations['stats'] = generation
+                    self._read_index_generations['expiry'] = generation
+                    self._scan_counters = scan_counters
+                return not mismatched
 
-                scan_history = [
-                    entry for entry in scan_history
-                    if datetime.fromisoformat(entry['timestamp']) >= cutoff_date
-                ]
+        except Exception as e:
+            logger.error(f"Error verifying statistics: {e}")
+            return False
 
-                if len(scan_history) < original_history_count:
-                    with open(self.scan_history_file, 'w') as f:
-                        json.dump(scan_history, f, indent=2, default=str)
-                    removed_count += original_history_count - len(scan_history)
+    def expire_old_data(self, days_old: int = 365, wait: bool = False) -> Dict[str, Any]:
+        """
+        Expire medicines and scan history older than a number of days
 
-                if removed_count > 0:
-                    logger.info(f"Cleaned up {removed_count} old records")
+        Only the quick part runs under the write lock: medicines created
+        before the cutoff are picked from the cached records (no store
+        scan, no timestamp parsing) and deleted, and the store expires
+        scans by time partition, hiding them at once and dropping whole
+        partitions. The partition straddling the cutoff is compacted on a
+        low-priority background thread (see RetentionCompactor) that
+        never holds the write lock.
 
-                return removed_count
+        Args:
+            days_old: Expire data older than this many days
+            wait: Compact on the calling thread (still outside the write
+                lock) and include it in the report
+
+        Returns:
+            Dictionary with medicines and scans removed, bytes reclaimed,
+            whole partitions dropped, and compaction_pending (True while
+            the background compaction may reclaim more)
+        """
+        report: Dict[str, Any] = {'medicines': 0, 'scans': 0, 'bytes': 0, 'partitions': 0,
+                                  'compaction_pending': False}
+        try:
+            cutoff_date = datetime.now() - timedelta(days=days_old)
+            cutoff_iso = cutoff_date.isoformat()
+
+            with self._write_lock():
+                # ISO timestamps compare correctly as strings
+                expired = [
+                    m for m in self._cached_medicines()
+                    if m.get_stored('created_at') and m.get_stored('created_at') < cutoff_iso
+                ]
+                if expired:
+                    expired_ids = [m.get_stored('id') for m in expired]
+                    generation = self._store.generation()
+                    report['medicines'] = self._store.delete_medicines(expired_ids)
+                    self._update_medicines_cache(generation, removed_ids=expired_ids)
+                    report['bytes'] += sum(len(json.dumps(m.to_dict(calculated=False), default=str))
+                                           for m in expired)
+                    self._invalidate_indexes()
+                    self._changes.publish('medicine', 'delete', expired_ids)
+
+                expired_scans = self._store.expire_scans_before(cutoff_date)
+                if expired_scans['horizon_moved'] or expired_scans['records']:
+                    self._reset_scan_aggregates()
+                    self._changes.publish('scan', 'reset')
+
+            reclaimed = empty_reclaim()
+            add_reclaim(reclaimed, expired_scans)
+            if wait:
+                add_reclaim(reclaimed, self._store.compact_scans())
+            else:
+                report['compaction_pending'] = self._compactor.schedule('scan_history', self._store.compact_scans)
+            report['scans'] = reclaimed['records']
+            report['bytes'] += reclaimed['bytes']
+            report['partitions'] = reclaimed['partitions']
+
+            with self._retention_lock:
+                self._retention_stats['runs'] += 1
+                for key in ('medicines', 'scans', 'bytes', 'partitions'):
+                    self._retention_stats[key] += report[key]
+
+            if report['medicines'] or report['scans']:
+                logger.info(f"Expired {report['medicines']} medicines and {report['scans']} scans "
+                            f"({report['bytes']} bytes, {report['partitions']} partitions dropped)")
+            return report
 
         except Exception as e:
-            logger.error(f"Error cleaning up data: {e}")
-            return 0
+            logger.error(f"Error expiring old data: {e}")
+            return report
+
+    def cleanup_old_data(self, days_old: int = 365) -> int:
+        """
+        Clean up old data
+
+        Args:
+            days_old: Remove data older than this many days
+
+        Returns:
+            Number of records removed
+        """
+        report = self.expire_old_data(days_old, wait=True)
+        return report['medicines'] + report['scans']
+
+    def get_retention_stats(self) -> Dict[str, Any]:
+        """
+        Get data retention statistics
+
+        Returns:
+            Dictionary with expiry runs, medicines and scans removed, bytes
+            reclaimed and partitions dropped (foreground and background
+            together), and the background compaction's own statistics
+        """
+        compaction = self._compactor.get_stats()
+        with self._retention_lock:
+            stats: Dict[str, Any] = dict(self._retention_stats)
+        stats['scans'] += compaction['records']
+        stats['bytes'] += compaction['bytes']
+        stats['partitions'] += compaction['partitions']
+        stats['compaction'] = compaction
+        return stats
 
     def _add_calculated_fields(self, medicine: Dict):
         """Add calculated fields to medicine data"""
-        # Calculate days until expiry
-        expiry_date = medicine.get('expiry_date')
-        if expiry_date:
-            try:
-                # Try different date formats
-                for date_format in ['%Y-%m-%d', '%m/%Y', '%m-%Y', '%d/%m/%Y']:
-                    try:
-                        expiry_dt = datetime.strptime(expiry_date, date_format)
-                        today = datetime.now()
-                        delta = expiry_dt - today
-                        medicine['days_until_expiry'] = delta.days
-                        break
-                    except ValueError:
-                        continue
-                else:
-                    medicine['days_until_expiry'] = None
-            except Exception:
-                medicine['days_until_expiry'] = None
-        else:
-            medicine['days_until_expiry'] = None
-
-        # Add expiry status
-        days_until_expiry = medicine.get('days_until_expiry')
-        if days_until_expiry is not None:
-            if days_until_expiry < 0:
-                medicine['expiry_status'] = 'expired'
-            elif days_until_expiry <= 7:
-                medicine['expiry_status'] = 'expiring_soon'
-            elif days_until_expiry <= 30:
-                medicine['expiry_status'] = 'expiring_this_month'
-            else:
-                medicine['expiry_status'] = 'safe'
-        else:
-            medicine['expiry_status'] = 'unknown'
-
-        # Add age of medicine record
-        created_at = medicine.get('created_at')
-        if created_at:
-            try:
-                created_dt = datetime.fromisoformat(created_at)
-                age_days = (datetime.now() - created_dt).days
-                medicine['record_age_days'] = age_days
-            except ValueError:
-                medicine['record_age_days'] = None
-        else:
-            medicine['record_age_days'] = None
+        medicine.update(calculated_fields(medicine.get('expiry_date'), medicine.get('created_at')))
+
+    def _export_source(self, dataset: str, days: int = 0):
+        """
+        Record source for an export: a callable returning a fresh iterator
+
+        Medicines come from a snapshot of the record cache, which is in
+        memory already, so every pass sees the same records.
+        """
+        if dataset == 'medicines':
+            medicines = self._cached_medicines()
+            return lambda: (medicine.to_dict() for medicine in medicines)
+
+        if dataset == 'scan_history':
+            since = datetime.now() - timedelta(days=days) if days > 0 else None
+            return lambda: self._store.iter_scans(since=since)
+
+        raise ValueError(f"Unknown export dataset: {dataset}")
+
+    def export_medicines(self, export_format: str = "csv", chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Stream all medicines, with calculated fields, as CSV or JSONL
+
+        Records come from a snapshot of the medicine cache, which holds
+        the whole cabinet in compact form on either backend (the JSON
+        store cannot be read in pieces), and are copied and encoded one
+        chunk at a time, so the export adds one chunk's worth of memory.
+        Writes that land during the export are not included.
+
+        Args:
+            export_format: 'csv' or 'jsonl'
+            chunk_size: Records per yielded chunk
+
+        Yields:
+            UTF-8 encoded chunks
+        """
+        medicines = self._cached_medicines()
+        source = lambda: (medicine.to_dict() for medicine in medicines)
+        # Records share a few field layouts, so the header comes from those
+        # instead of a pass over every record
+        layouts = dict.fromkeys(medicine.stored_fields() for medicine in medicines)
+        columns = [dict.fromkeys(fields) for fields in layouts]
+        if columns:
+            columns.append(dict.fromkeys(CALCULATED_FIELDS))
+
+        return stream_records(source, export_format, chunk_size, lambda: columns)
+
+    def export_scan_history(self, export_format: str = "csv", days: int = 0,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Stream scan history, oldest first, as CSV or JSONL
+
+        Args:
+            export_format: 'csv' or 'jsonl'
+            days: Only entries from the last days (0 for all)
+            chunk_size: Records per yielded chunk
+
+        Yields:
+            UTF-8 encoded chunks
+        """
+        return stream_records(self._export_source('scan_history', days), export_format, chunk_size)
+
+    def export_parquet(self, destination: Any, dataset: str = "medicines", days: int = 0,
+                       row_group_size: int = 10000) -> bool:
+        """
+        Write medicines or scan history to a Parquet file (requires pyarrow)
+
+        Args:
+            destination: File path or writable binary file object
+            dataset: 'medicines' or 'scan_history'
+            days: Scan history only: entries from the last days (0 for all)
+            row_group_size: Rows per row group
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            rows = write_parquet(self._export_source(dataset, days), destination, row_group_size)
+            logger.info(f"Exported {rows} {dataset} rows to Parquet")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error exporting {dataset} to Parquet: {e}")
+            return False
 
     def get_all_medicines(self) -> List[Dict]:
         """Get all medicines (alias for load_medicines for compatibility)"""
         return self.load_medicines()
+
+    def close(self):
+        """Flush pending writes and release the store"""
+        self._store.close()
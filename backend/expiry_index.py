@@ -0,0 +1,143 @@
+"""
+Expiry Index Module for MediScan
+Sorted index of saved medicines by expiry date
+"""
+
+import bisect
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+import logging
+
+try:
+    from .medicine_store import parse_expiry_date
+except ImportError:
+    from medicine_store import parse_expiry_date
+
+logger = logging.getLogger(__name__)
+
+
+def _day_offset(now: datetime) -> int:
+    """
+    Offset between the calendar date and days_until_expiry
+
+    days_until_expiry is (expiry midnight - now).days, which is one less
+    than the calendar difference at any time after midnight.
+    """
+    return 0 if now.time() == datetime.min.time() else 1
+
+
+class ExpiryIndex:
+    """
+    Medicines ordered by expiry date
+
+    Expiry dates are parsed once, when a medicine is added, into date
+    ordinals kept in a sorted list of (ordinal, id) pairs. Expired and
+    expiring-within-N-days queries are two binary searches plus a slice,
+    O(log n + k), with no date parsing at query time. Medicines without
+    a readable expiry date are not indexed.
+    """
+
+    def __init__(self):
+        """Initialize an empty index"""
+        self._entries: List[Tuple[int, str]] = []
+        self._ordinals: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, medicine_id: str, medicine: Dict[str, Any]):
+        """Index a medicine (replacing any previous entry with the same id)"""
+        self.remove(medicine_id)
+
+        expiry_dt = parse_expiry_date(medicine.get('expiry_date'))
+        if expiry_dt is None:
+            return
+
+        ordinal = expiry_dt.toordinal()
+        self._ordinals[medicine_id] = ordinal
+        bisect.insort(self._entries, (ordinal, medicine_id))
+
+    def remove(self, medicine_id: str):
+        """Remove a medicine from the index"""
+        ordinal = self._ordinals.pop(medicine_id, None)
+        if ordinal is None:
+            return
+
+        position = bisect.bisect_left(self._entries, (ordinal, medicine_id))
+        if position < len(self._entries) and self._entries[position] == (ordinal, medicine_id):
+            del self._entries[position]
+
+    def rebuild(self, medicines: List[Dict[str, Any]]):
+        """Rebuild the index from a list of medicines"""
+        self._ordinals.clear()
+        for medicine in medicines:
+            expiry_dt = parse_expiry_date(medicine.get('expiry_date')) if medicine.get('id') else None
+            if expiry_dt is not None:
+                self._ordinals[medicine['id']] = expiry_dt.toordinal()
+
+        self._entries = sorted((ordinal, medicine_id) for medicine_id, ordinal in self._ordinals.items())
+
+    def _position(self, ordinal: int) -> int:
+        """First entry with an expiry ordinal >= ordinal"""
+        return bisect.bisect_left(self._entries, (ordinal, ''))
+
+    def _bounds(self, days_ahead: int, now: Optional[datetime]) -> Tuple[int, int]:
+        """Entry positions where unexpired and beyond-days_ahead medicines start"""
+        now = now or datetime.now()
+        first_valid = now.toordinal() + _day_offset(now)
+        return self._position(first_valid), self._position(first_valid + days_ahead + 1)
+
+    def expired(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        Ids of expired medicines (days_until_expiry < 0), earliest first
+
+        Args:
+            now: Reference time (defaults to now)
+
+        Returns:
+            List of medicine ids
+        """
+        start, _ = self._bounds(0, now)
+        return [medicine_id for _, medicine_id in self._entries[:start]]
+
+    def expiring(self, days_ahead: int, now: Optional[datetime] = None) -> List[str]:
+        """
+        Ids of medicines with 0 <= days_until_expiry <= days_ahead, soonest first
+
+        Args:
+            days_ahead: Number of days to look ahead
+            now: Reference time (defaults to now)
+
+        Returns:
+            List of medicine ids
+        """
+        start, end = self._bounds(days_ahead, now)
+        return [medicine_id for _, medicine_id in self._entries[start:end]]
+
+    def within(self, min_days: Optional[int] = None, max_days: Optional[int] = None,
+               now: Optional[datetime] = None) -> List[str]:
+        """
+        Ids of medicines with min_days <= days_until_expiry <= max_days, soonest first
+
+        Args:
+            min_days: Lower bound (None for no bound)
+            max_days: Upper bound (None for no bound)
+            now: Reference time (defaults to now)
+
+        Returns:
+            List of medicine ids
+        """
+        now = now or datetime.now()
+        first_valid = now.toordinal() + _day_offset(now)
+        start = self._position(first_valid + min_days) if min_days is not None else 0
+        end = self._position(first_valid + max_days + 1) if max_days is not None else len(self._entries)
+        return [medicine_id for _, medicine_id in self._entries[start:end]]
+
+    def count_expired(self, now: Optional[datetime] = None) -> int:
+        """Number of expired medicines, O(log n)"""
+        return self._bounds(0, now)[0]
+
+    def count_expiring(self, days_ahead: int, now: Optional[datetime] = None) -> int:
+        """Number of medicines expiring within days_ahead, O(log n)"""
+        start, end = self._bounds(days_ahead, now)
+        return end - start
@@ -0,0 +1,240 @@
+"""
+Export Engine Module for MediScan
+Streams records to CSV, JSONL and Parquet without materializing them
+"""
+
+import csv
+import io
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+# MIME type per export format (parquet via write_parquet)
+EXPORT_MIME_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Records encoded per yielded chunk
+DEFAULT_CHUNK_SIZE = 500
+
+# A record source is called once per pass and returns a fresh iterator
+RecordSource = Callable[[], Iterable[Dict]]
+
+
+def _cell(value: Any) -> Any:
+    """CSV cell for a field value (nested values as JSON, None as empty)"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def discover_columns(records: Iterable[Dict]) -> List[str]:
+    """
+    Union of the records' keys in first-seen order
+
+    Args:
+        records: Records to scan
+
+    Returns:
+        Column names
+    """
+    columns: Dict[str, None] = {}
+    for record in records:
+        for key in record:
+            if key not in columns:
+                columns[key] = None
+    return list(columns)
+
+
+def stream_csv(source: RecordSource, chunk_size: int = DEFAULT_CHUNK_SIZE,
+               header_source: Optional[RecordSource] = None) -> Iterator[bytes]:
+    """
+    Encode records as CSV, chunk_size rows at a time
+
+    Two passes: the first collects the header, the second writes rows.
+    Only one chunk of rows is held in memory. Fields that appear only
+    after the header pass are dropped.
+
+    Args:
+        source: Record source
+        chunk_size: Rows per yielded chunk
+        header_source: Cheaper source with the same keys, scanned for the
+            header instead of source
+
+    Yields:
+        UTF-8 encoded CSV chunks, the first one starting with the header
+    """
+    columns = discover_columns((header_source or source)())
+    if not columns:
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    rows = 0
+
+    for record in source():
+        writer.writerow({key: _cell(value) for key, value in record.items()})
+        rows += 1
+        if rows % chunk_size == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def stream_jsonl(source: RecordSource, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Encode records as JSON lines, chunk_size records at a time
+
+    Args:
+        source: Record source
+        chunk_size: Records per yielded chunk
+
+    Yields:
+        UTF-8 encoded JSONL chunks
+    """
+    lines = []
+    for record in source():
+        lines.append(json.dumps(record, default=str))
+        if len(lines) == chunk_size:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def stream_records(source: RecordSource, export_format: str = 'csv', chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   header_source: Optional[RecordSource] = None) -> Iterator[bytes]:
+    """
+    Encode records in an export format
+
+    Args:
+        source: Record source
+        export_format: One of EXPORT_FORMATS
+        chunk_size: Records per yielded chunk
+        header_source: CSV only, see stream_csv
+
+    Yields:
+        UTF-8 encoded chunks
+    """
+    if export_format == 'csv':
+        return stream_csv(source, chunk_size, header_source)
+    if export_format == 'jsonl':
+        return stream_jsonl(source, chunk_size)
+    raise ValueError(f"Unknown export format: {export_format}")
+
+
+def _arrow_type(values: Iterable[Any]):
+    """Narrowest Arrow type for a column's non-null values"""
+    kinds = {type(value) for value in values}
+    if kinds == {bool}:
+        return pa.bool_()
+    if kinds == {int}:
+        return pa.int64()
+    if kinds and kinds <= {int, float}:
+        return pa.float64()
+    return pa.string()
+
+
+def infer_schema(records: Iterable[Dict]):
+    """
+    Arrow schema for records: int64, float64 or bool where every value of a
+    column has that type, string otherwise (nested values as JSON)
+
+    Args:
+        records: Records to scan
+
+    Returns:
+        pyarrow.Schema (None if there are no records)
+    """
+    kinds: Dict[str, set] = {}
+    for record in records:
+        for key, value in record.items():
+            seen = kinds.setdefault(key, set())
+            if value is not None and len(seen) < 3:
+                seen.add(type(value))
+
+    if not kinds:
+        return None
+    return pa.schema([(name, _arrow_type(types)) for name, types in kinds.items()])
+
+
+def _column_value(value: Any, arrow_type) -> Any:
+    """Coerce a value to its column type"""
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type):
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, default=str)
+        return str(value)
+    if pa.types.is_floating(arrow_type):
+        return float(value)
+    return value
+
+
+def write_parquet(source: RecordSource, destination: Any, row_group_size: int = 10000) -> int:
+    """
+    Write records to a Parquet file one row group at a time
+
+    Two passes over the source: the first infers the schema, the second
+    writes rows. Only one row group is held in memory.
+
+    Args:
+        source: Record source
+        destination: File path or writable binary file object
+        row_group_size: Rows per row group
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow is required for Parquet export")
+
+    schema = infer_schema(source())
+    if schema is None:
+        return 0
+
+    rows = 0
+    with pq.ParquetWriter(destination, schema) as writer:
+        batch: List[Dict] = []
+        for record in source():
+            batch.append(record)
+            if len(batch) == row_group_size:
+                writer.write_table(_table(batch, schema))
+                rows += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(_table(batch, schema))
+            rows += len(batch)
+    return rows
+
+
+def _table(records: List[Dict], schema):
+    """Arrow table of records, columns coerced to the schema"""
+    columns = {
+        field.name: [_column_value(record.get(field.name), field.type) for record in records]
+        for field in schema
+    }
+    return pa.Table.from_pydict(columns, schema=schema)
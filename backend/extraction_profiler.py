@@ -0,0 +1,140 @@
+"""
+Extraction Profiler Module for MediScan
+Records per-field, per-pattern regex telemetry for the extraction pipeline
+"""
+
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ExtractionProfiler:
+    """
+    Opt-in profiler for the regex patterns used by MedicineExtractor and
+    OCRProcessor.structure_text
+
+    For every (field, pattern) pair it records the number of calls, the
+    number of calls that matched and the cumulative matching time across
+    all extractions. Components only route their searches through the
+    profiler while profiling is enabled, so the normal path is unaffected.
+    """
+
+    def __init__(self):
+        """Initialize an empty profiler"""
+        self._lock = threading.Lock()
+        # (field, pattern) -> [calls, hits, total_seconds]
+        self._stats: Dict[tuple, List] = {}
+        self.started_at = datetime.now().isoformat()
+
+    def search(self, field: str, pattern: str, text: str, flags: int = 0) -> Optional[re.Match]:
+        """
+        Run re.search and record its outcome
+
+        Args:
+            field: Field the pattern extracts (e.g. 'extractor.dosage')
+            pattern: Regular expression pattern
+            text: Text to search
+            flags: Regex flags
+
+        Returns:
+            The match object, or None
+        """
+        start = time.perf_counter()
+        match = re.search(pattern, text, flags)
+        elapsed = time.perf_counter() - start
+
+        self.record(field, pattern, match is not None, elapsed)
+        return match
+
+    def record(self, field: str, pattern: str, hit: bool, elapsed: float):
+        """Record a single pattern evaluation"""
+        key = (field, pattern)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = [0, 0, 0.0]
+            entry[0] += 1
+            if hit:
+                entry[1] += 1
+            entry[2] += elapsed
+
+    def reset(self):
+        """Discard all recorded telemetry"""
+        with self._lock:
+            self._stats.clear()
+            self.started_at = datetime.now().isoformat()
+
+    def get_report(self, top_n: int = 10) -> Dict[str, Any]:
+        """
+        Build a profiling report
+
+        Args:
+            top_n: Number of slowest patterns to list
+
+        Returns:
+            Dictionary with per-field pattern stats, never-matching patterns
+            and the slowest patterns by cumulative time
+        """
+        with self._lock:
+            snapshot = {key: list(value) for key, value in self._stats.items()}
+
+        fields: Dict[str, Dict[str, Any]] = {}
+        patterns = []
+
+        for (field, pattern), (calls, hits, total) in snapshot.items():
+            pattern_stats = {
+                'field': field,
+                'pattern': pattern,
+                'calls': calls,
+                'hits': hits,
+                'hit_rate': round(hits / calls, 3) if calls else 0.0,
+                'total_ms': round(total * 1000, 3),
+                'mean_us': round(total / calls * 1e6, 2) if calls else 0.0
+            }
+            patterns.append(pattern_stats)
+
+            field_stats = fields.setdefault(field, {'calls': 0, 'hits': 0, 'total_ms': 0.0, 'patterns': []})
+            field_stats['calls'] += calls
+            field_stats['hits'] += hits
+            field_stats['total_ms'] = round(field_stats['total_ms'] + pattern_stats['total_ms'], 3)
+            field_stats['patterns'].append(pattern_stats)
+
+        slowest = sorted(patterns, key=lambda p: p['total_ms'], reverse=True)[:top_n]
+        dead = [p for p in patterns if p['calls'] > 0 and p['hits'] == 0]
+
+        return {
+            'started_at': self.started_at,
+            'generated_at': datetime.now().isoformat(),
+            'total_calls': sum(p['calls'] for p in patterns),
+            'total_ms': round(sum(p['total_ms'] for p in patterns), 3),
+            'fields': fields,
+            'dead_patterns': dead,
+            'slowest_patterns': slowest
+        }
+
+    def export_report(self, report_path: str, top_n: int = 10) -> bool:
+        """
+        Write the profiling report to a JSON file
+
+        Args:
+            report_path: Destination file path
+            top_n: Number of slowest patterns to list
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            with open(report_path, 'w') as f:
+                json.dump(self.get_report(top_n), f, indent=2)
+
+            logger.info(f"Extraction profile exported: {report_path}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error exporting extraction profile: {e}")
+            return False
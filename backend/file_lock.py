@@ -0,0 +1,159 @@
+"""
+File Lock Module for MediScan
+Reader/writer locking of a data directory across processes
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Lock file created in every locked data directory
+LOCK_FILE = ".mediscan.lock"
+
+SHARED = 'shared'
+EXCLUSIVE = 'exclusive'
+
+
+class FileLock:
+    """
+    Shared/exclusive lock on a lock file, honoured by every process
+
+    Uses flock(2): any number of shared holders, or one exclusive holder,
+    across all processes and threads. Each acquisition opens its own file
+    descriptor, so threads of one process exclude each other the same way
+    separate processes do.
+
+    Acquisition is re-entrant per thread: a shared or exclusive request
+    while the thread already holds the exclusive lock, or a shared request
+    while it holds the shared lock, succeeds at once. Upgrading a held
+    shared lock to exclusive raises RuntimeError, as it would deadlock
+    against another upgrading reader.
+
+    Without fcntl (Windows) both modes fall back to one in-process lock,
+    which does not protect against other processes.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the lock
+
+        Args:
+            path: Lock file (created on first use)
+        """
+        self.path = path
+        self._local = threading.local()
+        self._fallback = threading.RLock()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {'shared': 0, 'exclusive': 0, 'contended': 0, 'wait_seconds': 0.0}
+
+        if fcntl is None:
+            logger.warning("fcntl unavailable; data directory locking is per process only")
+
+    @contextmanager
+    def shared(self):
+        """Hold the lock in shared (read) mode"""
+        with self._acquire(SHARED):
+            yield
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the lock in exclusive (write) mode"""
+        with self._acquire(EXCLUSIVE):
+            yield
+
+    def held(self) -> Any:
+        """Mode held by the calling thread (SHARED, EXCLUSIVE or None)"""
+        return getattr(self._local, 'mode', None)
+
+    @contextmanager
+    def _acquire(self, mode: str):
+        """Acquire the lock unless this thread already holds a sufficient mode"""
+        held = self.held()
+        if held is not None:
+            if held == SHARED and mode == EXCLUSIVE:
+                raise RuntimeError(f"Cannot upgrade shared lock on {self.path} to exclusive")
+            yield
+            return
+
+        if fcntl is None:
+            with self._fallback:
+                self._local.mode = mode
+                try:
+                    yield
+                finally:
+                    self._local.mode = None
+            return
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            operation = fcntl.LOCK_SH if mode == SHARED else fcntl.LOCK_EX
+            waited = 0.0
+            try:
+                fcntl.flock(fd, operation | fcntl.LOCK_NB)
+            except BlockingIOError:
+                start = time.perf_counter()
+                fcntl.flock(fd, operation)
+                waited = time.perf_counter() - start
+
+            with self._stats_lock:
+                self._stats[mode] += 1
+                if waited:
+                    self._stats['contended'] += 1
+                    self._stats['wait_seconds'] += waited
+
+            self._local.mode = mode
+            try:
+                yield
+            finally:
+                self._local.mode = None
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get lock statistics for this process
+
+        Returns:
+            Dictionary with shared and exclusive acquisitions, how many of
+            them had to wait, and the total wait in seconds
+        """
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+_locks: Dict[str, FileLock] = {}
+_locks_lock = threading.Lock()
+
+
+def get_file_lock(directory: str) -> FileLock:
+    """
+    Shared FileLock for a data directory
+
+    Every component of a process locking the same directory gets the same
+    object, so nested acquisitions by one thread are recognised as
+    re-entrant instead of deadlocking on a second file descriptor.
+
+    Args:
+        directory: Data directory (must exist)
+
+    Returns:
+        FileLock on the directory's lock file
+    """
+    path = os.path.abspath(os.path.join(directory, LOCK_FILE))
+    with _locks_lock:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = FileLock(path)
+        return lock
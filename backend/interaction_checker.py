@@ -0,0 +1,199 @@
+"""
+Interaction Checker Module for MediScan
+Warns when a medicine interacts with medicines already in the user's cabinet
+"""
+
+import csv
+import os
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple, Any
+import logging
+
+try:
+    from .medicine_catalog import MedicineCatalog
+except ImportError:
+    from medicine_catalog import MedicineCatalog
+
+logger = logging.getLogger(__name__)
+
+# Severity ordering used to sort warnings (most serious first)
+SEVERITY_RANK = {'major': 0, 'moderate': 1, 'minor': 2}
+
+class InteractionChecker:
+    """
+    Checks drug-drug interactions against a local interaction table
+
+    Medicine names are normalized to generic names through the catalog in
+    dataset/medicines.csv, and interactions are indexed by a hashed,
+    order-independent pair key. Checking a medicine against a cabinet of k
+    medicines therefore costs k dictionary lookups, independent of the size
+    of the interaction table.
+    """
+
+    def __init__(self, interactions_file: str = "dataset/drug_interactions.csv",
+                 catalog_file: str = "dataset/medicines.csv",
+                 catalog: Optional[MedicineCatalog] = None):
+        """
+        Initialize the interaction checker
+
+        Args:
+            interactions_file: CSV file with drug_a, drug_b, severity, description
+            catalog_file: Medicine catalog CSV providing the generic_name column
+            catalog: Already loaded MedicineCatalog (overrides catalog_file)
+        """
+        self.interactions_file = interactions_file
+        self.catalog = catalog if catalog is not None else MedicineCatalog(catalog_file)
+
+        # (generic_a, generic_b) sorted pair -> interaction details
+        self._pairs: Dict[Tuple[str, str], Dict[str, str]] = {}
+        # generics that appear in at least one interaction
+        self._interacting: set = set()
+
+        self._load_interactions()
+
+    def _load_interactions(self):
+        """Load the interaction table into the pair index"""
+        if not os.path.exists(self.interactions_file):
+            logger.warning(f"Interaction table not found: {self.interactions_file}")
+            return
+
+        try:
+            with open(self.interactions_file, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.DictReader(f):
+                    self.add_interaction(
+                        row.get('drug_a', ''),
+                        row.get('drug_b', ''),
+                        row.get('severity', 'moderate'),
+                        row.get('description', '')
+                    )
+
+            logger.info(f"Loaded {len(self._pairs)} drug interactions")
+
+        except Exception as e:
+            logger.error(f"Error loading interaction table: {e}")
+
+    def _pair_key(self, generic_a: str, generic_b: str) -> Tuple[str, str]:
+        """Order-independent key for a pair of generics"""
+        return (generic_a, generic_b) if generic_a <= generic_b else (generic_b, generic_a)
+
+    def get_generic_name(self, name: Optional[str]) -> Optional[str]:
+        """Resolve a medicine name to its normalized generic name"""
+        return self.catalog.get_generic_name(name)
+
+    def _medicine_generic(self, medicine: Any) -> Optional[str]:
+        """Generic name for a medicine record (dict or Medicine) or a plain name"""
+        if isinstance(medicine, Mapping):
+            return self.get_generic_name(medicine.get('generic_name') or medicine.get('name'))
+        return self.get_generic_name(medicine)
+
+    def add_interaction(self, drug_a: str, drug_b: str, severity: str = "moderate",
+                        description: str = "") -> bool:
+        """
+        Add an interaction to the index
+
+        Args:
+            drug_a: First medicine (brand or generic)
+            drug_b: Second medicine (brand or generic)
+            severity: major, moderate or minor
+            description: Human readable explanation
+
+        Returns:
+            True if added, False if either name is empty
+        """
+        generic_a = self.get_generic_name(drug_a)
+        generic_b = self.get_generic_name(drug_b)
+        if not generic_a or not generic_b or generic_a == generic_b:
+            return False
+
+        self._pairs[self._pair_key(generic_a, generic_b)] = {
+            'severity': (severity or 'moderate').strip().lower(),
+            'description': (description or '').strip()
+        }
+        self._interacting.add(generic_a)
+        self._interacting.add(generic_b)
+        return True
+
+    def check_pair(self, medicine_a: Any, medicine_b: Any) -> Optional[Dict[str, str]]:
+        """
+        Look up the interaction between two medicines
+
+        Args:
+            medicine_a: Medicine dict or name
+            medicine_b: Medicine dict or name
+
+        Returns:
+            Interaction details, or None if no interaction is known
+        """
+        generic_a = self._medicine_generic(medicine_a)
+        generic_b = self._medicine_generic(medicine_b)
+        if not generic_a or not generic_b or generic_a == generic_b:
+            return None
+
+        return self._pairs.get(self._pair_key(generic_a, generic_b))
+
+    def has_interactions(self, medicine: Any) -> bool:
+        """True if the medicine appears in at least one known interaction"""
+        generic = self._medicine_generic(medicine)
+        return bool(generic) and generic in self._interacting
+
+    def check_against_cabinet(self, medicine: Any, cabinet: List[Dict]) -> List[Dict[str, Any]]:
+        """
+        Check a medicine against every medicine in a cabinet
+
+        Args:
+            medicine: New medicine dict or name
+            cabinet: Saved medicine dictionaries
+
+        Returns:
+            List of interaction warnings, most severe first
+        """
+        generic = self._medicine_generic(medicine)
+        if not generic or generic not in self._interacting:
+            return []
+
+        medicine_name = medicine.get('name') if isinstance(medicine, Mapping) else medicine
+        warnings = []
+        seen = set()
+
+        for other in cabinet:
+            other_generic = self._medicine_generic(other)
+            if not other_generic or other_generic == generic or other_generic in seen:
+                continue
+
+            interaction = self._pairs.get(self._pair_key(generic, other_generic))
+            if interaction:
+                seen.add(other_generic)
+                warnings.append({
+                    'medicine': medicine_name,
+                    'interacts_with': other.get('name'),
+                    'interacts_with_id': other.get('id'),
+                    'generics': [generic, other_generic],
+                    'severity': interaction['severity'],
+                    'description': interaction['description']
+                })
+
+        return sorted(warnings, key=lambda w: SEVERITY_RANK.get(w['severity'], len(SEVERITY_RANK)))
+
+    def check_medicines(self, medicines: List[Dict]) -> List[Dict[str, Any]]:
+        """
+        Check a group of medicines (e.g. one prescription) against each other
+
+        Args:
+            medicines: Medicine dictionaries
+
+        Returns:
+            List of interaction warnings, most severe first
+        """
+        warnings = []
+        for i, medicine in enumerate(medicines):
+            warnings.extend(self.check_against_cabinet(medicine, medicines[i + 1:]))
+
+        return sorted(warnings, key=lambda w: SEVERITY_RANK.get(w['severity'], len(SEVERITY_RANK)))
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get interaction index statistics"""
+        return {
+            'interactions': len(self._pairs),
+            'interacting_generics': len(self._interacting),
+            'catalog_rows': self.catalog.row_count
+        }
@@ -0,0 +1,286 @@
+"""
+Medicine Catalog Module for MediScan
+Loads the reference catalog (dataset/medicines.csv) and enriches scan results
+"""
+
+import csv
+import os
+import re
+from array import array
+from typing import Dict, List, Optional, Tuple, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Catalog columns kept in memory
+CATALOG_COLUMNS = [
+    'medicine_name', 'generic_name', 'category', 'manufacturer', 'expiry_date',
+    'batch_number', 'dosage_form', 'strength', 'storage_instructions', 'warnings'
+]
+
+# Medicine field -> catalog column, filled for any catalog match
+PRODUCT_FIELDS = {
+    'generic_name': 'generic_name',
+    'category': 'category',
+    'storage_instructions': 'storage_instructions',
+    'warnings': 'warnings',
+}
+
+# Fields that only describe the exact pack, filled on batch number matches only
+BATCH_FIELDS = {
+    'manufacturer': 'manufacturer',
+    'form': 'dosage_form',
+    'dosage': 'strength',
+    'expiry_date': 'expiry_date',
+}
+
+
+def normalize_medicine_name(name: Optional[str]) -> str:
+    """Lowercase a medicine name and strip strengths, units and punctuation"""
+    if not name:
+        return ""
+
+    cleaned = re.sub(r'\d+(?:\.\d+)?\s*(?:mg|ml|g|mcg|units?|iu|%)?', ' ', str(name).lower())
+    cleaned = re.sub(r'[^a-z\s]', ' ', cleaned)
+    return ' '.join(cleaned.split())
+
+
+def _is_empty(value: Any) -> bool:
+    """True for None, blank strings and empty lists"""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    if isinstance(value, (list, tuple, dict)):
+        return len(value) == 0
+    return False
+
+
+class MedicineCatalog:
+    """
+    Read-only medicine reference catalog
+
+    The CSV is loaded once into dictionary-encoded columns: every column
+    keeps one list of distinct values plus a compact array of per-row
+    codes, so repeated manufacturers, categories and storage texts are
+    stored once. Hash indexes on batch number, exact name and normalized
+    name make each lookup O(1).
+    """
+
+    def __init__(self, catalog_file: str = "dataset/medicines.csv"):
+        """
+        Initialize the catalog
+
+        Args:
+            catalog_file: Path to the catalog CSV
+        """
+        self.catalog_file = catalog_file
+        self.row_count = 0
+
+        # column -> distinct values, column -> per-row codes into those values
+        self._values: Dict[str, List[str]] = {column: [] for column in CATALOG_COLUMNS}
+        self._codes: Dict[str, array] = {column: array('I') for column in CATALOG_COLUMNS}
+
+        self._by_batch: Dict[str, int] = {}
+        self._by_name: Dict[str, int] = {}
+        self._by_normalized_name: Dict[str, int] = {}
+        # normalized brand or generic name -> normalized generic name
+        self._generic_names: Dict[str, str] = {}
+
+        self._load()
+
+    def _load(self):
+        """Load the catalog CSV into columns and build the lookup indexes"""
+        if not os.path.exists(self.catalog_file):
+            logger.warning(f"Medicine catalog not found: {self.catalog_file}")
+            return
+
+        try:
+            value_codes = {column: {} for column in CATALOG_COLUMNS}
+
+            with open(self.catalog_file, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.DictReader(f):
+                    row_index = self.row_count
+
+                    for column in CATALOG_COLUMNS:
+                        value = (row.get(column) or '').strip()
+                        code = value_codes[column].get(value)
+                        if code is None:
+                            code = value_codes[column][value] = len(self._values[column])
+                            self._values[column].append(value)
+                        self._codes[column].append(code)
+
+                    self._index_row(row_index)
+                    self.row_count += 1
+
+            logger.info(f"Loaded {self.row_count} catalog medicines")
+
+        except Exception as e:
+            logger.error(f"Error loading medicine catalog: {e}")
+
+    def _index_row(self, row_index: int):
+        """Add a loaded row to the lookup indexes (first occurrence wins)"""
+        name = self._get(row_index, 'medicine_name')
+        generic = normalize_medicine_name(self._get(row_index, 'generic_name'))
+        batch = self._get(row_index, 'batch_number')
+
+        if batch:
+            self._by_batch.setdefault(batch.upper(), row_index)
+        if name:
+            self._by_name.setdefault(name.lower(), row_index)
+
+        normalized = normalize_medicine_name(name)
+        if normalized:
+            self._by_normalized_name.setdefault(normalized, row_index)
+        if generic:
+            self._by_normalized_name.setdefault(generic, row_index)
+            self._generic_names.setdefault(generic, generic)
+            if normalized:
+                self._generic_names.setdefault(normalized, generic)
+
+    def _get(self, row_index: int, column: str) -> str:
+        """Decode one cell"""
+        return self._values[column][self._codes[column][row_index]]
+
+    def get_row(self, row_index: int) -> Dict[str, str]:
+        """
+        Materialize a catalog row
+
+        Args:
+            row_index: Row number
+
+        Returns:
+            Dictionary of column values
+        """
+        return {column: self._get(row_index, column) for column in CATALOG_COLUMNS}
+
+    def get_generic_name(self, name: Optional[str]) -> Optional[str]:
+        """
+        Resolve a medicine name to its normalized generic name
+
+        Args:
+            name: Brand or generic medicine name as printed or extracted
+
+        Returns:
+            Normalized generic name (the normalized input if unknown), or None
+        """
+        normalized = normalize_medicine_name(name)
+        if not normalized:
+            return None
+
+        generic = self._generic_names.get(normalized)
+        if generic:
+            return generic
+
+        # Labels often carry extra words ("Paracetamol Tablets IP")
+        first_word = normalized.split()[0]
+        return self._generic_names.get(first_word, normalized)
+
+    def lookup(self, medicine: Dict[str, Any]) -> Optional[Tuple[int, str]]:
+        """
+        Find the catalog row for an extracted medicine
+
+        Tries batch number, then exact name, then normalized name.
+
+        Args:
+            medicine: Extracted medicine dictionary
+
+        Returns:
+            Tuple of (row index, matched key) or None
+        """
+        batch = medicine.get('batch_no')
+        if batch:
+            row_index = self._by_batch.get(str(batch).strip().upper())
+            if row_index is not None:
+                return row_index, 'batch_no'
+
+        name = medicine.get('name')
+        if not name:
+            return None
+
+        row_index = self._by_name.get(str(name).strip().lower())
+        if row_index is not None:
+            return row_index, 'name'
+
+        normalized = normalize_medicine_name(name)
+        if normalized:
+            row_index = self._by_normalized_name.get(normalized)
+            if row_index is None:
+                row_index = self._by_normalized_name.get(normalized.split()[0])
+            if row_index is not None:
+                return row_index, 'normalized_name'
+
+        return None
+
+    def enrich_medicine(self, medicine: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fill empty fields of an extracted medicine from the catalog
+
+        Filled fields are listed under medicine['enrichment'] together with
+        the key the catalog match was made on. Fields already present are
+        never overwritten.
+
+        Args:
+            medicine: Extracted medicine dictionary (updated in place)
+
+        Returns:
+            The same medicine dictionary
+        """
+        match = self.lookup(medicine)
+        if match is None:
+            return medicine
+
+        row_index, matched_on = match
+        field_map = dict(PRODUCT_FIELDS)
+        if matched_on == 'batch_no':
+            field_map.update(BATCH_FIELDS)
+
+        filled = []
+        for field, column in field_map.items():
+            if not _is_empty(medicine.get(field)):
+                continue
+
+            value = self._get(row_index, column)
+            if not value:
+                continue
+
+            medicine[field] = [value] if field == 'warnings' else value
+            filled.append(field)
+
+        if filled:
+            medicine['enrichment'] = {
+                'source': 'catalog',
+                'matched_on': matched_on,
+                'catalog_name': self._get(row_index, 'medicine_name'),
+                'fields': filled
+            }
+
+        return medicine
+
+    def enrich_result(self, extraction_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Enrich every medicine of a MedicineExtractor result
+
+        Args:
+            extraction_result: Result of MedicineExtractor.extract_medicines
+
+        Returns:
+            The same result with medicines enriched in place
+        """
+        try:
+            for medicine in extraction_result.get('medicines', []):
+                self.enrich_medicine(medicine)
+        except Exception as e:
+            logger.error(f"Error enriching medicines: {e}")
+
+        return extraction_result
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get catalog statistics"""
+        return {
+            'rows': self.row_count,
+            'distinct_values': sum(len(values) for values in self._values.values()),
+            'batch_keys': len(self._by_batch),
+            'name_keys': len(self._by_name),
+            'normalized_name_keys': len(self._by_normalized_name)
+        }
@@ -4,19 +4,38 @@ Extracts structured medicine information from OCR text
 """
 
 import re
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import logging
 
+try:
+    from .extraction_profiler import ExtractionProfiler
+except ImportError:
+    from extraction_profiler import ExtractionProfiler
+
 logger = logging.getLogger(__name__)
 
+# Bump whenever extraction rules change so cached results are discarded
+EXTRACTOR_VERSION = "1.0.0"
+
 class MedicineExtractor:
     """
     Extracts structured medicine information from OCR text
     """
 
-    def __init__(self):
-        """Initialize the medicine extractor"""
+    def __init__(self, cache_size: int = 128):
+        """
+        Initialize the medicine extractor
+
+        Args:
+            cache_size: Maximum number of extraction results kept in the
+                LRU cache (0 disables caching)
+        """
         # Common medicine forms
         self.medicine_forms = [
             'tablet', 'capsule', 'syrup', 'injection', 'cream', 'ointment',
@@ -26,10 +45,23 @@ class MedicineExtractor:
         # Common dosage units
         self.dosage_units = ['mg', 'ml', 'g', 'mcg', 'units', 'iu', '%']
 
+        # Extraction result cache (LRU, keyed by normalized input)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_fingerprint = self._rules_fingerprint()
+        self._cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+        # Optional pattern profiler (see enable_profiling)
+        self.profiler: Optional[ExtractionProfiler] = None
+
     def extract_medicines(self, ocr_result: Dict[str, Any], scan_type: str = "Medicine Label") -> Dict[str, Any]:
         """
         Extract medicines from OCR results
 
+        Results are memoized on the normalized OCR text, the structured data
+        and the scan type, so re-running the same scan skips extraction.
+
         Args:
             ocr_result: OCR processing result
             scan_type: Type of scan (Medicine Label, Prescription, etc.)
@@ -38,21 +70,145 @@ class MedicineExtractor:
             Dictionary with extracted medicine information
         """
         try:
-            text = ocr_result.get('text', '')
+            text = self._normalize_ocr_text(ocr_result.get('text', ''))
             structured_data = ocr_result.get('structured_data', {})
 
+            cache_key = self._cache_key(text, structured_data, scan_type)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+
             if scan_type.lower() == "medicine label":
-                return self._extract_from_label(text, structured_data)
+                result = self._extract_from_label(text, structured_data)
             elif "prescription" in scan_type.lower():
-                return self._extract_from_prescription(text, structured_data)
+                result = self._extract_from_prescription(text, structured_data)
             else:
                 # Default to label extraction
-                return self._extract_from_label(text, structured_data)
+                result = self._extract_from_label(text, structured_data)
+
+            self._cache_put(cache_key, result)
+            return result
 
         except Exception as e:
             logger.error(f"Error extracting medicines: {e}")
             return {'medicines': [], 'patient_info': {}, 'error': str(e)}
 
+    def _normalize_ocr_text(self, text: str) -> str:
+        """Normalize line endings and per-line whitespace of OCR text"""
+        if not text:
+            return ""
+
+        lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        return '\n'.join(line.strip() for line in lines)
+
+    def _rules_fingerprint(self) -> str:
+        """Fingerprint of the extraction rules, used to invalidate the cache"""
+        rules = [EXTRACTOR_VERSION, self.medicine_forms, self.dosage_units]
+        return hashlib.sha1(json.dumps(rules).encode('utf-8')).hexdigest()
+
+    def _cache_key(self, text: str, structured_data: Dict, scan_type: str) -> Optional[str]:
+        """Build the cache key for an extraction request"""
+        if self.cache_size <= 0:
+            return None
+
+        try:
+            payload = json.dumps(
+                [text, structured_data or {}, (scan_type or '').lower()],
+                sort_keys=True, default=str
+            )
+        except (TypeError, ValueError):
+            return None
+
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _check_cache_fingerprint(self):
+        """Drop cached results if the extraction rules have changed (lock held)"""
+        fingerprint = self._rules_fingerprint()
+        if fingerprint != self._cache_fingerprint:
+            if self._cache:
+                self._cache_stats['invalidations'] += 1
+                logger.info("Extraction rules changed, clearing extraction cache")
+            self._cache.clear()
+            self._cache_fingerprint = fingerprint
+
+    def _cache_get(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached extraction result, or None on a miss"""
+        if cache_key is None:
+            return None
+
+        with self._cache_lock:
+            self._check_cache_fingerprint()
+
+            cached = self._cache.get(cache_key)
+            if cached is None:
+                self._cache_stats['misses'] += 1
+                return None
+
+            self._cache.move_to_end(cache_key)
+            self._cache_stats['hits'] += 1
+
+        # Hand out a private copy so callers can't corrupt the cache
+        result = copy.deepcopy(cached)
+        if 'scan_info' in result:
+            result['scan_info']['processed_at'] = datetime.now().isoformat()
+        return result
+
+    def _cache_put(self, cache_key: Optional[str], result: Dict[str, Any]):
+        """Store an extraction result, evicting the least recently used entries"""
+        if cache_key is None or result.get('error'):
+            return
+
+        with self._cache_lock:
+            self._cache[cache_key] = copy.deepcopy(result)
+            self._cache.move_to_end(cache_key)
+
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self._cache_stats['evictions'] += 1
+
+    def clear_cache(self):
+        """Clear all cached extraction results"""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get extraction cache statistics"""
+        with self._cache_lock:
+            lookups = self._cache_stats['hits'] + self._cache_stats['misses']
+            return {
+                **self._cache_stats,
+                'size': len(self._cache),
+                'max_size': self.cache_size,
+                'hit_rate': round(self._cache_stats['hits'] / lookups, 3) if lookups else 0.0,
+                'extractor_version': EXTRACTOR_VERSION
+            }
+
+    def enable_profiling(self, profiler: Optional[ExtractionProfiler] = None) -> ExtractionProfiler:
+        """
+        Start recording per-pattern telemetry
+
+        Cached extractions do not evaluate any patterns, so only cache
+        misses contribute to the profile.
+
+        Args:
+            profiler: Profiler to record into (shared with OCRProcessor if given)
+
+        Returns:
+            The active profiler
+        """
+        self.profiler = profiler or ExtractionProfiler()
+        return self.profiler
+
+    def disable_profiling(self):
+        """Stop recording pattern telemetry"""
+        self.profiler = None
+
+    def _search(self, field: str, pattern: str, text: str, flags: int = re.IGNORECASE):
+        """re.search that reports to the profiler when profiling is enabled"""
+        if self.profiler is None:
+            return re.search(pattern, text, flags)
+        return self.profiler.search(f"extractor.{field}", pattern, text, flags)
+
     def _extract_from_label(self, text: str, structured_data: Dict = None) -> Dict[str, Any]:
         """
         Extract medicine information from a medicine label
@@ -138,7 +294,7 @@ class MedicineExtractor:
                 skip_words = ['tablet', 'capsule', 'syrup', 'mg', 'ml', 'manufactured', 'expires']
                 if not any(word in line.lower() for word in skip_words):
                     # Medicine names often have capital letters
-                    if re.search(r'[A-Z]', line):
+                    if self._search('name', r'[A-Z]', line, 0):
                         return self._clean_text(line)
 
         return None
@@ -156,7 +312,7 @@ class MedicineExtractor:
         ]
 
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = self._search('dosage', pattern, text, re.IGNORECASE)
             if match:
                 return match.group(1).strip()
 
@@ -184,7 +340,7 @@ class MedicineExtractor:
         ]
 
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = self._search('manufacturer', pattern, text, re.IGNORECASE)
             if match:
                 return self._clean_text(match.group(1))
 
@@ -202,7 +358,7 @@ class MedicineExtractor:
         ]
 
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = self._search('batch_no', pattern, text, re.IGNORECASE)
             if match:
                 return match.group(1).strip()
 
@@ -220,7 +376,7 @@ class MedicineExtractor:
         ]
 
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = self._search('expiry_date', pattern, text, re.IGNORECASE)
             if match:
                 return self._normalize_date(match.group(1).strip())
 
@@ -238,7 +394,7 @@ class MedicineExtractor:
         ]
 
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = self._search('mfg_date', pattern, text, re.IGNORECASE)
             if match:
                 return self._normalize_date(match.group(1).strip())
 
@@ -256,7 +412,7 @@ class MedicineExtractor:
         ]
 
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = self._search('quantity', pattern, text, re.IGNORECASE)
             if match:
                 return match.group(1).strip()
 
@@ -271,7 +427,7 @@ class MedicineExtractor:
         ]
 
         for pattern in instruction_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = self._search('instructions', pattern, text, re.IGNORECASE)
             if match:
                 return self._clean_text(match.group(0))
 
@@ -283,19 +439,19 @@ class MedicineExtractor:
 
         # Patient name
         name_pattern = r'(?:patient|name)[:\s]+([^\n]+)'
-        name_match = re.search(name_pattern, text, re.IGNORECASE)
+        name_match = self._search('patient_name', name_pattern, text, re.IGNORECASE)
         if name_match:
             patient_info['name'] = self._clean_text(name_match.group(1))
 
         # Age
         age_pattern = r'(?:age)[:\s]+(\d+)'
-        age_match = re.search(age_pattern, text, re.IGNORECASE)
+        age_match = self._search('patient_age', age_pattern, text, re.IGNORECASE)
         if age_match:
             patient_info['age'] = age_match.group(1)
 
         # Doctor name
         doctor_pattern = r'(?:dr|doctor)[:\s\.]+([^\n]+)'
-        doctor_match = re.search(doctor_pattern, text, re.IGNORECASE)
+        doctor_match = self._search('doctor', doctor_pattern, text, re.IGNORECASE)
         if doctor_match:
             patient_info['doctor'] = self._clean_text(doctor_match.group(1))
 
@@ -312,7 +468,7 @@ class MedicineExtractor:
                 # Check if line contains medicine indicators
                 if any(unit in line.lower() for unit in self.dosage_units):
                     medicine_lines.append(line)
-                elif re.search(r'\d+.*(?:times?|daily|twice|once)', line, re.IGNORECASE):
+                elif self._search('medicine_lines', r'\d+.*(?:times?|daily|twice|once)', line, re.IGNORECASE):
                     medicine_lines.append(line)
 
         return medicine_lines
@@ -333,7 +489,7 @@ class MedicineExtractor:
     def _extract_dosage_from_line(self, line: str) -> Optional[str]:
         """Extract dosage from a prescription line"""
         dosage_pattern = r'(\d+\.?\d*\s*(?:mg|ml|g|mcg|units?|iu|%))'
-        match = re.search(dosage_pattern, line, re.IGNORECASE)
+        match = self._search('line_dosage', dosage_pattern, line, re.IGNORECASE)
         return match.group(1).strip() if match else None
 
     def _extract_frequency(self, line: str) -> Optional[str]:
@@ -345,7 +501,7 @@ class MedicineExtractor:
         ]
 
         for pattern in frequency_patterns:
-            match = re.search(pattern, line, re.IGNORECASE)
+            match = self._search('frequency', pattern, line, re.IGNORECASE)
             if match:
                 return match.group(0).strip()
 
@@ -359,7 +515,7 @@ class MedicineExtractor:
         ]
 
         for pattern in duration_patterns:
-            match = re.search(pattern, line, re.IGNORECASE)
+            match = self._search('duration', pattern, line, re.IGNORECASE)
             if match:
                 return match.group(0).strip()
 
@@ -0,0 +1,240 @@
+"""
+Medicine Query Module for MediScan
+Composable medicine filters with sorting and cursor pagination
+"""
+
+import base64
+import copy
+import heapq
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sort orders; 'relevance' (best text match first) needs a text filter
+SORT_FIELDS = ('created_at', 'updated_at', 'name', 'manufacturer', 'form', 'expiry', 'relevance')
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class MedicineQuery:
+    """
+    Filters, sort order and page of a medicine query
+
+    Built by chaining; each method returns a new query, so a base query
+    can be kept and refined:
+
+        query = MedicineQuery().form('Tablet').expiring_within(30).order_by('expiry').limit(20)
+        page = handler.query_medicines(query)
+        next_page = handler.query_medicines(query.after(page['next_cursor']))
+
+    All filters must match. Text and expiry filters are answered from the
+    handler's search and expiry indexes; the rest are checked in the same
+    single pass that computes sort keys.
+
+    Pages are keyset-paginated: a cursor holds the sort key of the last
+    medicine returned, so saving or deleting medicines between pages
+    neither repeats nor skips the others.
+    """
+
+    def __init__(self):
+        """Initialize a query matching every medicine"""
+        self.form_name: Optional[str] = None
+        self.manufacturer_text: Optional[str] = None
+        self.scan_type_name: Optional[str] = None
+        self.text_query: Optional[str] = None
+        self.max_typos = 0
+        # Bounds on days_until_expiry (inclusive, None for open)
+        self.expiry_min_days: Optional[int] = None
+        self.expiry_max_days: Optional[int] = None
+        self.sort_field: Optional[str] = None
+        self.descending = False
+        self.page_size: Optional[int] = DEFAULT_PAGE_SIZE
+        self.cursor: Optional[str] = None
+
+    def _with(self, **changes) -> 'MedicineQuery':
+        """Copy of the query with attributes changed"""
+        query = copy.copy(self)
+        for name, value in changes.items():
+            setattr(query, name, value)
+        return query
+
+    # Filters
+
+    def form(self, form: Optional[str]) -> 'MedicineQuery':
+        """Only medicines of this form (case-insensitive; None clears)"""
+        return self._with(form_name=form or None)
+
+    def manufacturer(self, text: Optional[str]) -> 'MedicineQuery':
+        """Only medicines whose manufacturer contains text (case-insensitive)"""
+        return self._with(manufacturer_text=text or None)
+
+    def scan_type(self, scan_type: Optional[str]) -> 'MedicineQuery':
+        """Only medicines saved from this scan type, e.g. 'label' or 'prescription'"""
+        return self._with(scan_type_name=scan_type or None)
+
+    def text(self, query: Optional[str], max_typos: int = 0) -> 'MedicineQuery':
+        """
+        Only medicines matching a search query (see DatabaseHandler.search_medicines)
+
+        Args:
+            query: Search text (blank clears the filter)
+            max_typos: Allow words to match within this many edits (0 or 1)
+        """
+        query = query.strip() if query else ''
+        return self._with(text_query=query or None, max_typos=max_typos)
+
+    def expiry_window(self, min_days: Optional[int] = None, max_days: Optional[int] = None) -> 'MedicineQuery':
+        """
+        Only medicines with min_days <= days_until_expiry <= max_days
+
+        Args:
+            min_days: Lower bound (None for no bound)
+            max_days: Upper bound (None for no bound)
+        """
+        return self._with(expiry_min_days=min_days, expiry_max_days=max_days)
+
+    def expiring_within(self, days: int) -> 'MedicineQuery':
+        """Only unexpired medicines expiring within days"""
+        return self.expiry_window(0, days)
+
+    def expired(self) -> 'MedicineQuery':
+        """Only expired medicines"""
+        return self.expiry_window(None, -1)
+
+    # Order and page
+
+    def order_by(self, field: str, descending: bool = False) -> 'MedicineQuery':
+        """
+        Sort order
+
+        Args:
+            field: One of SORT_FIELDS
+            descending: Reverse the order (relevance is always best first)
+        """
+        if field not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort field: {field}")
+        return self._with(sort_field=field, descending=descending, cursor=None)
+
+    def limit(self, page_size: Optional[int]) -> 'MedicineQuery':
+        """Medicines per page (None for all)"""
+        return self._with(page_size=page_size)
+
+    def after(self, cursor: Optional[str]) -> 'MedicineQuery':
+        """Page following the one that returned cursor (None for the first page)"""
+        return self._with(cursor=cursor)
+
+    # Execution
+
+    @property
+    def has_expiry_filter(self) -> bool:
+        """True if the query bounds days_until_expiry"""
+        return self.expiry_min_days is not None or self.expiry_max_days is not None
+
+    def effective_sort(self) -> str:
+        """Sort field used: relevance for text queries, created_at otherwise, unless set"""
+        if self.sort_field is not None:
+            return self.sort_field
+        return 'relevance' if self.text_query else 'created_at'
+
+    def signature(self) -> str:
+        """Filters and order without the cursor (equal for pages of one query)"""
+        return json.dumps([
+            self.form_name, self.manufacturer_text, self.scan_type_name, self.text_query, self.max_typos,
+            self.expiry_min_days, self.expiry_max_days, self.effective_sort(), self.descending
+        ])
+
+    def matches(self, medicine: Mapping) -> bool:
+        """Check the filters not answered by an index (form, manufacturer, scan type)"""
+        if self.form_name is not None and (medicine.get('form') or '').lower() != self.form_name.lower():
+            return False
+        if (self.manufacturer_text is not None
+                and self.manufacturer_text.lower() not in (medicine.get('manufacturer') or '').lower()):
+            return False
+        if (self.scan_type_name is not None
+                and str(medicine.get('scan_type') or '').lower() != self.scan_type_name.lower()):
+            return False
+        return True
+
+    def sort_key(self, medicine: Mapping, score: float = 0.0) -> Tuple:
+        """
+        Sort key of a medicine: (missing flag, value, id)
+
+        Missing values sort last in either direction.
+        """
+        field = self.effective_sort()
+        medicine_id = str(medicine.get('id') or '')
+        if field == 'relevance':
+            return (0, -score, medicine_id)
+
+        value = medicine.get('days_until_expiry') if field == 'expiry' else medicine.get(field)
+        if value is None or value == '':
+            return (-1 if self.descending else 1, '', medicine_id)
+        if field != 'expiry':
+            value = str(value).lower()
+        return (0, value, medicine_id)
+
+    def _encode_cursor(self, key: Tuple) -> str:
+        """Opaque cursor for a sort key"""
+        raw = json.dumps([self.effective_sort(), self.descending, list(key)], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def _decode_cursor(self) -> Optional[Tuple]:
+        """Sort key held by the cursor (ValueError if it is not from this order)"""
+        if not self.cursor:
+            return None
+        try:
+            field, descending, key = json.loads(base64.urlsafe_b64decode(self.cursor.encode('ascii')))
+        except Exception:
+            raise ValueError("Invalid query cursor")
+        if field != self.effective_sort() or descending != self.descending:
+            raise ValueError("Cursor belongs to a query with another sort order")
+        return tuple(key)
+
+    def run(self, medicines: Iterable[Mapping], scores: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Filter, sort and page candidate medicines in one pass
+
+        Args:
+            medicines: Candidates, already narrowed by any index filters
+            scores: Medicine id -> text match score (relevance order)
+
+        Returns:
+            Dictionary with 'medicines' (the page, as given), 'next_cursor'
+            (None on the last page) and 'total' (matches on every page)
+        """
+        field = self.effective_sort()
+        if field == 'relevance' and scores is None:
+            raise ValueError("Relevance order needs a text filter")
+
+        after = self._decode_cursor()
+        descending = self.descending and field != 'relevance'
+        scores = scores or {}
+
+        total = 0
+        remaining: List[Tuple[Tuple, Mapping]] = []
+        for medicine in medicines:
+            if not self.matches(medicine):
+                continue
+            total += 1
+            key = self.sort_key(medicine, scores.get(medicine.get('id'), 0.0))
+            if after is not None and (key <= after if not descending else key >= after):
+                continue
+            remaining.append((key, medicine))
+
+        if self.page_size is None:
+            page = sorted(remaining, key=lambda entry: entry[0], reverse=descending)
+            has_more = False
+        else:
+            # Partial selection: O(n log k) for a page of k
+            select = heapq.nlargest if descending else heapq.nsmallest
+            page = select(self.page_size + 1, remaining, key=lambda entry: entry[0])
+            has_more = len(page) > self.page_size
+            page = page[:self.page_size]
+
+        return {
+            'medicines': [medicine for _, medicine in page],
+            'next_cursor': self._encode_cursor(page[-1][0]) if has_more else None,
+            'total': total
+        }
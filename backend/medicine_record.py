@@ -0,0 +1,246 @@
+"""
+Medicine Record Module for MediScan
+Compact medicine records with lazily calculated fields
+"""
+
+import copy
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+import logging
+
+try:
+    from .medicine_store import parse_expiry_date
+except ImportError:
+    from medicine_store import parse_expiry_date
+
+logger = logging.getLogger(__name__)
+
+# Fields derived at read time, never persisted
+CALCULATED_FIELDS = ('days_until_expiry', 'expiry_status', 'record_age_days')
+
+# Fields held in slots; any other field goes to a per-record dict
+MEDICINE_FIELDS = ('id', 'name', 'manufacturer', 'batch_no', 'dosage', 'form', 'expiry_date',
+                   'instructions', 'created_at', 'updated_at')
+_FIELD_SET = frozenset(MEDICINE_FIELDS)
+
+_UNPARSED = object()
+
+# Key orders seen so far -> (shared key tuple, slot descriptor per key or
+# None for extras); records with the same fields in the same order share one
+_layouts: Dict[Tuple[str, ...], Tuple[Tuple[str, ...], Tuple[Any, ...]]] = {}
+
+# Most key orders interned in _layouts; records of other key orders (only
+# arbitrary imported fields produce many) build a layout of their own
+MAX_LAYOUTS = 256
+
+
+def expiry_status(days_until_expiry: Optional[int]) -> str:
+    """Expiry status for a number of days until expiry"""
+    if days_until_expiry is None:
+        return 'unknown'
+    if days_until_expiry < 0:
+        return 'expired'
+    if days_until_expiry <= 7:
+        return 'expiring_soon'
+    if days_until_expiry <= 30:
+        return 'expiring_this_month'
+    return 'safe'
+
+
+def record_age_days(created_at: Any, now: datetime) -> Optional[int]:
+    """Whole days since a record's ISO created_at (None if missing or invalid)"""
+    if not created_at:
+        return None
+    try:
+        return (now - datetime.fromisoformat(created_at)).days
+    except (TypeError, ValueError):
+        return None
+
+
+def calculated_fields(expiry_date: Any, created_at: Any, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Calculated fields of a medicine
+
+    Args:
+        expiry_date: Expiry date in any supported format
+        created_at: ISO creation timestamp
+        now: Reference time (defaults to now)
+
+    Returns:
+        Dictionary with days_until_expiry, expiry_status and record_age_days
+    """
+    now = now or datetime.now()
+    try:
+        expiry_dt = parse_expiry_date(expiry_date)
+    except Exception:
+        expiry_dt = None
+
+    days_until_expiry = (expiry_dt - now).days if expiry_dt is not None else None
+    return {
+        'days_until_expiry': days_until_expiry,
+        'expiry_status': expiry_status(days_until_expiry),
+        'record_age_days': record_age_days(created_at, now)
+    }
+
+
+class Medicine(Mapping):
+    """
+    Read-only medicine record
+
+    Common fields live in slots and any others in a small dict, which
+    takes a fraction of the memory of a plain dict per record. The
+    calculated fields are not stored: the expiry fields are computed on
+    first access and cached until the date changes (the expiry date is
+    parsed only once), and record_age_days, which turns over at the
+    time of day the record was created, is computed on each access.
+
+    A Medicine is a Mapping, so code reading records with get() or []
+    works unchanged, calculated fields included. to_dict() returns a
+    plain dict the caller may modify, and from_dict(m.to_dict(False))
+    gives back an equal record.
+    """
+
+    __slots__ = MEDICINE_FIELDS + ('_keys', '_extra', '_expiry_ordinal', '_derived_day', '_derived')
+
+    def __init__(self, **fields: Any):
+        """
+        Initialize a record
+
+        Args:
+            **fields: Medicine fields (calculated fields are ignored)
+        """
+        self._set_fields(fields)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Medicine':
+        """Record for a medicine dict (calculated fields are ignored)"""
+        medicine = cls.__new__(cls)
+        medicine._set_fields(data)
+        return medicine
+
+    def _set_fields(self, data: Dict[str, Any]):
+        """Populate slots and extras from a dict"""
+        keys = tuple(data)
+        layout = _layouts.get(keys)
+        if layout is None:
+            stored = tuple(key for key in keys if key not in CALCULATED_FIELDS)
+            slots = tuple(_SLOTS.get(key) for key in stored)
+            layout = (_layouts.get(stored, (stored,))[0], slots)
+            if len(_layouts) + 2 <= MAX_LAYOUTS:
+                layout = _layouts.setdefault(keys, layout)
+                _layouts.setdefault(stored, layout)
+
+        extra = None
+        values = data.values() if len(layout[0]) == len(keys) else [data[key] for key in layout[0]]
+        for key, slot, value in zip(layout[0], layout[1], values):
+            if slot is not None:
+                slot.__set__(self, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+
+        _set_internal = object.__setattr__
+        _set_internal(self, '_keys', layout[0])
+        _set_internal(self, '_extra', extra)
+        _set_internal(self, '_expiry_ordinal', _UNPARSED)
+        _set_internal(self, '_derived_day', None)
+        _set_internal(self, '_derived', None)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("Medicine records are read-only; use to_dict() for a mutable copy")
+
+    def _field(self, key: str) -> Any:
+        """Stored value of a field present in the record"""
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        return self._extra[key]
+
+    def _calculated(self) -> Tuple[Optional[int], str, Optional[int]]:
+        """(days_until_expiry, expiry_status, record_age_days) as of now"""
+        return self._expiry_fields() + (self._record_age_days(),)
+
+    def _record_age_days(self) -> Optional[int]:
+        """Whole days since the record was created"""
+        return record_age_days(self.get_stored('created_at'), datetime.now())
+
+    def _expiry_fields(self) -> Tuple[Optional[int], str]:
+        """(days_until_expiry, expiry_status) for today"""
+        today = date.today().toordinal()
+        if self._derived_day == today:
+            return self._derived
+
+        # Expiry dates are whole days, so these hold all day
+        now = datetime.now()
+        if self._expiry_ordinal is _UNPARSED:
+            try:
+                expiry_dt = parse_expiry_date(self.get_stored('expiry_date'))
+            except Exception:
+                expiry_dt = None
+            object.__setattr__(self, '_expiry_ordinal', expiry_dt.toordinal() if expiry_dt is not None else None)
+
+        days_until_expiry = None
+        if self._expiry_ordinal is not None:
+            days_until_expiry = (datetime.fromordinal(self._expiry_ordinal) - now).days
+
+        derived = (days_until_expiry, expiry_status(days_until_expiry))
+        object.__setattr__(self, '_derived', derived)
+        object.__setattr__(self, '_derived_day', today)
+        return derived
+
+    def stored_fields(self) -> Tuple[str, ...]:
+        """Names of the stored fields, in their original order"""
+        return self._keys
+
+    def get_stored(self, key: str, default: Any = None) -> Any:
+        """Stored field value, never computing calculated fields"""
+        if key in self._keys:
+            return self._field(key)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'record_age_days':
+            return self._record_age_days()
+        if key in CALCULATED_FIELDS:
+            return self._expiry_fields()[CALCULATED_FIELDS.index(key)]
+        if key in self._keys:
+            return self._field(key)
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys or key in CALCULATED_FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._keys
+        yield from CALCULATED_FIELDS
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(CALCULATED_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"Medicine(id={self.get_stored('id')!r}, name={self.get_stored('name')!r})"
+
+    def to_dict(self, calculated: bool = True) -> Dict[str, Any]:
+        """
+        Plain dict copy of the record
+
+        Args:
+            calculated: Include the calculated fields
+
+        Returns:
+            Dictionary with the stored fields in their original order
+            (nested values copied), then the calculated fields
+        """
+        result = {}
+        extra = self._extra
+        for key in self._keys:
+            value = extra[key] if key not in _FIELD_SET else _SLOTS[key].__get__(self)
+            result[key] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+        if calculated:
+            result.update(zip(CALCULATED_FIELDS, self._calculated()))
+        return result
+
+
+# Slot descriptors of the stored fields, set directly when loading records
+_SLOTS = {name: Medicine.__dict__[name] for name in MEDICINE_FIELDS}
@@ -0,0 +1,577 @@
+"""
+Medicine Store Module for MediScan
+Storage backends behind DatabaseHandler: whole-file JSON and indexed SQLite
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Any
+import logging
+
+try:
+    from .scan_journal import ScanJournal
+    from .storage import file_signature, get_writer
+    from .serializers import find_data_file, get_serializer, migrate_data_file
+    from .retention import add_reclaim, empty_reclaim
+except ImportError:
+    from scan_journal import ScanJournal
+    from storage import file_signature, get_writer
+    from serializers import find_data_file, get_serializer, migrate_data_file
+    from retention import add_reclaim, empty_reclaim
+
+logger = logging.getLogger(__name__)
+
+# Date formats accepted for expiry dates, in order of preference
+EXPIRY_DATE_FORMATS = ['%Y-%m-%d', '%m/%Y', '%m-%Y', '%d/%m/%Y']
+
+# Fields matched by matches_query and kept in the SQLite search_text column
+SEARCH_FIELDS = ['name', 'manufacturer', 'batch_no', 'dosage', 'form', 'instructions']
+
+# Directory of the JSON backend's scan history journal
+SCAN_JOURNAL_DIR = "scan_history"
+
+# Rows the SQLite backend deletes per transaction when compacting, so
+# foreground writes wait for one short batch at most
+SQLITE_COMPACTION_BATCH = 500
+
+
+def parse_expiry_date(value: Any) -> Optional[datetime]:
+    """Parse an expiry date in any of the supported formats"""
+    if not value:
+        return None
+
+    for date_format in EXPIRY_DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value), date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def normalize_expiry_date(value: Any) -> Optional[str]:
+    """Expiry date as an ISO YYYY-MM-DD string, or None if unparseable"""
+    expiry_dt = parse_expiry_date(value)
+    return expiry_dt.strftime('%Y-%m-%d') if expiry_dt else None
+
+
+def matches_query(medicine: Dict, query_lower: str) -> bool:
+    """True if any searchable field contains the lowercase query"""
+    return any(
+        query_lower in str(medicine.get(field)).lower()
+        for field in SEARCH_FIELDS if medicine.get(field)
+    )
+
+
+class JSONMedicineStore:
+    """
+    Stores medicines as a whole JSON file and scan history in a journal
+
+    Every medicine write rewrites the medicines file (medicines.json, or
+    medicines.msgpack with the msgpack serializer). Simple, but the cost
+    of each operation grows with the size of the store. Scan history goes to an append-only ScanJournal; an existing
+    scan_history.json is imported into it once and then left untouched.
+    """
+
+    backend_name = 'json'
+
+    def __init__(self, data_dir: str, scan_retention_days: Optional[int] = None, durability: str = "normal",
+                 file_lock=None, serializer=None):
+        """
+        Initialize the JSON store
+
+        Args:
+            data_dir: Directory holding the data files
+            scan_retention_days: Drop scan history older than this (None keeps all)
+            durability: storage.DURABILITY_LEVELS entry for file writes
+            file_lock: Cross-process lock of the data directory, shared with
+                the scan journal (None for none)
+            serializer: serializers.Serializer for the medicines file (None
+                for JSON); a file in another format is converted, so callers
+                hold the exclusive lock
+        """
+        self.data_dir = data_dir
+        self._writer = get_writer(durability)
+        self.serializer = serializer or get_serializer()
+        self.medicines_file = migrate_data_file(data_dir, "medicines", self.serializer)
+        self.scan_history_file = os.path.join(data_dir, "scan_history.json")
+        self._medicine_writes = 0
+
+        if not os.path.exists(self.medicines_file):
+            self._write(self.medicines_file, [])
+            logger.info(f"Initialized {self.medicines_file}")
+
+        journal_dir = os.path.join(data_dir, SCAN_JOURNAL_DIR)
+        migrate = not os.path.exists(journal_dir) and os.path.exists(self.scan_history_file)
+        self._scans = ScanJournal(journal_dir, retention_days=scan_retention_days, durability=durability,
+                                  file_lock=file_lock)
+
+        if migrate:
+            history = self._read(self.scan_history_file)
+            self._scans.replace(history)
+            logger.info(f"Imported {len(history)} scans from {self.scan_history_file} into the scan journal")
+
+    def _read(self, file_path: str) -> List[Dict]:
+        """Read a list file (including writes not yet flushed)"""
+        serializer = self.serializer if file_path == self.medicines_file else None
+        return self._writer.read(file_path, default=[], serializer=serializer)
+
+    def _write(self, file_path: str, records: List[Dict]):
+        """Rewrite a list file through the shared group-commit writer"""
+        if file_path == self.medicines_file:
+            self._writer.write(file_path, records, serializer=self.serializer)
+            self._medicine_writes += 1
+        else:
+            self._writer.write(file_path, records)
+
+    def generation(self) -> tuple:
+        """
+        Change stamp for the medicine collection
+
+        Combines a local write counter (catches writes within one mtime
+        tick) with the file's mtime and size (catches other processes).
+        """
+        return (self._medicine_writes,) + file_signature(self.medicines_file)
+
+    # Medicines
+
+    def load_medicines(self) -> List[Dict]:
+        """Load all medicine records"""
+        return self._read(self.medicines_file)
+
+    def iter_medicines(self) -> Iterator[Dict]:
+        """Medicine records one at a time (not streamed: the JSON file is read whole first)"""
+        yield from self.load_medicines()
+
+    def get_medicine(self, medicine_id: str) -> Optional[Dict]:
+        """Get a medicine record by id"""
+        for medicine in self.load_medicines():
+            if medicine.get('id') == medicine_id:
+                return medicine
+        return None
+
+    def upsert_medicines(self, records: List[Dict]):
+        """Insert or replace medicine records by id"""
+        medicines = self.load_medicines()
+        positions = {medicine.get('id'): i for i, medicine in enumerate(medicines)}
+
+        for record in records:
+            position = positions.get(record.get('id'))
+            if position is None:
+                positions[record.get('id')] = len(medicines)
+                medicines.append(record)
+            else:
+                medicines[position] = record
+
+        self._write(self.medicines_file, medicines)
+
+    def delete_medicines(self, medicine_ids: List[str]) -> int:
+        """Delete medicines by id, returning the number removed"""
+        ids = set(medicine_ids)
+        medicines = self.load_medicines()
+        remaining = [m for m in medicines if m.get('id') not in ids]
+
+        removed = len(medicines) - len(remaining)
+        if removed:
+            self._write(self.medicines_file, remaining)
+        return removed
+
+    def replace_medicines(self, records: Iterable[Dict]):
+        """Replace the whole medicine collection (collected into one list: the file is rewritten whole)"""
+        self._write(self.medicines_file, list(records))
+
+    # Scan history
+
+    def append_scans(self, entries: List[Dict]):
+        """Append scan history entries"""
+        self._scans.append(entries)
+
+    def load_scans(self, since: Optional[datetime] = None) -> List[Dict]:
+        """Load scan history entries, optionally only those at or after since"""
+        return self._scans.load(since)
+
+    def iter_scans(self, since: Optional[datetime] = None) -> Iterator[Dict]:
+        """Stream scan history entries one monthly segment at a time"""
+        return self._scans.iter_entries(since)
+
+    def expire_scans_before(self, cutoff: datetime) -> Dict[str, Any]:
+        """Hide scans before cutoff and drop the monthly segments wholly before it (see ScanJournal.expire_before)"""
+        return self._scans.expire_before(cutoff)
+
+    def compact_scans(self) -> Dict[str, int]:
+        """Reclaim the space of expired scans, journal included, returning a reclaim report"""
+        return self._scans.compact_retention(merge_journal=True)
+
+    def replace_scans(self, entries: Iterable[Dict]):
+        """Replace the whole scan history"""
+        self._scans.replace(list(entries))
+
+    def close(self):
+        """Flush pending writes and wait for background scan journal compaction"""
+        self._writer.flush()
+        self._scans.close()
+
+
+class SQLiteMedicineStore:
+    """
+    Stores medicines and scan history in SQLite
+
+    Runs in WAL mode so readers never block the writer. Each record is
+    kept as a JSON document next to indexed columns (id as primary key,
+    name, normalized expiry date, form, manufacturer, created_at), so
+    lookups and upserts
+    are B-tree operations rather than whole-file rewrites. All statements
+    are parameterized constants, which sqlite3 compiles once and reuses
+    from its per-connection statement cache.
+    """
+
+    backend_name = 'sqlite'
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS medicines (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            expiry_date TEXT,
+            form TEXT,
+            manufacturer TEXT,
+            created_at TEXT,
+            search_text TEXT,
+            data TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_medicines_name ON medicines(name COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_medicines_expiry ON medicines(expiry_date)",
+        "CREATE INDEX IF NOT EXISTS idx_medicines_form ON medicines(form COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_medicines_manufacturer ON medicines(manufacturer COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_medicines_created ON medicines(created_at)",
+        """CREATE TABLE IF NOT EXISTS scan_history (
+            id TEXT PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            data TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_scan_history_timestamp ON scan_history(timestamp)",
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    ]
+
+    # Updates keep the row (and its rowid), so records stay in insertion
+    # order, as in the JSON store and the handler's patched cache
+    UPSERT_MEDICINE = (
+        "INSERT INTO medicines "
+        "(id, name, expiry_date, form, manufacturer, created_at, search_text, data) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET name = excluded.name, expiry_date = excluded.expiry_date, "
+        "form = excluded.form, manufacturer = excluded.manufacturer, created_at = excluded.created_at, "
+        "search_text = excluded.search_text, data = excluded.data"
+    )
+    INSERT_SCAN = "INSERT OR REPLACE INTO scan_history (id, timestamp, data) VALUES (?, ?, ?)"
+
+    # storage.DURABILITY_LEVELS -> PRAGMA synchronous
+    SYNCHRONOUS = {'full': 'FULL', 'normal': 'NORMAL', 'deferred': 'OFF'}
+
+    def __init__(self, data_dir: str, db_file: str = "mediscan.db", scan_retention_days: Optional[int] = None,
+                 durability: str = "normal", file_lock=None, serializer=None):
+        """
+        Initialize the SQLite store, migrating existing JSON data on first use
+
+        Args:
+            data_dir: Directory holding the database file
+            db_file: Database file name
+            scan_retention_days: Drop scan history older than this (None keeps all)
+            durability: storage.DURABILITY_LEVELS entry, mapped to PRAGMA synchronous
+            file_lock: Cross-process lock of the data directory, used while
+                reading the JSON scan journal for migration (None for none)
+            serializer: Unused (rows are stored as JSON); accepted so
+                create_store passes the same options to every backend
+        """
+        if durability not in self.SYNCHRONOUS:
+            raise ValueError(f"Unknown durability level: {durability}")
+
+        self.data_dir = data_dir
+        self.durability = durability
+        self.db_path = os.path.join(data_dir, db_file)
+        self.scan_retention_days = scan_retention_days
+        self.file_lock = file_lock
+        self._local = threading.local()
+        # Every thread's connection, so close() can close them all; a
+        # thread holding a connection of an older epoch opens a new one
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._epoch = 0
+        self._medicine_writes = 0
+
+        conn = self._connection()
+        with conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+        self._migrate_from_json()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Per-thread connection (sqlite3 connections are not shareable)
+
+        Each connection is only used by the thread that opened it;
+        check_same_thread is off so close() may close it from another.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.epoch != self._epoch:
+            conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=256, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.SYNCHRONOUS[self.durability]}")
+            with self._connections_lock:
+                self._connections.append(conn)
+                self._local.epoch = self._epoch
+            self._local.conn = conn
+        return conn
+
+    def generation(self) -> tuple:
+        """
+        Change stamp for the medicine collection
+
+        Combines a local write counter with the mtime and size of the
+        database and its WAL, so commits from other processes are seen
+        too. Unlike PRAGMA data_version this is the same on every thread.
+        """
+        return (self._medicine_writes,) + file_signature(self.db_path, self.db_path + "-wal")
+
+    def _medicine_row(self, record: Dict) -> tuple:
+        """Column values for a medicine record"""
+        search_text = '\n'.join(
+            str(record.get(field)).lower() for field in SEARCH_FIELDS if record.get(field)
+        )
+        return (
+            record.get('id'),
+            record.get('name'),
+            normalize_expiry_date(record.get('expiry_date')),
+            record.get('form'),
+            record.get('manufacturer'),
+            record.get('created_at'),
+            search_text,
+            json.dumps(record, default=str)
+        )
+
+    def _migrate_from_json(self):
+        """Import the JSON backend's medicines file and scan_history.json once"""
+        conn = self._connection()
+        if conn.execute("SELECT value FROM meta WHERE key = 'json_migrated_at'").fetchone():
+            return
+
+        medicines_file = find_data_file(self.data_dir, "medicines")
+        scan_history_file = os.path.join(self.data_dir, "scan_history.json")
+        journal_dir = os.path.join(self.data_dir, SCAN_JOURNAL_DIR)
+        medicines, scans = [], []
+        try:
+            if medicines_file is not None:
+                path, serializer = medicines_file
+                with open(path, 'rb') as f:
+                    medicines = serializer.loads(f.read())
+            if os.path.exists(journal_dir):
+                scans = ScanJournal(journal_dir, background=False, file_lock=self.file_lock).load()
+            elif os.path.exists(scan_history_file):
+                with open(scan_history_file, 'r') as f:
+                    scans = json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading JSON data for migration: {e}")
+            return
+
+        with conn:
+            conn.executemany(self.UPSERT_MEDICINE, [self._medicine_row(m) for m in medicines if m.get('id')])
+            conn.executemany(self.INSERT_SCAN, [
+                (s['id'], s['timestamp'], json.dumps(s, default=str)) for s in scans if s.get('id')
+            ])
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated_at', ?)",
+                (datetime.now().isoformat(),)
+            )
+
+        if medicines or scans:
+            logger.info(f"Migrated {len(medicines)} medicines and {len(scans)} scans from JSON to SQLite")
+
+    def _records(self, rows) -> List[Dict]:
+        """Decode JSON documents from result rows"""
+        return [json.loads(row[0]) for row in rows]
+
+    # Medicines
+
+    def load_medicines(self) -> List[Dict]:
+        """Load all medicine records in insertion order"""
+        return self._records(self._connection().execute("SELECT data FROM medicines ORDER BY rowid"))
+
+    def iter_medicines(self) -> Iterator[Dict]:
+        """Stream medicine records in insertion order from a cursor"""
+        for row in self._connection().execute("SELECT data FROM medicines ORDER BY rowid"):
+            yield json.loads(row[0])
+
+    def get_medicine(self, medicine_id: str) -> Optional[Dict]:
+        """Get a medicine record by id"""
+        row = self._connection().execute("SELECT data FROM medicines WHERE id = ?", (medicine_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def upsert_medicines(self, records: List[Dict]):
+        """Insert or replace medicine records by id"""
+        conn = self._connection()
+        with conn:
+            conn.executemany(self.UPSERT_MEDICINE, [self._medicine_row(r) for r in records])
+        self._medicine_writes += 1
+
+    def delete_medicines(self, medicine_ids: List[str]) -> int:
+        """Delete medicines by id, returning the number removed"""
+        conn = self._connection()
+        with conn:
+            before = conn.total_changes
+            conn.executemany("DELETE FROM medicines WHERE id = ?", [(i,) for i in medicine_ids])
+        self._medicine_writes += 1
+        return conn.total_changes - before
+
+    def replace_medicines(self, records: Iterable[Dict]):
+        """Replace the whole medicine collection, streaming records into one transaction"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM medicines")
+            conn.executemany(self.UPSERT_MEDICINE, (self._medicine_row(r) for r in records))
+        self._medicine_writes += 1
+
+    # Scan history
+
+    def _retention_cutoff(self) -> Optional[str]:
+        """ISO timestamp of the oldest scan kept (retention policy or expiry horizon)"""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'scan_horizon'").fetchone()
+        cutoffs = [row[0]] if row else []
+        if self.scan_retention_days is not None:
+            cutoffs.append((datetime.now() - timedelta(days=self.scan_retention_days)).isoformat())
+        return max(cutoffs) if cutoffs else None
+
+    def append_scans(self, entries: List[Dict]):
+        """Append scan history entries (expired ones are removed by compact_scans)"""
+        conn = self._connection()
+        with conn:
+            conn.executemany(self.INSERT_SCAN, [
+                (e['id'], e['timestamp'], json.dumps(e, default=str)) for e in entries
+            ])
+
+    def _scan_rows(self, since: Optional[datetime]):
+        """Cursor over scan history rows at or after since, within retention"""
+        since_iso = since.isoformat() if since is not None else None
+        cutoff = self._retention_cutoff()
+        if cutoff is not None and (since_iso is None or cutoff > since_iso):
+            since_iso = cutoff
+
+        if since_iso is None:
+            return self._connection().execute("SELECT data FROM scan_history ORDER BY timestamp")
+        return self._connection().execute(
+            "SELECT data FROM scan_history WHERE timestamp >= ? ORDER BY timestamp",
+            (since_iso,)
+        )
+
+    def load_scans(self, since: Optional[datetime] = None) -> List[Dict]:
+        """Load scan history entries, optionally only those at or after since"""
+        return self._records(self._scan_rows(since))
+
+    def iter_scans(self, since: Optional[datetime] = None) -> Iterator[Dict]:
+        """Stream scan history entries in timestamp order from a cursor"""
+        for row in self._scan_rows(since):
+            yield json.loads(row[0])
+
+    def expire_scans_before(self, cutoff: datetime) -> Dict[str, Any]:
+        """
+        Hide scans before cutoff by moving the expiry horizon
+
+        SQLite has no partitions to drop: the rows stay until compact_scans
+        deletes them, but reads stop returning them at once.
+
+        Returns:
+            Empty reclaim report, plus 'horizon_moved'
+        """
+        cutoff_iso = cutoff.isoformat()
+        conn = self._connection()
+        with conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'scan_horizon'").fetchone()
+            horizon_moved = row is None or row[0] < cutoff_iso
+            if horizon_moved:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scan_horizon', ?)", (cutoff_iso,))
+
+        reclaimed: Dict[str, Any] = empty_reclaim()
+        reclaimed['horizon_moved'] = horizon_moved
+        return reclaimed
+
+    def compact_scans(self, batch_size: int = SQLITE_COMPACTION_BATCH) -> Dict[str, int]:
+        """
+        Delete expired scan rows in short transactions
+
+        Each batch is its own transaction on the timestamp index, so
+        writers of other threads and processes interleave between batches.
+        Freed pages go to SQLite's free list and are reused by later
+        inserts; the database file does not shrink.
+
+        Args:
+            batch_size: Rows deleted per transaction
+
+        Returns:
+            Reclaim report (bytes counts the deleted JSON documents)
+        """
+        reclaimed = empty_reclaim()
+        cutoff = self._retention_cutoff()
+        if cutoff is None:
+            return reclaimed
+
+        conn = self._connection()
+        while True:
+            with conn:
+                rows = conn.execute(
+                    "SELECT rowid, LENGTH(data) FROM scan_history WHERE timestamp < ? LIMIT ?",
+                    (cutoff, batch_size)
+                ).fetchall()
+                if not rows:
+                    return reclaimed
+                conn.executemany("DELETE FROM scan_history WHERE rowid = ?", [(row[0],) for row in rows])
+            add_reclaim(reclaimed, {'records': len(rows), 'bytes': sum(row[1] or 0 for row in rows)})
+
+    def replace_scans(self, entries: Iterable[Dict]):
+        """Replace the whole scan history, clearing the expiry horizon (entries are streamed)"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM scan_history")
+            conn.execute("DELETE FROM meta WHERE key = 'scan_horizon'")
+            conn.executemany(self.INSERT_SCAN, (
+                (e['id'], e['timestamp'], json.dumps(e, default=str)) for e in entries
+            ))
+
+    def close(self):
+        """Close every thread's connection (a thread using the store again opens a new one)"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._epoch += 1
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error closing database connection: {e}")
+
+
+STORAGE_BACKENDS = {
+    'json': JSONMedicineStore,
+    'sqlite': SQLiteMedicineStore,
+}
+
+
+def create_store(backend: str, data_dir: str, scan_retention_days: Optional[int] = None,
+                 durability: str = "normal", file_lock=None, serializer=None):
+    """
+    Create a storage backend by name
+
+    Args:
+        backend: 'json' or 'sqlite'
+        data_dir: Directory holding the data files
+        scan_retention_days: Drop scan history older than this (None keeps all)
+        durability: storage.DURABILITY_LEVELS entry
+        file_lock: Cross-process lock of the data directory (None for none)
+        serializer: serializers.Serializer for whole-file data (None for JSON)
+
+    Returns:
+        Store instance
+    """
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return STORAGE_BACKENDS[backend](data_dir, scan_retention_days=scan_retention_days, durability=durability,
+                                     file_lock=file_lock, serializer=serializer)
@@ -15,6 +15,11 @@ import requests
 from typing import Dict, List, Optional
 import cv2
 
+try:
+    from .extraction_profiler import ExtractionProfiler
+except ImportError:
+    from extraction_profiler import ExtractionProfiler
+
 # Try to import EasyOCR as fallback
 try:
     import easyocr
@@ -41,6 +46,9 @@ class OCRProcessor:
         self.endpoint = f"https://vision.googleapis.com/v1/images:annotate?key={self.api_key}" if self.api_key else None
         self.google_available = bool(self.api_key)
 
+        # Optional pattern profiler (see enable_profiling)
+        self.profiler: Optional[ExtractionProfiler] = None
+
         # Initialize EasyOCR as fallback
         self.easyocr_reader = None
         if EASYOCR_AVAILABLE:
@@ -262,9 +270,14 @@ class OCRProcessor:
         """
         Extract structured information from OCR text
         """
-        def extract_field(patterns, text, flags=re.IGNORECASE):
+        profiler = self.profiler
+
+        def extract_field(field, patterns, text, flags=re.IGNORECASE):
             for pattern in patterns:
-                match = re.search(pattern, text, flags)
+                if profiler is None:
+                    match = re.search(pattern, text, flags)
+                else:
+                    match = profiler.search(f"ocr.{field}", pattern, text, flags)
                 if match:
                     return match.group(1).strip()
             return None
@@ -276,51 +289,68 @@ class OCRProcessor:
             r'(?:name|medicine|drug)[:\s]*([^\n]+)',
             r'^([A-Z][A-Za-z\s]+)(?:\n|$)',  # First capitalized line
         ]
-        structured['medicine_name'] = extract_field(name_patterns, text)
+        structured['medicine_name'] = extract_field('medicine_name', name_patterns, text)
 
         # Dosage patterns
         dosage_patterns = [
             r'(?:dosage|dose|strength)[:\s]*([^\n]+)',
             r'(\d+\s*(?:mg|ml|g|mcg|units?))',
         ]
-        structured['dosage'] = extract_field(dosage_patterns, text)
+        structured['dosage'] = extract_field('dosage', dosage_patterns, text)
 
         # Expiry date patterns
         expiry_patterns = [
             r'(?:exp|expiry|expires?)[:\s]*([0-9]{1,2}[/-][0-9]{1,2}[/-][0-9]{2,4})',
             r'(?:exp|expiry|expires?)[:\s]*([a-z]{3,9}\s*[0-9]{2,4})',
         ]
-        structured['expiry_date'] = extract_field(expiry_patterns, text)
+        structured['expiry_date'] = extract_field('expiry_date', expiry_patterns, text)
 
         # Manufacturing date patterns
         mfg_patterns = [
             r'(?:mfg|manufactured?|mfd)[:\s]*([0-9]{1,2}[/-][0-9]{1,2}[/-][0-9]{2,4})',
             r'(?:mfg|manufactured?|mfd)[:\s]*([a-z]{3,9}\s*[0-9]{2,4})',
         ]
-        structured['mfg_date'] = extract_field(mfg_patterns, text)
+        structured['mfg_date'] = extract_field('mfg_date', mfg_patterns, text)
 
         # Batch number patterns
         batch_patterns = [
             r'(?:batch|lot)\s*(?:no|number)?[:\s]*([a-z0-9\-]+)',
             r'(?:b\.?no|l\.?no)[:\s]*([a-z0-9\-]+)',
         ]
-        structured['batch_number'] = extract_field(batch_patterns, text)
+        structured['batch_number'] = extract_field('batch_number', batch_patterns, text)
 
         # Manufacturer patterns
         manufacturer_patterns = [
             r'(?:mfr?|manufacturer?|made\s*by)[:\s]*([^\n]+)',
         ]
-        structured['manufacturer'] = extract_field(manufacturer_patterns, text)
+        structured['manufacturer'] = extract_field('manufacturer', manufacturer_patterns, text)
 
         # Quantity patterns
         quantity_patterns = [
             r'(?:qty|quantity|count)[:\s]*(\d+)',
             r'(\d+)\s*(?:tablets?|capsules?|pills?)',
         ]
-        structured['quantity'] = extract_field(quantity_patterns, text)
+        structured['quantity'] = extract_field('quantity', quantity_patterns, text)
 
         return structured
 
+    def enable_profiling(self, profiler: Optional[ExtractionProfiler] = None) -> ExtractionProfiler:
+        """
+        Start recording per-pattern telemetry for structure_text
+
+        Args:
+            profiler: Profiler to record into (shared with MedicineExtractor if given)
+
+        Returns:
+            The active profiler
+        """
+        self.profiler = profiler or ExtractionProfiler()
+        return self.profiler
+
+    def disable_profiling(self):
+        """Stop recording pattern telemetry"""
+        self.profiler = None
+
     def is_available(self) -> Dict[str, bool]:
         """Check availability of OCR engines"""
         return {
@@ -3,15 +3,27 @@ Reminder System Module for MediScan
 Handles medicine reminders and notifications with enhanced features
 """
 
-import json
+import copy
 import os
+from contextlib import contextmanager
 from datetime import datetime, timedelta, time
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 import logging
 import uuid
 import threading
 from dataclasses import dataclass, asdict
 
+try:
+    from .storage import file_signature, get_writer
+    from .file_lock import get_file_lock
+    from .serializers import get_serializer, migrate_data_file
+    from .change_feed import ChangeEvent, ChangeFeed
+except ImportError:
+    from storage import file_signature, get_writer
+    from file_lock import get_file_lock
+    from serializers import get_serializer, migrate_data_file
+    from change_feed import ChangeEvent, ChangeFeed
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -36,37 +48,97 @@ class Reminder:
 class ReminderSystem:
     """
     Enhanced reminder system for medicine management
+
+    Reminders are held in memory. Changes hold the data directory's
+    exclusive file lock and first reload the files if another process
+    wrote them; reads reload under the shared lock when the files'
+    signature changed.
+
+    Changes are published on a change feed (see ChangeFeed) with entity
+    'reminder' or 'reminder_history'; a reload after another process's
+    write publishes a reset of both.
     """
 
-    def __init__(self, data_dir: str = "data"):
-        """Initialize the reminder system"""
+    def __init__(self, data_dir: str = "data", durability: str = "normal", serializer: str = "json"):
+        """
+        Initialize the reminder system
+
+        Args:
+            data_dir: Directory holding the reminder files
+            durability: 'full', 'normal' or 'deferred' (see storage.DURABILITY_LEVELS)
+            serializer: 'json', 'orjson' or 'msgpack' (see DatabaseHandler);
+                files in another format are converted on first load
+        """
         self.data_dir = data_dir
-        self.reminders_file = os.path.join(data_dir, "reminders.json")
-        self.history_file = os.path.join(data_dir, "reminder_history.json")
+        self._writer = get_writer(durability)
+        self.serializer = get_serializer(serializer)
 
         self.reminders: List[Dict] = []
         self.reminder_history: List[Dict] = []
-        self._lock = threading.Lock()
+        self._lock = threading.RLock()
+        # File signature the in-memory state was loaded from or saved as
+        self._signature = None
+        self._changes = ChangeFeed()
 
         self._ensure_data_directory()
-        self._load_data()
+        self._file_lock = get_file_lock(data_dir)
+        with self._file_lock.exclusive():
+            self.reminders_file = migrate_data_file(data_dir, "reminders", self.serializer)
+            self.history_file = migrate_data_file(data_dir, "reminder_history", self.serializer)
+            self._load_data()
 
     def _ensure_data_directory(self):
         """Ensure data directory exists"""
         os.makedirs(self.data_dir, exist_ok=True)
 
+    def _current_signature(self) -> tuple:
+        """File signature of the reminder files"""
+        return file_signature(self.reminders_file, self.history_file)
+
+    def _refresh(self):
+        """Reload reminders if another process changed the files"""
+        if self._current_signature() == self._signature:
+            return
+
+        with self._file_lock.shared(), self._lock:
+            if self._current_signature() != self._signature:
+                self._load_data()
+        self._changes.dispatch()
+
+    @contextmanager
+    def _write_lock(self):
+        """
+        Hold the exclusive data directory lock and self._lock
+
+        In-memory state is reloaded first if another process wrote the
+        files, and deferred writes are flushed before the lock is released.
+        Changes published inside are delivered to subscribers afterwards.
+        """
+        try:
+            with self._file_lock.exclusive(), self._lock:
+                if self._current_signature() != self._signature:
+                    self._load_data()
+                yield
+                if self._writer.durability == 'deferred':
+                    self._writer.flush()
+                self._signature = self._current_signature()
+        finally:
+            self._changes.dispatch()
+
     def _load_data(self):
-        """Load reminders and history from files"""
+        """Load reminders and history from files (callers hold the file lock)"""
         try:
-            # Load reminders
-            if os.path.exists(self.reminders_file):
-                with open(self.reminders_file, 'r') as f:
-                    self.reminders = json.load(f)
+            reload = self._signature is not None
+            self._signature = self._current_signature()
+
+            # Load reminders and history (including writes not yet flushed)
+            self.reminders = self._writer.read(self.reminders_file, default=[], serializer=self.serializer)
+            self.reminder_history = self._writer.read(self.history_file, default=[], serializer=self.serializer)
 
-            # Load history
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r') as f:
-                    self.reminder_history = json.load(f)
+            if reload:
+                # Written by another process: any of it may have changed
+                self._changes.publish('reminder', 'reset')
+                self._changes.publish('reminder_history', 'reset')
 
             logger.info(f"Loaded {len(self.reminders)} reminders and {len(self.reminder_history)} history entries")
 
@@ -76,16 +148,17 @@ class ReminderSystem:
             self.reminder_history = []
 
     def _save_data(self):
-        """Save reminders and history to files"""
-        try:
-            with self._lock:
-                # Save reminders
-                with open(self.reminders_file, 'w') as f:
-                    json.dump(self.reminders, f, indent=2, default=str)
+        """
+        Save reminders and history to files
 
-                # Save history
-                with open(self.history_file, 'w') as f:
-                    json.dump(self.reminder_history, f, indent=2, default=str)
+        Callers hold the write lock. Snapshots are handed to the shared
+        group-commit writer, which replaces each file atomically.
+        """
+        try:
+            self._writer.write_many({
+                self.reminders_file: copy.deepcopy(self.reminders),
+                self.history_file: copy.deepcopy(self.reminder_history)
+            }, serializer=self.serializer)
 
         except Exception as e:
             logger.error(f"Error saving reminder data: {e}")
@@ -129,9 +202,10 @@ class ReminderSystem:
             # Calculate next reminder
             reminder['next_reminder'] = self._calculate_next_reminder_time(reminder)
 
-            with self._lock:
+            with self._write_lock():
                 self.reminders.append(reminder)
                 self._save_data()
+                self._changes.publish('reminder', 'insert', [reminder['id']])
 
             logger.info(f"Created reminder for {reminder['medicine_name']}")
             return True
@@ -180,6 +254,7 @@ class ReminderSystem:
 
     def get_active_reminders(self) -> List[Dict]:
         """Get all active reminders"""
+        self._refresh()
         return [r for r in self.reminders if r.get('active', False)]
 
     def get_todays_reminders(self) -> List[Dict]:
@@ -248,7 +323,7 @@ class ReminderSystem:
             taken_time = datetime.now().isoformat()
 
         try:
-            with self._lock:
+            with self._write_lock():
                 for reminder in self.reminders:
                     if reminder['id'] == reminder_id:
                         reminder['last_taken'] = taken_time
@@ -261,6 +336,7 @@ class ReminderSystem:
                         self._add_to_history(reminder_id, 'taken', taken_time)
 
                         self._save_data()
+                        self._changes.publish('reminder', 'update', [reminder_id])
                         logger.info(f"Marked reminder {reminder_id} as taken")
                         return True
 
@@ -286,7 +362,7 @@ class ReminderSystem:
             missed_time = datetime.now().isoformat()
 
         try:
-            with self._lock:
+            with self._write_lock():
                 for reminder in self.reminders:
                     if reminder['id'] == reminder_id:
                         reminder['missed_count'] = reminder.get('missed_count', 0) + 1
@@ -298,6 +374,7 @@ class ReminderSystem:
                         self._add_to_history(reminder_id, 'missed', missed_time)
 
                         self._save_data()
+                        self._changes.publish('reminder', 'update', [reminder_id])
                         logger.info(f"Marked reminder {reminder_id} as missed")
                         return True
 
@@ -311,11 +388,12 @@ class ReminderSystem:
     def disable_reminder(self, reminder_id: str) -> bool:
         """Disable a reminder"""
         try:
-            with self._lock:
+            with self._write_lock():
                 for reminder in self.reminders:
                     if reminder['id'] == reminder_id:
                         reminder['active'] = False
                         self._save_data()
+                        self._changes.publish('reminder', 'update', [reminder_id])
                         logger.info(f"Disabled reminder {reminder_id}")
                         return True
 
@@ -328,12 +406,13 @@ class ReminderSystem:
     def delete_reminder(self, reminder_id: str) -> bool:
         """Delete a reminder"""
         try:
-            with self._lock:
+            with self._write_lock():
                 original_count = len(self.reminders)
                 self.reminders = [r for r in self.reminders if r['id'] != reminder_id]
 
                 if len(self.reminders) < original_count:
                     self._save_data()
+                    self._changes.publish('reminder', 'delete', [reminder_id])
                     logger.info(f"Deleted reminder {reminder_id}")
                     return True
 
@@ -390,6 +469,7 @@ class ReminderSystem:
             Dictionary with compliance statistics
         """
         cutoff_date = datetime.now() - timedelta(days=days)
+        self._refresh()
 
         total_taken = 0
         total_missed = 0
@@ -446,16 +526,20 @@ class ReminderSystem:
             }
 
             self.reminder_history.append(history_entry)
+            self._changes.publish('reminder_history', 'insert', [history_entry['id']])
 
             # Keep only last 1000 entries to prevent file from growing too large
             if len(self.reminder_history) > 1000:
+                trimmed = [entry.get('id') for entry in self.reminder_history[:-1000]]
                 self.reminder_history = self.reminder_history[-1000:]
+                self._changes.publish('reminder_history', 'delete', filter(None, trimmed))
 
         except Exception as e:
             logger.error(f"Error adding to history: {e}")
 
     def get_reminder_by_id(self, reminder_id: str) -> Optional[Dict]:
         """Get a reminder by its ID"""
+        self._refresh()
         for reminder in self.reminders:
             if reminder['id'] == reminder_id:
                 return reminder
@@ -473,7 +557,7 @@ class ReminderSystem:
             True if updated successfully
         """
         try:
-            with self._lock:
+            with self._write_lock():
                 for reminder in self.reminders:
                     if reminder['id'] == reminder_id:
                         # Update fields
@@ -486,6 +570,7 @@ class ReminderSystem:
                             reminder['next_reminder'] = self._calculate_next_reminder_time(reminder)
 
                         self._save_data()
+                        self._changes.publish('reminder', 'update', [reminder_id])
                         logger.info(f"Updated reminder {reminder_id}")
                         return True
 
@@ -495,8 +580,51 @@ class ReminderSystem:
             logger.error(f"Error updating reminder: {e}")
             return False
 
+    def change_version(self) -> int:
+        """Current change feed version (0 before any change)"""
+        return self._changes.version
+
+    def changes_since(self, version: int, entities: Optional[Sequence[str]] = None) -> Optional[List[ChangeEvent]]:
+        """
+        Changes published after a version
+
+        Another process's writes are picked up first (as resets).
+
+        Args:
+            version: Version the caller last saw
+            entities: 'reminder' and/or 'reminder_history' (None for both)
+
+        Returns:
+            Change events, oldest first, or None if the caller must reload
+            everything
+        """
+        try:
+            self._refresh()
+            return self._changes.changes_since(version, entities)
+        except Exception as e:
+            logger.error(f"Error reading reminder changes: {e}")
+            return None
+
+    def subscribe(self, callback: Callable[[ChangeEvent], Any], entities: Optional[Sequence[str]] = None) -> int:
+        """
+        Call a function after every committed change (see DatabaseHandler.subscribe)
+
+        Args:
+            callback: Called with each ChangeEvent
+            entities: Only these entities (None for all)
+
+        Returns:
+            Token for unsubscribe
+        """
+        return self._changes.subscribe(callback, entities)
+
+    def unsubscribe(self, token: int) -> bool:
+        """Stop calling a subscriber; True if it was subscribed"""
+        return self._changes.unsubscribe(token)
+
     def get_all_reminders(self) -> List[Dict]:
         """Get all reminders (active and inactive)"""
+        self._refresh()
         return self.reminders.copy()
 
     def load_reminders(self) -> List[Dict]:
@@ -512,18 +640,24 @@ class ReminderSystem:
         """
         try:
             cutoff_date = datetime.now() - timedelta(days=days_old)
-            original_count = len(self.reminder_history)
 
-            self.reminder_history = [
-                entry for entry in self.reminder_history
-                if datetime.fromisoformat(entry['timestamp']) >= cutoff_date
-            ]
+            with self._write_lock():
+                original_count = len(self.reminder_history)
 
-            removed_count = original_count - len(self.reminder_history)
+                kept, removed_ids = [], []
+                for entry in self.reminder_history:
+                    if datetime.fromisoformat(entry['timestamp']) >= cutoff_date:
+                        kept.append(entry)
+                    elif entry.get('id'):
+                        removed_ids.append(entry['id'])
+                self.reminder_history = kept
 
-            if removed_count > 0:
-                self._save_data()
-                logger.info(f"Cleaned up {removed_count} old history entries")
+                removed_count = original_count - len(self.reminder_history)
+
+                if removed_count > 0:
+                    self._save_data()
+                    self._changes.publish('reminder_history', 'delete', removed_ids)
+                    logger.info(f"Cleaned up {removed_count} old history entries")
 
         except Exception as e:
             logger.error(f"Error cleaning up history: {e}")
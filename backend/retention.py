@@ -0,0 +1,166 @@
+"""
+Retention Module for MediScan
+Low-priority background compaction reclaiming the space of expired data
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Counters of a reclaim report: records removed, bytes freed and whole
+# time partitions dropped
+RECLAIM_KEYS = ('records', 'bytes', 'partitions')
+
+# Nice increment of the compaction thread (Linux only)
+COMPACTION_NICENESS = 10
+
+
+def empty_reclaim() -> Dict[str, int]:
+    """Reclaim report with every counter at zero"""
+    return dict.fromkeys(RECLAIM_KEYS, 0)
+
+
+def add_reclaim(total: Dict[str, int], reclaimed: Dict[str, Any]) -> Dict[str, int]:
+    """Add a reclaim report's counters to total (in place) and return total"""
+    for key in RECLAIM_KEYS:
+        total[key] += reclaimed.get(key, 0)
+    return total
+
+
+class RetentionCompactor:
+    """
+    Background thread reclaiming the space of expired records
+
+    Expiry is split in two. The caller does the quick part under its
+    write lock: it moves the store's expiry horizon (expired records stop
+    being returned at once) and drops whole time partitions. The slow
+    part, rewriting the partition that straddles the cutoff, is handed to
+    schedule() and runs here, one job at a time, without the caller's
+    locks; stores take their own locks only to swap finished files in.
+
+    The thread runs at a lower CPU priority where the platform allows it
+    per thread (Linux), and jobs are coalesced by name, so repeated
+    cleanups queue one compaction. Jobs return reclaim reports (see
+    RECLAIM_KEYS), which are totalled in get_stats().
+    """
+
+    def __init__(self, name: str = "retention-compaction", niceness: int = COMPACTION_NICENESS):
+        """
+        Initialize the compactor
+
+        Args:
+            name: Name of the background thread
+            niceness: Nice increment of the thread (0 keeps normal priority)
+        """
+        self.name = name
+        self.niceness = niceness
+
+        self._cond = threading.Condition()
+        self._jobs: "OrderedDict[str, Callable[[], Dict[str, int]]]" = OrderedDict()
+        self._running: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, Any] = {'runs': 0, 'failed': 0, 'seconds': 0.0, 'last_run': None}
+        self._stats.update(empty_reclaim())
+
+    def schedule(self, name: str, job: Callable[[], Dict[str, int]]) -> bool:
+        """
+        Queue a compaction job
+
+        Args:
+            name: Job name; a job already queued under it is not queued again
+            job: Callable returning a reclaim report
+
+        Returns:
+            True if queued, False if the same job was already waiting
+        """
+        with self._cond:
+            if name in self._jobs:
+                return False
+            self._jobs[name] = job
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            return True
+
+    def _lower_priority(self):
+        """Renice the calling thread (setpriority on a thread id is per thread on Linux only)"""
+        if not self.niceness or not sys.platform.startswith('linux'):
+            return
+        try:
+            thread_id = threading.get_native_id()
+            os.setpriority(os.PRIO_PROCESS, thread_id, os.getpriority(os.PRIO_PROCESS, thread_id) + self.niceness)
+        except (AttributeError, OSError) as e:
+            logger.debug(f"Could not lower compaction thread priority: {e}")
+
+    def _run(self):
+        """Background loop running queued jobs until none are left"""
+        self._lower_priority()
+        while True:
+            with self._cond:
+                if not self._jobs:
+                    self._thread = None
+                    self._cond.notify_all()
+                    return
+                name, job = self._jobs.popitem(last=False)
+                self._running = name
+
+            start = time.perf_counter()
+            try:
+                reclaimed = job() or {}
+                failed = False
+            except Exception as e:
+                logger.error(f"Error in retention compaction {name}: {e}")
+                reclaimed, failed = {}, True
+
+            with self._cond:
+                self._running = None
+                self._stats['runs'] += 1
+                self._stats['failed'] += int(failed)
+                self._stats['seconds'] += time.perf_counter() - start
+                self._stats['last_run'] = datetime.now().isoformat()
+                add_reclaim(self._stats, reclaimed)
+                self._cond.notify_all()
+
+            if reclaimed.get('records'):
+                logger.info(f"Compaction {name} reclaimed {reclaimed['records']} records "
+                            f"({reclaimed.get('bytes', 0)} bytes)")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every queued job has run
+
+        Args:
+            timeout: Seconds to wait (None waits as long as it takes)
+
+        Returns:
+            True if idle, False on timeout
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self._jobs or self._running is not None:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get compaction statistics
+
+        Returns:
+            Dictionary with jobs run and failed, seconds spent, the last
+            run's time, records, bytes and partitions reclaimed, and
+            pending (queued or running) jobs
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._jobs) + (self._running is not None)
+        return stats
@@ -0,0 +1,327 @@
+"""
+Scan Analytics Module for MediScan
+Columnar copy of scan history for vectorized aggregations
+"""
+
+import math
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Initial row capacity; doubled whenever it runs out
+INITIAL_CAPACITY = 1024
+
+# Rows converted per batch when rebuilding
+REBUILD_BATCH = 65536
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+# Column order of a row tuple
+COLUMNS = ('timestamp', 'success', 'confidence', 'processing_time', 'medicines_found', 'ocr_engine', 'scan_type')
+
+
+class ScanColumns:
+    """
+    Scan history as NumPy columns
+
+    One array per field: timestamp (datetime64[s]), success (bool),
+    confidence and processing_time (float32), medicines_found (int32), and
+    ocr_engine / scan_type as int16 codes into small lookup tables. Arrays
+    grow by doubling, so appending a scan is amortized O(1), and every
+    aggregation is a handful of vectorized passes over the columns instead
+    of a loop over entry dicts.
+
+    Scans normally arrive in timestamp order; while they do, a time window
+    is a binary search and a slice (views, no copies). Out-of-order rows
+    switch filtering to a boolean mask.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        """
+        Initialize empty columns
+
+        Args:
+            capacity: Rows allocated up front
+        """
+        self._size = 0
+        self._sorted = True
+        self._as_of: Optional[int] = None
+        self._labels: Dict[str, List[str]] = {'ocr_engine': [], 'scan_type': []}
+        self._codes: Dict[str, Dict[str, int]] = {'ocr_engine': {}, 'scan_type': {}}
+        self._allocate(max(1, capacity))
+
+    def _allocate(self, capacity: int):
+        """(Re)allocate the columns, keeping existing rows"""
+        old = getattr(self, '_columns', None)
+        self._columns = {
+            'timestamp': np.empty(capacity, dtype='datetime64[s]'),
+            'success': np.empty(capacity, dtype=bool),
+            'confidence': np.empty(capacity, dtype=np.float32),
+            'processing_time': np.empty(capacity, dtype=np.float32),
+            'medicines_found': np.empty(capacity, dtype=np.int32),
+            'ocr_engine': np.empty(capacity, dtype=np.int16),
+            'scan_type': np.empty(capacity, dtype=np.int16),
+        }
+        if old is not None:
+            for name, column in old.items():
+                self._columns[name][:self._size] = column[:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _code(self, field: str, value: Any) -> int:
+        """Code of a categorical value, adding it to the lookup table"""
+        label = str(value) if value is not None else 'unknown'
+        codes = self._codes[field]
+        code = codes.get(label)
+        if code is None:
+            code = codes[label] = len(self._labels[field])
+            self._labels[field].append(label)
+        return code
+
+    @staticmethod
+    def _number(value: Any) -> float:
+        """Numeric field value (NaN when missing or invalid)"""
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float('nan')
+
+    def _row(self, scan: Dict[str, Any]) -> Optional[tuple]:
+        """Column values of a scan entry (None if it has no timestamp)"""
+        timestamp = scan.get('timestamp')
+        if not isinstance(timestamp, str):
+            return None
+
+        found = self._number(scan.get('medicines_found'))
+        return (
+            timestamp,
+            bool(scan.get('success', False)),
+            self._number(scan.get('confidence')),
+            self._number(scan.get('processing_time')),
+            int(found) if math.isfinite(found) else 0,
+            self._code('ocr_engine', scan.get('ocr_engine')),
+            self._code('scan_type', scan.get('scan_type')),
+        )
+
+    @staticmethod
+    def _timestamps(values: Sequence[str]) -> np.ndarray:
+        """Parse ISO timestamps in one vectorized call (NaT for invalid ones)"""
+        try:
+            return np.array(values, dtype='datetime64[us]').astype('datetime64[s]')
+        except ValueError:
+            parsed = []
+            for value in values:
+                try:
+                    parsed.append(np.datetime64(datetime.fromisoformat(value), 's'))
+                except ValueError:
+                    parsed.append(np.datetime64('NaT'))
+            return np.array(parsed, dtype='datetime64[s]')
+
+    def _append_rows(self, rows: List[tuple]):
+        """Append rows as one vectorized copy per column"""
+        if not rows:
+            return
+
+        columns = list(zip(*rows))
+        timestamps = self._timestamps(columns[0])
+        valid = ~np.isnat(timestamps)
+        if not valid.all():
+            rows = [row for row, ok in zip(rows, valid) if ok]
+            if not rows:
+                return
+            columns = list(zip(*rows))
+            timestamps = timestamps[valid]
+
+        needed = self._size + len(rows)
+        capacity = len(self._columns['timestamp'])
+        if needed > capacity:
+            while capacity < needed:
+                capacity *= 2
+            self._allocate(capacity)
+
+        if self._sorted:
+            previous = self._columns['timestamp'][self._size - 1:self._size]
+            self._sorted = bool(np.all(np.diff(np.concatenate((previous, timestamps))) >= np.timedelta64(0, 's')))
+
+        end = self._size + len(rows)
+        self._columns['timestamp'][self._size:end] = timestamps
+        for name, values in zip(COLUMNS[1:], columns[1:]):
+            column = self._columns[name]
+            column[self._size:end] = np.array(values, dtype=column.dtype)
+        self._size = end
+
+    def add(self, scan: Dict[str, Any]):
+        """Append one scan history entry"""
+        row = self._row(scan)
+        if row is not None:
+            self._append_rows([row])
+
+    def rebuild(self, scans: Iterable[Dict[str, Any]], today: Optional[date] = None):
+        """
+        Load the columns from scan history entries
+
+        Args:
+            scans: Scan entries (consumed once; a generator keeps memory low)
+            today: Date the columns are built for (defaults to today)
+        """
+        self._size = 0
+        self._sorted = True
+        self._labels = {'ocr_engine': [], 'scan_type': []}
+        self._codes = {'ocr_engine': {}, 'scan_type': {}}
+        self._allocate(INITIAL_CAPACITY)
+
+        batch = []
+        for scan in scans:
+            row = self._row(scan)
+            if row is not None:
+                batch.append(row)
+            if len(batch) == REBUILD_BATCH:
+                self._append_rows(batch)
+                batch = []
+        self._append_rows(batch)
+        self._as_of = (today or datetime.now().date()).toordinal()
+
+    def is_current(self, today: Optional[date] = None) -> bool:
+        """True if the columns were built for the given day"""
+        return self._as_of == (today or datetime.now().date()).toordinal()
+
+    def _view(self, name: str) -> np.ndarray:
+        """Filled part of a column"""
+        return self._columns[name][:self._size]
+
+    def _rows(self, since: Optional[datetime]):
+        """Index selecting rows at or after since: a slice while sorted, else a mask"""
+        timestamps = self._view('timestamp')
+        if since is None:
+            return slice(0, self._size)
+        bound = np.datetime64(since, 's')
+        if self._sorted:
+            return slice(int(np.searchsorted(timestamps, bound, side='left')), self._size)
+        return timestamps >= bound
+
+    def _select(self, name: str, since: Optional[datetime]) -> np.ndarray:
+        """Values of a column for rows at or after since"""
+        return self._view(name)[self._rows(since)]
+
+    def daily_counts(self, since: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Scans per calendar day
+
+        Args:
+            since: Earliest time counted (None for all)
+
+        Returns:
+            Dictionary of ISO date -> scan count, days without scans omitted
+        """
+        days = self._select('timestamp', since).astype('datetime64[D]')
+        if not len(days):
+            return {}
+
+        first = days.min()
+        counts = np.bincount((days - first).astype(np.int64))
+        present = np.nonzero(counts)[0]
+        return {str(first + offset): int(counts[offset]) for offset in present}
+
+    def success_rate(self, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Successful scans and their share
+
+        Args:
+            since: Earliest time counted (None for all)
+
+        Returns:
+            Dictionary with total, successful and rate (0.0 without scans)
+        """
+        success = self._select('success', since)
+        total = int(len(success))
+        successful = int(np.count_nonzero(success))
+        return {'total': total, 'successful': successful, 'rate': successful / total if total else 0.0}
+
+    def latency_percentiles(self, since: Optional[datetime] = None,
+                            percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Dict[str, float]]:
+        """
+        Processing time percentiles per OCR engine
+
+        Args:
+            since: Earliest time counted (None for all)
+            percentiles: Percentiles to compute (0-100)
+
+        Returns:
+            Dictionary of engine -> {'count': n, 'p50': seconds, ...}
+        """
+        engines = self._select('ocr_engine', since)
+        times = self._select('processing_time', since)
+        valid = ~np.isnan(times)
+        engines, times = engines[valid], times[valid]
+
+        result = {}
+        counts = np.bincount(engines, minlength=len(self._labels['ocr_engine']))
+        for code in np.nonzero(counts)[0]:
+            # np.percentile partitions rather than sorts: O(n) per engine
+            values = np.percentile(times[engines == code], percentiles)
+            stats = {'count': int(counts[code])}
+            stats.update({f"p{p:g}": round(float(v), 4) for p, v in zip(percentiles, values)})
+            result[self._labels['ocr_engine'][code]] = stats
+        return result
+
+    def confidence_histogram(self, since: Optional[datetime] = None, bins: int = 10) -> Dict[str, List]:
+        """
+        Histogram of OCR confidence over [0, 1]
+
+        Args:
+            since: Earliest time counted (None for all)
+            bins: Number of equal-width bins
+
+        Returns:
+            Dictionary with bin 'edges' (bins + 1 values) and 'counts'
+        """
+        confidence = self._select('confidence', since)
+        confidence = confidence[~np.isnan(confidence)]
+        counts, edges = np.histogram(np.clip(confidence, 0.0, 1.0), bins=bins, range=(0.0, 1.0))
+        return {'edges': [round(float(edge), 4) for edge in edges], 'counts': counts.tolist()}
+
+    def counts_by(self, field: str, since: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Scans per OCR engine or scan type
+
+        Args:
+            field: 'ocr_engine' or 'scan_type'
+            since: Earliest time counted (None for all)
+
+        Returns:
+            Dictionary of value -> scan count
+        """
+        counts = np.bincount(self._select(field, since), minlength=len(self._labels[field]))
+        return {label: int(count) for label, count in zip(self._labels[field], counts) if count}
+
+    def summary(self, since: Optional[datetime] = None, bins: int = 10,
+                percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+        """
+        Every aggregation at once
+
+        Args:
+            since: Earliest time counted (None for all)
+            bins: Confidence histogram bins
+            percentiles: Latency percentiles
+
+        Returns:
+            Dictionary with daily_counts, success, latency_by_engine,
+            confidence_histogram, by_engine and by_scan_type
+        """
+        return {
+            'daily_counts': self.daily_counts(since),
+            'success': self.success_rate(since),
+            'latency_by_engine': self.latency_percentiles(since, percentiles),
+            'confidence_histogram': self.confidence_histogram(since, bins),
+            'by_engine': self.counts_by('ocr_engine', since),
+            'by_scan_type': self.counts_by('scan_type', since),
+        }
+
+    def nbytes(self) -> int:
+        """Memory held by the columns"""
+        return sum(column.nbytes for column in self._columns.values())
@@ -0,0 +1,256 @@
+"""
+Scan Recorder Module for MediScan
+Write-behind queue persisting scan history off the scan's critical path
+"""
+
+import atexit
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+import logging
+
+try:
+    from .storage import flush_all
+except ImportError:
+    from storage import flush_all
+
+logger = logging.getLogger(__name__)
+
+# What record() does when the queue is full
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+DEFAULT_MAX_QUEUE = 1000
+DEFAULT_BATCH_SIZE = 100
+# Seconds the writer waits for more entries before writing a batch
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+# Live recorders, flushed at interpreter exit
+_recorders: "weakref.WeakSet[ScanHistoryRecorder]" = weakref.WeakSet()
+
+
+class ScanHistoryRecorder:
+    """
+    Write-behind buffer for scan history
+
+    record() stamps the entry with the scan time and appends it to a
+    bounded in-memory queue, returning without any I/O. A background
+    thread drains the queue in batches of up to batch_size entries, each
+    saved with one save_scan_history_batch call (one lock acquisition and
+    one store write), after waiting up to flush_interval for a batch to
+    fill.
+
+    When the queue is full the overflow policy applies: 'drop_oldest'
+    discards the oldest queued entry, 'drop_newest' discards the new one,
+    and 'block' waits up to block_timeout for room before discarding the
+    new one. Entries not yet written are lost if the process is killed;
+    flush() and close() (also run at interpreter exit) write them out.
+    """
+
+    def __init__(self, handler, max_queue: int = DEFAULT_MAX_QUEUE, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, overflow: str = "drop_oldest",
+                 block_timeout: float = 1.0):
+        """
+        Initialize the recorder
+
+        Args:
+            handler: DatabaseHandler (anything with save_scan_history_batch)
+            max_queue: Entries held before the overflow policy applies
+            batch_size: Most entries saved per write
+            flush_interval: Seconds to wait for a batch to fill
+            overflow: One of OVERFLOW_POLICIES
+            block_timeout: Seconds record() waits for room with 'block'
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self.handler = handler
+        self.max_queue = max(1, max_queue)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._cond = threading.Condition()
+        self._queue: Deque[Dict] = deque()
+        # Entries taken off the queue and being written
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'queued': 0, 'flushed': 0, 'dropped': 0, 'failed': 0, 'batches': 0, 'max_pending': 0}
+
+        _recorders.add(self)
+
+    def record(self, scan_data: Dict) -> bool:
+        """
+        Queue a scan history entry for writing
+
+        Args:
+            scan_data: Scan information as for DatabaseHandler.save_scan_history
+
+        Returns:
+            True if queued, False if dropped (queue full or recorder closed)
+        """
+        entry = dict(scan_data)
+        entry.setdefault('timestamp', datetime.now().isoformat())
+
+        with self._cond:
+            if self._closed:
+                self._count_drop()
+                return False
+
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == 'drop_oldest':
+                    self._queue.popleft()
+                    self._count_drop()
+                elif self.overflow == 'drop_newest' or not self._wait_for_room():
+                    self._count_drop()
+                    return False
+
+            self._queue.append(entry)
+            self._stats['queued'] += 1
+            self._stats['max_pending'] = max(self._stats['max_pending'], len(self._queue))
+            self._start_writer()
+            self._cond.notify_all()
+            return True
+
+    def _count_drop(self):
+        """Count a dropped entry, warning on the first and every 100th (condition held)"""
+        self._stats['dropped'] += 1
+        if self._stats['dropped'] % 100 == 1:
+            logger.warning(f"Scan history queue full or closed; {self._stats['dropped']} entries dropped so far")
+
+    def _wait_for_room(self) -> bool:
+        """Wait up to block_timeout for queue space (condition held)"""
+        deadline = time.monotonic() + self.block_timeout
+        while len(self._queue) >= self.max_queue and not self._closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._cond.notify_all()
+            self._cond.wait(remaining)
+        return not self._closed
+
+    def _start_writer(self):
+        """Start the background writer (condition held)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._write_loop, name="scan-history-writer", daemon=True)
+        self._thread.start()
+
+    def _write_loop(self):
+        """Background loop writing queued entries in batches"""
+        with self._cond:
+            while True:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+
+                # Linger so a burst of scans shares one write
+                deadline = time.monotonic() + self.flush_interval
+                while (len(self._queue) < self.batch_size and not self._flush_requested
+                       and not self._closed):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._in_flight = len(batch)
+                # Room freed for writers blocked by the 'block' policy
+                self._cond.notify_all()
+
+                self._cond.release()
+                try:
+                    saved = self.handler.save_scan_history_batch(batch)
+                except Exception as e:
+                    logger.error(f"Error writing scan history batch: {e}")
+                    saved = False
+                finally:
+                    self._cond.acquire()
+
+                self._in_flight = 0
+                self._stats['batches'] += 1
+                if saved:
+                    self._stats['flushed'] += len(batch)
+                else:
+                    self._stats['failed'] += len(batch)
+                if not self._queue:
+                    self._flush_requested = False
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every queued entry has been written
+
+        Args:
+            timeout: Seconds to wait (None waits as long as it takes)
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            if self._queue:
+                self._start_writer()
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._queue or self._in_flight:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self._flush_requested = False
+            return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write out queued entries and stop the background writer
+
+        Entries recorded after close are dropped.
+
+        Args:
+            timeout: Seconds to wait for the final flush
+
+        Returns:
+            True if every queued entry was written
+        """
+        drained = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return drained
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get recorder statistics
+
+        Returns:
+            Dictionary with queued, flushed, dropped and failed entry
+            counts, batches written, pending (not yet written) entries and
+            max_pending (the most entries queued at once)
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._queue) + self._in_flight
+        stats['overflow'] = self.overflow
+        return stats
+
+
+@atexit.register
+def close_all():
+    """Write out every recorder's queue (runs at interpreter exit)"""
+    for recorder in list(_recorders):
+        try:
+            recorder.close(timeout=10)
+        except Exception as e:
+            logger.error(f"Error flushing scan history: {e}")
+    # Deferred writes made by the final batches
+    flush_all()
@@ -0,0 +1,301 @@
+"""
+Search Index Module for MediScan
+Inverted full-text index over saved medicines
+"""
+
+import bisect
+import re
+from typing import Dict, List, Optional, Set, Tuple, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Indexed fields and their ranking weight
+SEARCH_FIELD_WEIGHTS = {
+    'name': 3.0,
+    'batch_no': 3.0,
+    'manufacturer': 2.0,
+    'dosage': 1.0,
+    'form': 1.0,
+    'instructions': 1.0,
+}
+
+# Score multipliers by how a query token matched an indexed token
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.6
+TYPO_MATCH = 0.4
+
+# Shortest token considered for typo-tolerant matching
+MIN_TYPO_TOKEN_LENGTH = 4
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lowercase alphanumeric tokens of a value"""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+def _deletes(token: str) -> Set[str]:
+    """Token variants with one character removed"""
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insertion, deletion, substitution or transposition"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return (len(diffs) == 2 and diffs[1] == diffs[0] + 1
+                and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]])
+
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class SearchIndex:
+    """
+    Inverted index for medicine search
+
+    Every indexed field is tokenized into lowercase alphanumeric tokens;
+    each token keeps a posting map of medicine id -> field weight. A
+    sorted vocabulary answers prefix queries with a binary search, so the
+    last word of a query can be matched as it is typed. Typo tolerance
+    (one edit) uses a delete-neighbourhood index that is only built the
+    first time a fuzzy query arrives. All structures are updated in place
+    on add and remove.
+    """
+
+    def __init__(self, field_weights: Optional[Dict[str, float]] = None):
+        """
+        Initialize an empty index
+
+        Args:
+            field_weights: Indexed field -> ranking weight
+        """
+        self.field_weights = field_weights or SEARCH_FIELD_WEIGHTS
+
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_tokens: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []
+        self._bulk_loading = False
+        # one-character deletion -> tokens, built on the first fuzzy query
+        self._delete_index: Optional[Dict[str, Set[str]]] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    def _medicine_tokens(self, medicine: Dict[str, Any]) -> Dict[str, float]:
+        """Token -> highest field weight for a medicine"""
+        tokens: Dict[str, float] = {}
+        for field, weight in self.field_weights.items():
+            for token in tokenize(medicine.get(field)):
+                if weight > tokens.get(token, 0.0):
+                    tokens[token] = weight
+        return tokens
+
+    def _add_token(self, token: str):
+        """Register a new vocabulary token"""
+        if self._bulk_loading:
+            # rebuild() sorts once at the end
+            self._vocabulary.append(token)
+            return
+
+        bisect.insort(self._vocabulary, token)
+        if self._delete_index is not None:
+            for variant in _deletes(token):
+                self._delete_index.setdefault(variant, set()).add(token)
+
+    def _drop_token(self, token: str):
+        """Remove a token that no longer has postings"""
+        position = bisect.bisect_left(self._vocabulary, token)
+        if position < len(self._vocabulary) and self._vocabulary[position] == token:
+            del self._vocabulary[position]
+
+        if self._delete_index is not None:
+            for variant in _deletes(token):
+                tokens = self._delete_index.get(variant)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._delete_index[variant]
+
+    def add(self, medicine_id: str, medicine: Dict[str, Any]):
+        """Index a medicine (replacing any previous entry with the same id)"""
+        self.remove(medicine_id)
+
+        tokens = self._medicine_tokens(medicine)
+        self._doc_tokens[medicine_id] = tokens
+
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._add_token(token)
+            postings[medicine_id] = weight
+
+    def remove(self, medicine_id: str):
+        """Remove a medicine from the index"""
+        tokens = self._doc_tokens.pop(medicine_id, None)
+        if tokens is None:
+            return
+
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(medicine_id, None)
+            if not postings:
+                del self._postings[token]
+                self._drop_token(token)
+
+    def rebuild(self, medicines: List[Dict[str, Any]]):
+        """Rebuild the index from a list of medicines"""
+        self._postings.clear()
+        self._doc_tokens.clear()
+        self._vocabulary = []
+        self._delete_index = None
+
+        self._bulk_loading = True
+        try:
+            for medicine in medicines:
+                if medicine.get('id'):
+                    self.add(medicine['id'], medicine)
+        finally:
+            self._bulk_loading = False
+            self._vocabulary.sort()
+
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        """Vocabulary tokens starting with prefix"""
+        position = bisect.bisect_left(self._vocabulary, prefix)
+        tokens = []
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            tokens.append(self._vocabulary[position])
+            position += 1
+        return tokens
+
+    def _typo_tokens(self, token: str) -> Set[str]:
+        """Vocabulary tokens within one edit of token"""
+        if len(token) < MIN_TYPO_TOKEN_LENGTH:
+            return set()
+
+        if self._delete_index is None:
+            self._delete_index = {}
+            for vocabulary_token in self._vocabulary:
+                for variant in _deletes(vocabulary_token):
+                    self._delete_index.setdefault(variant, set()).add(vocabulary_token)
+
+        candidates = set()
+        for variant in _deletes(token) | {token}:
+            candidates.update(self._delete_index.get(variant, ()))
+            if variant in self._postings:
+                candidates.add(variant)
+
+        return {candidate for candidate in candidates if _within_one_edit(token, candidate)}
+
+    def _match_token(self, token: str, prefix: bool, max_typos: int) -> Dict[str, float]:
+        """Medicine id -> best score for one query token"""
+        matches: List[Tuple[str, float]] = []
+        if token in self._postings:
+            matches.append((token, EXACT_MATCH))
+
+        if prefix:
+            for candidate in self._prefix_tokens(token):
+                if candidate != token:
+                    # Closer completions rank higher
+                    matches.append((candidate, PREFIX_MATCH * len(token) / len(candidate)))
+
+        if max_typos > 0 and not matches:
+            for candidate in self._typo_tokens(token):
+                matches.append((candidate, TYPO_MATCH))
+
+        if not matches:
+            return {}
+
+        # Strongest match first, so later candidates only fill gaps or improve
+        matches.sort(key=lambda match: -match[1])
+        candidate, multiplier = matches[0]
+        scores = {medicine_id: weight * multiplier for medicine_id, weight in self._postings[candidate].items()}
+
+        for candidate, multiplier in matches[1:]:
+            for medicine_id, weight in self._postings[candidate].items():
+                score = weight * multiplier
+                if score > scores.get(medicine_id, 0.0):
+                    scores[medicine_id] = score
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = None, prefix: bool = True,
+               max_typos: int = 0) -> List[Tuple[str, float]]:
+        """
+        Search the index
+
+        Every query word must match. The last word also matches as a
+        prefix (type-ahead) when prefix is set; with max_typos=1 a word
+        without exact or prefix matches may match within one edit.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of results (None for all)
+            prefix: Treat the last query word as a prefix
+            max_typos: 0 or 1
+
+        Returns:
+            List of (medicine id, score), best first
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        scores: Optional[Dict[str, float]] = None
+        for position, token in enumerate(tokens):
+            is_last = position == len(tokens) - 1
+            token_scores = self._match_token(token, prefix and is_last, max_typos)
+
+            if scores is None:
+                scores = token_scores
+            else:
+                # Intersect by iterating the smaller side
+                small, large = (scores, token_scores) if len(scores) <= len(token_scores) else (token_scores, scores)
+                scores = {
+                    medicine_id: score + large[medicine_id]
+                    for medicine_id, score in small.items() if medicine_id in large
+                }
+            if not scores:
+                return []
+
+        # Stable sort: equal scores keep indexing order
+        ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(medicine_id, scores[medicine_id]) for medicine_id in ranked]
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[str]:
+        """
+        Type-ahead completions for a partial word
+
+        Args:
+            prefix: Partial word as typed
+            limit: Maximum number of suggestions
+
+        Returns:
+            Indexed words starting with prefix, most frequent first
+        """
+        tokens = tokenize(prefix)
+        if not tokens:
+            return []
+
+        completions = self._prefix_tokens(tokens[-1])
+        completions.sort(key=lambda token: (-len(self._postings[token]), token))
+        return completions[:limit]
@@ -0,0 +1,213 @@
+"""
+Serializers Module for MediScan
+Pluggable on-disk formats for the whole-file data files
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+try:
+    from .storage import atomic_write_bytes, flush_all
+except ImportError:
+    from storage import atomic_write_bytes, flush_all
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERIALIZER = "json"
+
+
+class Serializer:
+    """
+    Codec for a data file
+
+    Subclasses set name, extension and available, and implement dumps and
+    loads. Serializers sharing an extension read each other's files.
+    """
+
+    name = ""
+    extension = ""
+    available = True
+
+    def dumps(self, data: Any) -> bytes:
+        """Encode data"""
+        raise NotImplementedError
+
+    def loads(self, raw: bytes) -> Any:
+        """Decode data"""
+        raise NotImplementedError
+
+
+class JSONSerializer(Serializer):
+    """Pretty-printed JSON through the standard library (the original format)"""
+
+    name = "json"
+    extension = ".json"
+
+    def dumps(self, data: Any) -> bytes:
+        return json.dumps(data, indent=2, default=str).encode('utf-8')
+
+    def loads(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+
+class OrjsonSerializer(Serializer):
+    """Pretty-printed JSON through orjson: same files, several times faster"""
+
+    name = "orjson"
+    extension = ".json"
+    available = ORJSON_AVAILABLE
+
+    def dumps(self, data: Any) -> bytes:
+        return orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, raw: bytes) -> Any:
+        return orjson.loads(raw)
+
+
+class MsgpackSerializer(Serializer):
+    """Compact binary MessagePack"""
+
+    name = "msgpack"
+    extension = ".msgpack"
+    available = MSGPACK_AVAILABLE
+
+    def dumps(self, data: Any) -> bytes:
+        return msgpack.packb(data, default=str, use_bin_type=True)
+
+    def loads(self, raw: bytes) -> Any:
+        return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+
+SERIALIZERS: Dict[str, Serializer] = {
+    serializer.name: serializer
+    for serializer in (JSONSerializer(), OrjsonSerializer(), MsgpackSerializer())
+}
+
+
+def get_serializer(name: str = DEFAULT_SERIALIZER) -> Serializer:
+    """
+    Serializer by name, falling back to json when its package is missing
+
+    Args:
+        name: 'json', 'orjson' or 'msgpack'
+
+    Returns:
+        Serializer instance
+    """
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer: {name}")
+
+    serializer = SERIALIZERS[name]
+    if not serializer.available:
+        logger.warning(f"{name} not installed; data files use json")
+        return SERIALIZERS['json']
+    return serializer
+
+
+def serializer_for_path(path: str) -> Serializer:
+    """Serializer able to read a file, chosen by extension (fastest available)"""
+    extension = os.path.splitext(path)[1]
+    candidates = [s for s in SERIALIZERS.values() if s.extension == extension and s.available]
+    if not candidates:
+        raise ValueError(f"No serializer for {path}")
+    return candidates[-1]
+
+
+def data_file(data_dir: str, stem: str, serializer: Serializer) -> str:
+    """Path of a data file in a serializer's format"""
+    return os.path.join(data_dir, stem + serializer.extension)
+
+
+def find_data_file(data_dir: str, stem: str) -> Optional[Tuple[str, Serializer]]:
+    """
+    Existing data file under any format
+
+    Args:
+        data_dir: Data directory
+        stem: File name without extension, e.g. 'medicines'
+
+    Returns:
+        (path, serializer able to read it) for the most recently written
+        match, or None
+    """
+    found = []
+    for extension in dict.fromkeys(s.extension for s in SERIALIZERS.values()):
+        path = os.path.join(data_dir, stem + extension)
+        if os.path.exists(path):
+            found.append((os.path.getmtime(path), path))
+
+    if not found:
+        return None
+    path = max(found)[1]
+    return path, serializer_for_path(path)
+
+
+def migrate_data_file(data_dir: str, stem: str, serializer: Serializer) -> str:
+    """
+    Convert a data file to a serializer's format if it exists in another one
+
+    The converted file is written and synced before the old one is
+    removed, so a crash leaves at least one complete copy; if both are
+    left, the next call keeps the newer. Callers hold the data directory's
+    exclusive lock.
+
+    Args:
+        data_dir: Data directory
+        stem: File name without extension
+        serializer: Target serializer
+
+    Returns:
+        Path of the data file in the target format (which may not exist yet)
+    """
+    target = data_file(data_dir, stem, serializer)
+    existing = find_data_file(data_dir, stem)
+    if existing is None:
+        return target
+    if existing[0] == target:
+        # Leftovers of a conversion interrupted before the old file was removed
+        for other in {s.extension for s in SERIALIZERS.values()} - {serializer.extension}:
+            stale = os.path.join(data_dir, stem + other)
+            if os.path.exists(stale):
+                os.remove(stale)
+        return target
+
+    # Queued writes to the old file must not land after it is removed
+    flush_all()
+    source, source_serializer = existing
+    with open(source, 'rb') as f:
+        data = source_serializer.loads(f.read())
+    atomic_write_bytes(target, serializer.dumps(data), durability='full')
+    os.remove(source)
+
+    logger.info(f"Converted {source} to {serializer.name} ({target})")
+    return target
+
+
+def convert_file(source: str, destination: str):
+    """
+    Convert a data file between formats, chosen by extension
+
+    For example, medicines.msgpack to medicines.json gives a
+    human-readable copy.
+
+    Args:
+        source: Existing data file
+        destination: File to write
+    """
+    with open(source, 'rb') as f:
+        data = serializer_for_path(source).loads(f.read())
+    atomic_write_bytes(destination, serializer_for_path(destination).dumps(data))
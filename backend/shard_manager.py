@@ -0,0 +1,262 @@
+"""
+Shard Manager Module for MediScan
+Partitions medicines and scan history by user
+"""
+
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Any
+import logging
+
+try:
+    from .database_handler import DatabaseHandler
+except ImportError:
+    from database_handler import DatabaseHandler
+
+logger = logging.getLogger(__name__)
+
+# Sub-directory of data_dir holding one directory per shard
+SHARDS_DIR = "shards"
+
+# Shard name of the unsharded data in data_dir itself
+DEFAULT_SHARD = "default"
+
+
+class ShardManager:
+    """
+    Per-user partitions of the medicine database
+
+    Each shard is a DatabaseHandler over its own directory, so it has its
+    own store, lock, caches and indexes: a user's writes rewrite and lock
+    only that user's data. Every user maps to a shard of their own, since
+    records carry no user id to tell users sharing a shard apart. Data
+    saved before sharding, and requests without a user, use the default
+    shard in data_dir itself.
+
+    Shards are opened lazily and kept in an LRU of at most max_open_shards;
+    the least recently used shard is closed when the limit is exceeded.
+    Cross-shard queries run on a thread pool over every shard on disk,
+    through the same LRU.
+    """
+
+    def __init__(self, data_dir: str = "data", max_open_shards: int = 32,
+                 max_workers: int = 4, **handler_options):
+        """
+        Initialize the shard manager
+
+        Args:
+            data_dir: Directory for the default shard and the shards directory
+            max_open_shards: Number of shards kept open
+            max_workers: Threads used by cross-shard queries
+            **handler_options: Passed to every shard's DatabaseHandler
+        """
+        self.data_dir = data_dir
+        self.shards_dir = os.path.join(data_dir, SHARDS_DIR)
+        self.max_open_shards = max(1, max_open_shards)
+        self.handler_options = handler_options
+
+        self._lock = threading.Lock()
+        self._open: "OrderedDict[str, DatabaseHandler]" = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mediscan-shard")
+
+        self._stats = {'opens': 0, 'hits': 0, 'evictions': 0}
+
+    def shard_name(self, user_id: Optional[str]) -> str:
+        """
+        Shard holding a user's data
+
+        Args:
+            user_id: User identifier (None for the default shard)
+
+        Returns:
+            Shard name, also its directory name under the shards directory
+        """
+        if user_id is None or user_id == '':
+            return DEFAULT_SHARD
+
+        digest = hashlib.sha1(str(user_id).encode('utf-8')).hexdigest()
+        return f"user-{digest[:16]}"
+
+    def _shard_dir(self, name: str) -> str:
+        """Directory of a shard"""
+        if name == DEFAULT_SHARD:
+            return self.data_dir
+        return os.path.join(self.shards_dir, name)
+
+    def _open_handler(self, name: str) -> DatabaseHandler:
+        """Create a handler for a shard"""
+        return DatabaseHandler(data_dir=self._shard_dir(name), **self.handler_options)
+
+    def get_shard(self, user_id: Optional[str] = None) -> DatabaseHandler:
+        """
+        DatabaseHandler for a user's shard, opening it if needed
+
+        Args:
+            user_id: User identifier (None for the default shard)
+
+        Returns:
+            The shard's DatabaseHandler
+        """
+        return self._get_handler(self.shard_name(user_id))
+
+    def _get_handler(self, name: str) -> DatabaseHandler:
+        """Open shard handler from the LRU, opening the shard if needed"""
+        evicted = []
+
+        with self._lock:
+            handler = self._open.get(name)
+            if handler is not None:
+                self._open.move_to_end(name)
+                self._stats['hits'] += 1
+                return handler
+
+            handler = self._open_handler(name)
+            self._open[name] = handler
+            self._stats['opens'] += 1
+
+            while len(self._open) > self.max_open_shards:
+                _, old = self._open.popitem(last=False)
+                evicted.append(old)
+                self._stats['evictions'] += 1
+
+        # Flushing can block, so close outside the manager lock. A thread
+        # still using an evicted handler keeps working: stores reopen lazily.
+        for old in evicted:
+            self._close_handler(old)
+        return handler
+
+    def _close_handler(self, handler: DatabaseHandler):
+        """Flush and close a shard handler"""
+        try:
+            handler.close()
+        except Exception as e:
+            logger.error(f"Error closing shard {handler.data_dir}: {e}")
+
+    def list_shards(self) -> List[str]:
+        """Names of every shard on disk, default shard first"""
+        names = [DEFAULT_SHARD]
+        if os.path.isdir(self.shards_dir):
+            names.extend(sorted(
+                entry for entry in os.listdir(self.shards_dir)
+                if os.path.isdir(os.path.join(self.shards_dir, entry))
+            ))
+        return names
+
+    def _run_on_shard(self, name: str, fn: Callable[[DatabaseHandler], Any]) -> Any:
+        """Run fn on a shard, reusing its open handler and caches"""
+        return fn(self._get_handler(name))
+
+    def scatter(self, fn: Callable[[DatabaseHandler], Any]) -> Dict[str, Any]:
+        """
+        Run fn on every shard in parallel
+
+        Args:
+            fn: Function of a DatabaseHandler
+
+        Returns:
+            Dictionary of shard name -> result (shards that failed are omitted)
+        """
+        names = self.list_shards()
+        futures = {name: self._executor.submit(self._run_on_shard, name, fn) for name in names}
+
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"Error querying shard {name}: {e}")
+        return results
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Database statistics summed over every shard
+
+        Returns:
+            Statistics dictionary in the DatabaseHandler.get_statistics format
+            plus the number of shards
+        """
+        totals: Dict[str, Any] = {}
+        per_shard = self.scatter(lambda handler: handler.get_statistics())
+
+        for stats in per_shard.values():
+            for key, value in stats.items():
+                if isinstance(value, dict):
+                    bucket = totals.setdefault(key, {})
+                    for item, count in value.items():
+                        bucket[item] = bucket.get(item, 0) + count
+                else:
+                    totals[key] = totals.get(key, 0) + value
+
+        totals['shards'] = len(per_shard)
+        return totals
+
+    def search_medicines(self, query: str, limit: Optional[int] = None, max_typos: int = 0) -> List[Dict]:
+        """
+        Search medicines across every shard
+
+        Args:
+            query: Search query
+            limit: Maximum number of results per shard and overall (None for all)
+            max_typos: Allow this many typos per word (0 or 1)
+
+        Returns:
+            List of matching medicine dictionaries, best match first
+        """
+        per_shard = self.scatter(
+            lambda handler: handler.search_medicines_scored(query, limit=limit, max_typos=max_typos)
+        )
+        # Each shard's hits are already best first; merge them by score
+        merged = heapq.merge(*per_shard.values(), key=lambda hit: -hit[1])
+        return [medicine for medicine, _ in itertools.islice(merged, limit)]
+
+    def get_expiring_medicines(self, days_ahead: int = 7) -> List[Dict]:
+        """
+        Medicines expiring within specified days across every shard
+
+        Args:
+            days_ahead: Number of days to look ahead
+
+        Returns:
+            List of expiring medicine dictionaries sorted by expiry date
+        """
+        per_shard = self.scatter(lambda handler: handler.get_expiring_medicines(days_ahead))
+        medicines = [medicine for shard in per_shard.values() for medicine in shard]
+        return sorted(medicines, key=lambda x: x.get('days_until_expiry', float('inf')))
+
+    def get_expired_medicines(self) -> List[Dict]:
+        """
+        Expired medicines across every shard
+
+        Returns:
+            List of expired medicine dictionaries, earliest expiry first
+        """
+        per_shard = self.scatter(lambda handler: handler.get_expired_medicines())
+        medicines = [medicine for shard in per_shard.values() for medicine in shard]
+        return sorted(medicines, key=lambda x: x.get('days_until_expiry', 0))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Shard manager statistics
+
+        Returns:
+            Dictionary with open shard count, opens, hits and evictions
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open_shards'] = len(self._open)
+        return stats
+
+    def close(self):
+        """Close every open shard and stop the query threads"""
+        with self._lock:
+            handlers = list(self._open.values())
+            self._open.clear()
+
+        for handler in handlers:
+            self._close_handler(handler)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,272 @@
+"""
+Similarity Index Module for MediScan
+SimHash index used to detect near-duplicate saved medicines
+"""
+
+import hashlib
+from typing import Dict, List, Optional, Set, Tuple, Any
+import logging
+
+import numpy as np
+
+try:
+    from .medicine_store import normalize_expiry_date
+except ImportError:
+    from medicine_store import normalize_expiry_date
+
+logger = logging.getLogger(__name__)
+
+# Fields that identify a saved medicine, with their SimHash weight
+DEDUPE_FIELDS = {
+    'name': 2,
+    'batch_no': 2,
+    'manufacturer': 1,
+}
+
+# Fields telling distinct packs of one medicine apart: records whose
+# values differ (both set) are never near-duplicates
+DISTINCT_FIELDS = ('batch_no', 'expiry_date')
+
+# Characters OCR confuses, folded to one form before comparing, so
+# "Paracetam0l" / "BT23O1" match "Paracetamol" / "BT2301"
+OCR_CONFUSABLES = str.maketrans({'o': '0', 'q': '0', 'i': '1', 'l': '1', '|': '1',
+                                 's': '5', 'z': '2', 'b': '8'})
+
+SIGNATURE_BITS = 64
+
+# Bit positions of a signature, for shifting digests apart
+_BIT_SHIFTS = np.arange(SIGNATURE_BITS, dtype=np.uint64)
+
+# Most feature digests kept; names and batch numbers repeat the same
+# trigrams, so most features of a new record are already known
+MAX_CACHED_DIGESTS = 1 << 16
+
+# Most signatures an index keeps by identifying values, so a record
+# checked with find_duplicate and then added is signed once
+MAX_CACHED_SIGNATURES = 1 << 16
+
+# feature -> 64-bit digest
+_digests: Dict[str, int] = {}
+
+
+def _digest(feature: str) -> int:
+    """64-bit hash of a feature, cached"""
+    digest = _digests.get(feature)
+    if digest is None:
+        digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        if len(_digests) < MAX_CACHED_DIGESTS:
+            _digests[feature] = digest
+    return digest
+
+
+def fold_text(value: Any) -> str:
+    """Lowercase text with whitespace collapsed and OCR confusions folded"""
+    return ' '.join(str(value).lower().split()).translate(OCR_CONFUSABLES)
+
+
+def identity(medicine: Dict[str, Any]) -> Tuple[Optional[str], ...]:
+    """Folded DISTINCT_FIELDS of a medicine (None where unset)"""
+    values = []
+    for field in DISTINCT_FIELDS:
+        value = medicine.get(field)
+        if not value:
+            values.append(None)
+        elif field == 'expiry_date':
+            values.append(normalize_expiry_date(value) or fold_text(value))
+        else:
+            values.append(fold_text(value))
+    return tuple(values)
+
+
+def distinct_packs(a: Tuple[Optional[str], ...], b: Tuple[Optional[str], ...]) -> bool:
+    """True if two identities differ in a field set on both"""
+    return any(x is not None and y is not None and x != y for x, y in zip(a, b))
+
+
+class SimilarityIndex:
+    """
+    Near-duplicate index over saved medicines
+
+    Each medicine gets a 64-bit SimHash of character trigrams from its
+    name, batch number and manufacturer, with OCR confusions folded. The
+    signature is split into
+    max_distance + 1 bands, each indexed in its own hash table: two
+    signatures within max_distance bits of each other must agree on at
+    least one band, so a lookup only compares against the few records
+    sharing a band instead of the whole store. Records with none of the
+    identifying fields are tracked separately and only match each other.
+
+    Records with a different batch number or expiry date are distinct
+    packs, however close their signatures: they never match.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        """
+        Initialize an empty index
+
+        Args:
+            max_distance: Maximum Hamming distance between signatures of
+                records considered near-duplicates
+        """
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self.band_bits = SIGNATURE_BITS // self.band_count
+        self._band_mask = (1 << self.band_bits) - 1
+
+        self._signatures: Dict[str, int] = {}
+        # identifying values -> signature
+        self._signed: Dict[Tuple[Any, ...], Optional[int]] = {}
+        self._identities: Dict[str, Tuple[Optional[str], ...]] = {}
+        self._bands: List[Dict[int, Set[str]]] = [{} for _ in range(self.band_count)]
+        self._blank_ids: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._signatures) + len(self._blank_ids)
+
+    def _features(self, medicine: Dict[str, Any]) -> Dict[str, int]:
+        """Weighted trigram features of the identifying fields"""
+        features: Dict[str, int] = {}
+
+        for field, weight in DEDUPE_FIELDS.items():
+            value = medicine.get(field)
+            if not value:
+                continue
+
+            text = fold_text(value)
+            if len(text) < 3:
+                grams = [text]
+            else:
+                grams = [text[i:i + 3] for i in range(len(text) - 2)]
+
+            for gram in grams:
+                key = f"{field}:{gram}"
+                features[key] = features.get(key, 0) + weight
+
+        return features
+
+    def signature(self, medicine: Dict[str, Any]) -> Optional[int]:
+        """
+        Compute the SimHash signature of a medicine
+
+        Args:
+            medicine: Medicine dictionary
+
+        Returns:
+            64-bit signature, or None if no identifying field is set
+        """
+        key = tuple(medicine.get(field) for field in DEDUPE_FIELDS)
+        try:
+            return self._signed[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable field value: sign without caching
+            return self._sign(medicine)
+
+        if len(self._signed) >= MAX_CACHED_SIGNATURES:
+            self._signed.clear()
+        signature = self._signed[key] = self._sign(medicine)
+        return signature
+
+    def _sign(self, medicine: Dict[str, Any]) -> Optional[int]:
+        """SimHash of the weighted features of a medicine"""
+        features = self._features(medicine)
+        if not features:
+            return None
+
+        # Each feature adds its weight to the bits set in its digest and
+        # subtracts it from the others: one matrix product over all bits
+        digests = np.fromiter((_digest(feature) for feature in features), dtype=np.uint64, count=len(features))
+        bits = ((digests[:, None] >> _BIT_SHIFTS) & np.uint64(1)).astype(np.int64)
+        weights = np.fromiter(features.values(), dtype=np.int64, count=len(features))
+        vector = weights @ (2 * bits - 1)
+
+        return int(np.bitwise_or.reduce(np.where(vector > 0, np.uint64(1) << _BIT_SHIFTS, np.uint64(0))))
+
+    def _band_values(self, signature: int) -> List[int]:
+        """Split a signature into its band values"""
+        return [(signature >> (band * self.band_bits)) & self._band_mask for band in range(self.band_count)]
+
+    def add(self, medicine_id: str, medicine: Dict[str, Any]):
+        """Index a medicine (replacing any previous entry with the same id)"""
+        self.remove(medicine_id)
+        self._identities[medicine_id] = identity(medicine)
+
+        signature = self.signature(medicine)
+        if signature is None:
+            self._blank_ids.add(medicine_id)
+            return
+
+        self._signatures[medicine_id] = signature
+        for band, value in enumerate(self._band_values(signature)):
+            self._bands[band].setdefault(value, set()).add(medicine_id)
+
+    def remove(self, medicine_id: str):
+        """Remove a medicine from the index"""
+        self._blank_ids.discard(medicine_id)
+        self._identities.pop(medicine_id, None)
+
+        signature = self._signatures.pop(medicine_id, None)
+        if signature is None:
+            return
+
+        for band, value in enumerate(self._band_values(signature)):
+            bucket = self._bands[band].get(value)
+            if bucket is not None:
+                bucket.discard(medicine_id)
+                if not bucket:
+                    del self._bands[band][value]
+
+    def find_duplicate(self, medicine: Dict[str, Any], exclude_id: Optional[str] = None) -> Optional[str]:
+        """
+        Find the closest indexed near-duplicate of a medicine
+
+        Args:
+            medicine: Medicine dictionary
+            exclude_id: Id to ignore (the medicine itself)
+
+        Returns:
+            Id of the closest near-duplicate, or None
+        """
+        incoming = identity(medicine)
+        signature = self.signature(medicine)
+        if signature is None:
+            for medicine_id in self._blank_ids:
+                if medicine_id != exclude_id and not distinct_packs(incoming, self._identities[medicine_id]):
+                    return medicine_id
+            return None
+
+        best_id = None
+        best_distance = self.max_distance + 1
+
+        seen: Set[str] = set()
+        for band, value in enumerate(self._band_values(signature)):
+            for candidate_id in self._bands[band].get(value, ()):
+                if candidate_id in seen or candidate_id == exclude_id:
+                    continue
+                seen.add(candidate_id)
+
+                # Distance first: it rules out most candidates cheaply
+                distance = bin(signature ^ self._signatures[candidate_id]).count('1')
+                if distance > best_distance or (distance == best_distance
+                                                and (best_id is None or candidate_id > best_id)):
+                    continue
+                if distinct_packs(incoming, self._identities[candidate_id]):
+                    continue
+
+                best_id = candidate_id
+                best_distance = distance
+
+        return best_id
+
+    def rebuild(self, medicines: List[Dict[str, Any]]):
+        """Rebuild the index from a list of medicines"""
+        self._signatures.clear()
+        self._identities.clear()
+        self._blank_ids.clear()
+        for bands in self._bands:
+            bands.clear()
+
+        for medicine in medicines:
+            if medicine.get('id'):
+                self.add(medicine['id'], medicine)
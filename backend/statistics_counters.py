@@ -0,0 +1,192 @@
+"""
+Statistics Counters Module for MediScan
+Incrementally maintained counts behind DatabaseHandler.get_statistics
+"""
+
+import bisect
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Look-ahead for the "expiring soon" count
+EXPIRING_SOON_DAYS = 7
+
+# Window for the recent scan counts
+SCAN_WINDOW_DAYS = 30
+
+
+def _seconds_into_day(moment: datetime) -> float:
+    """Seconds since midnight of a datetime"""
+    return moment.hour * 3600 + moment.minute * 60 + moment.second + moment.microsecond / 1e6
+
+
+def _increment(counts: Dict[Any, int], key: Any, delta: int):
+    """Adjust a counter, dropping keys that reach zero"""
+    value = counts.get(key, 0) + delta
+    if value:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+class MedicineCounters:
+    """
+    Medicine counts by form, manufacturer and scan type
+
+    Each medicine's contribution is remembered so add and remove adjust
+    the counters in O(1). Expiry counts are not kept here: they depend
+    on the date and are read from the ExpiryIndex (see
+    DatabaseHandler.get_statistics).
+    """
+
+    def __init__(self):
+        """Initialize empty counters"""
+        # medicine id -> (form, manufacturer, scan type)
+        self._entries: Dict[str, Tuple[Any, Any, Any]] = {}
+        self._by_form: Dict[Any, int] = {}
+        self._by_manufacturer: Dict[Any, int] = {}
+        self._by_scan_type: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _apply(self, entry: Tuple[Any, Any, Any], delta: int):
+        """Add (delta=1) or subtract (delta=-1) one medicine's contribution"""
+        form, manufacturer, scan_type = entry
+        _increment(self._by_form, form, delta)
+        _increment(self._by_manufacturer, manufacturer, delta)
+        _increment(self._by_scan_type, scan_type, delta)
+
+    def add(self, medicine_id: str, medicine: Dict[str, Any]):
+        """Count a medicine (replacing any previous entry with the same id)"""
+        self.remove(medicine_id)
+
+        entry = (
+            medicine.get('form', 'Unknown'),
+            medicine.get('manufacturer', 'Unknown'),
+            medicine.get('scan_type', 'Unknown')
+        )
+        self._entries[medicine_id] = entry
+        self._apply(entry, 1)
+
+    def remove(self, medicine_id: str):
+        """Stop counting a medicine"""
+        entry = self._entries.pop(medicine_id, None)
+        if entry is not None:
+            self._apply(entry, -1)
+
+    def rebuild(self, medicines: List[Dict[str, Any]]):
+        """Recount from a list of medicines"""
+        self._entries.clear()
+        self._by_form.clear()
+        self._by_manufacturer.clear()
+        self._by_scan_type.clear()
+
+        for medicine in medicines:
+            if medicine.get('id'):
+                self.add(medicine['id'], medicine)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current medicine statistics
+
+        Returns:
+            Dictionary with the total and per-field counts
+        """
+        return {
+            'total_medicines': len(self._entries),
+            'by_form': dict(self._by_form),
+            'by_manufacturer': dict(self._by_manufacturer),
+            'by_scan_type': dict(self._by_scan_type)
+        }
+
+
+class ScanCounters:
+    """
+    Scan counts over a rolling window ending now
+
+    Scans are bucketed per calendar day, each bucket holding its totals
+    and its scans' times of day in order. An append is O(1) for scans in
+    time order, and a read sums the whole days of the window and bisects
+    the one day the window starts in, so the window begins exactly
+    window_days before now. Buckets that fall out of the window are
+    dropped when the counters are read.
+    """
+
+    def __init__(self, window_days: int = SCAN_WINDOW_DAYS):
+        """
+        Initialize empty counters
+
+        Args:
+            window_days: Number of past days counted
+        """
+        self.window_days = window_days
+        # date ordinal -> [scans, successful scans, [(seconds into the day, success)] sorted]
+        self._days: Dict[int, List[Any]] = {}
+        self._as_of: Optional[int] = None
+
+    def window_start(self, now: Optional[datetime] = None) -> datetime:
+        """Earliest time counted at the given time"""
+        return (now or datetime.now()) - timedelta(days=self.window_days)
+
+    def add(self, scan: Dict[str, Any]):
+        """Count one scan history entry"""
+        try:
+            timestamp = datetime.fromisoformat(scan['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        success = bool(scan.get('success', False))
+        bucket = self._days.setdefault(timestamp.toordinal(), [0, 0, []])
+        bucket[0] += 1
+        bucket[1] += success
+        times = bucket[2]
+        entry = (_seconds_into_day(timestamp), success)
+        if not times or times[-1] <= entry:
+            times.append(entry)
+        else:
+            bisect.insort(times, entry)
+
+    def rebuild(self, scans: List[Dict[str, Any]], today: Optional[date] = None):
+        """Recount from scan history entries"""
+        self._days.clear()
+        for scan in scans:
+            self.add(scan)
+        self._as_of = (today or datetime.now().date()).toordinal()
+
+    def is_current(self, today: Optional[date] = None) -> bool:
+        """True if the counters were built for the given day"""
+        return self._as_of == (today or datetime.now().date()).toordinal()
+
+    def snapshot(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Scan counts within the window
+
+        Args:
+            now: End of the window (defaults to now)
+
+        Returns:
+            Dictionary with scans_last_30_days and successful_scans
+        """
+        start = self.window_start(now)
+        first_day = start.toordinal()
+        for day in [day for day in self._days if day < first_day]:
+            del self._days[day]
+
+        scans = successful = 0
+        for day, (count, success_count, times) in self._days.items():
+            if day != first_day:
+                scans += count
+                successful += success_count
+                continue
+            # The window starts during this day: count its later scans only
+            tail = times[bisect.bisect_left(times, (_seconds_into_day(start), False)):]
+            scans += len(tail)
+            successful += sum(success for _, success in tail)
+
+        return {
+            'scans_last_30_days': scans,
+            'successful_scans': successful
+        }
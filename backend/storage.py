@@ -0,0 +1,387 @@
+"""
+Storage Module for MediScan
+Crash-safe file persistence shared by DatabaseHandler and ReminderSystem
+"""
+
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How hard a write tries to survive a crash or power loss:
+#   full     - fsync the file and its directory before the write returns
+#   normal   - fsync the file before the write returns
+#   deferred - return at once; flushed shortly after without fsync
+DURABILITY_LEVELS = ('full', 'normal', 'deferred')
+
+# Seconds a deferred write waits so later writes can join its flush
+DEFAULT_DEFERRED_WINDOW = 0.05
+
+
+def _check_durability(durability: str):
+    """Raise ValueError for unknown durability levels"""
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Unknown durability level: {durability}")
+
+
+def _fsync_directory(directory: str):
+    """Persist a rename by syncing its directory (no-op where unsupported)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def file_signature(*paths: str) -> tuple:
+    """
+    (mtime_ns, size, inode) of each path, None for missing files
+
+    Atomic replaces give the file a new inode, so a rewrite is noticed even
+    within one mtime tick and at the same size.
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def atomic_write_bytes(path: str, data: bytes, durability: str = "normal"):
+    """
+    Replace a file atomically
+
+    The data goes to a temp file in the same directory, which is synced
+    and then renamed over the target, so readers and crash recovery only
+    ever see the old or the new content, never a torn file.
+
+    Args:
+        path: Target file
+        data: New file content
+        durability: One of DURABILITY_LEVELS
+    """
+    temp_path = write_temp_file(path, data, durability)
+    replace_with_temp_file(temp_path, path, durability)
+
+
+def write_temp_file(path: str, data: bytes, durability: str = "normal") -> str:
+    """
+    First half of an atomic write: data in a synced temp file next to path
+
+    Lets a caller write outside its lock and take the lock only for
+    replace_with_temp_file (or discard_temp_file if it changes its mind).
+
+    Args:
+        path: Target file
+        data: New file content
+        durability: One of DURABILITY_LEVELS
+
+    Returns:
+        Path of the temp file
+    """
+    _check_durability(durability)
+    directory = os.path.dirname(path) or '.'
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if durability != 'deferred':
+                f.flush()
+                os.fsync(f.fileno())
+    except BaseException:
+        discard_temp_file(temp_path)
+        raise
+    return temp_path
+
+
+def replace_with_temp_file(temp_path: str, path: str, durability: str = "normal"):
+    """Second half of an atomic write: rename the temp file over path"""
+    try:
+        os.replace(temp_path, path)
+    except BaseException:
+        discard_temp_file(temp_path)
+        raise
+
+    if durability == 'full':
+        _fsync_directory(os.path.dirname(path) or '.')
+
+
+def discard_temp_file(temp_path: str):
+    """Remove a temp file from write_temp_file that will not be used"""
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+def dump_json(data: Any, indent: Optional[int] = 2) -> bytes:
+    """Serialize data the way the data files are written"""
+    return json.dumps(data, indent=indent, default=str).encode('utf-8')
+
+
+def atomic_write_json(path: str, data: Any, durability: str = "normal", indent: Optional[int] = 2):
+    """
+    Replace a JSON file atomically
+
+    Args:
+        path: Target file
+        data: JSON-serializable data
+        durability: One of DURABILITY_LEVELS
+        indent: JSON indentation
+    """
+    atomic_write_bytes(path, dump_json(data, indent), durability)
+
+
+class GroupCommitWriter:
+    """
+    Coalescing writer for whole-file JSON data
+
+    Writes are queued per path; only the latest data for a path is
+    serialized. The first writer to find no flush in progress becomes
+    the leader and flushes everything queued, while writers arriving
+    meanwhile queue up for the next flush. Under bursty load many writes
+    share one serialization and one fsync per file; a lone writer pays
+    no extra latency.
+
+    With durability 'full' or 'normal', write() returns once its data is
+    on disk. With 'deferred' it returns at once and a background thread
+    flushes after a short window. Queued data stays visible through
+    read() until it reaches disk. Files are JSON unless a serializer (see
+    the serializers module) is passed with the write and the read. Callers hand over the data they
+    write and must not mutate it afterwards.
+    """
+
+    def __init__(self, durability: str = "normal", window: Optional[float] = None):
+        """
+        Initialize the writer
+
+        Args:
+            durability: One of DURABILITY_LEVELS
+            window: Seconds the leader waits for more writes before
+                flushing (default: 0, or DEFAULT_DEFERRED_WINDOW when
+                deferred)
+        """
+        _check_durability(durability)
+        self.durability = durability
+        if window is None:
+            window = DEFAULT_DEFERRED_WINDOW if durability == 'deferred' else 0.0
+        self.window = window
+
+        self._cond = threading.Condition()
+        # path -> (data, indent, serializer) waiting for the next flush / being flushed
+        self._pending: Dict[str, tuple] = {}
+        self._in_flight: Dict[str, tuple] = {}
+        self._flushing = False
+        self._open_batch = 1
+        self._flushed_batch = 0
+        self._batch_errors: Dict[int, Dict[str, Exception]] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._stats = {'writes': 0, 'flushes': 0, 'files_written': 0}
+
+    def write(self, path: str, data: Any, indent: Optional[int] = 2, serializer=None):
+        """
+        Queue a whole-file write
+
+        Args:
+            path: Target file
+            data: Serializable data (ownership passes to the writer)
+            indent: JSON indentation (without a serializer)
+            serializer: serializers.Serializer encoding the file (None for JSON)
+
+        Raises:
+            OSError: If the flush containing this write failed
+        """
+        self.write_many({path: data}, indent, serializer)
+
+    def write_many(self, files: Dict[str, Any], indent: Optional[int] = 2, serializer=None):
+        """
+        Queue several whole-file writes so they share one flush
+
+        Args:
+            files: Target file -> serializable data
+            indent: JSON indentation (without a serializer)
+            serializer: serializers.Serializer encoding the files (None for JSON)
+
+        Raises:
+            OSError: If the flush containing these writes failed
+        """
+        with self._cond:
+            for path, data in files.items():
+                self._pending[path] = (data, indent, serializer)
+            self._stats['writes'] += len(files)
+            batch = self._open_batch
+
+            if self.durability == 'deferred':
+                self._start_flusher()
+                self._cond.notify_all()
+                return
+
+            while self._flushed_batch < batch:
+                if self._flushing:
+                    self._cond.wait()
+                else:
+                    self._flush_locked()
+
+            errors = self._batch_errors.get(batch, {})
+            error = next((errors[path] for path in files if path in errors), None)
+
+        if error is not None:
+            raise error
+
+    def _flush_locked(self):
+        """Flush everything queued (called with the condition held)"""
+        self._flushing = True
+        if self.window > 0:
+            self._cond.release()
+            try:
+                time.sleep(self.window)
+            finally:
+                self._cond.acquire()
+
+        batch = self._open_batch
+        self._open_batch += 1
+        self._in_flight, self._pending = self._pending, {}
+        items = list(self._in_flight.items())
+
+        self._cond.release()
+        errors = {}
+        try:
+            for path, (data, indent, serializer) in items:
+                try:
+                    payload = serializer.dumps(data) if serializer is not None else dump_json(data, indent)
+                    atomic_write_bytes(path, payload, self.durability)
+                except Exception as e:
+                    logger.error(f"Error writing {path}: {e}")
+                    errors[path] = e
+        finally:
+            self._cond.acquire()
+
+        self._in_flight = {}
+        self._flushed_batch = batch
+        self._flushing = False
+        self._stats['flushes'] += 1
+        self._stats['files_written'] += len(items) - len(errors)
+        if errors:
+            self._batch_errors[batch] = errors
+        for old_batch in [b for b in self._batch_errors if b < batch - 100]:
+            del self._batch_errors[old_batch]
+        self._cond.notify_all()
+
+    def _start_flusher(self):
+        """Start the background flusher for deferred writes"""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, name="group-commit-flusher", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        """Background loop flushing deferred writes"""
+        with self._cond:
+            while True:
+                while not self._pending:
+                    self._cond.wait()
+                if not self._flushing:
+                    self._flush_locked()
+                else:
+                    self._cond.wait()
+
+    def read(self, path: str, default: Any = None, serializer=None) -> Any:
+        """
+        Read a data file, including writes not yet flushed
+
+        Args:
+            path: File to read
+            default: Returned when the file does not exist
+            serializer: serializers.Serializer decoding the file (None for JSON)
+
+        Returns:
+            Parsed content (a private copy for queued data)
+        """
+        with self._cond:
+            queued = self._pending.get(path) or self._in_flight.get(path)
+            if queued is not None:
+                return copy.deepcopy(queued[0])
+
+            if not os.path.exists(path):
+                return default
+            with open(path, 'rb') as f:
+                raw = f.read()
+            return serializer.loads(raw) if serializer is not None else json.loads(raw)
+
+    def pending(self, path: str) -> bool:
+        """True if a write to path has not reached disk yet"""
+        with self._cond:
+            return path in self._pending or path in self._in_flight
+
+    def flush(self):
+        """Block until every queued write is on disk"""
+        with self._cond:
+            while self._pending or self._flushing:
+                if self._flushing:
+                    self._cond.wait()
+                else:
+                    self._flush_locked()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get writer statistics
+
+        Returns:
+            Dictionary with writes, flushes, files_written and coalesced
+            (writes that shared another write's flush)
+        """
+        with self._cond:
+            stats = dict(self._stats)
+        stats['durability'] = self.durability
+        stats['coalesced'] = stats['writes'] - stats['files_written']
+        return stats
+
+
+_writers: Dict[str, GroupCommitWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(durability: str = "normal") -> GroupCommitWriter:
+    """
+    Shared writer for a durability level
+
+    Components persisting at the same durability share one writer, so
+    their writes are coalesced together.
+
+    Args:
+        durability: One of DURABILITY_LEVELS
+
+    Returns:
+        GroupCommitWriter instance
+    """
+    _check_durability(durability)
+    with _writers_lock:
+        if durability not in _writers:
+            _writers[durability] = GroupCommitWriter(durability)
+        return _writers[durability]
+
+
+@atexit.register
+def flush_all():
+    """Flush every shared writer (runs at interpreter exit)"""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        try:
+            writer.flush()
+        except Exception as e:
+            logger.error(f"Error flushing pending writes: {e}")
@@ -0,0 +1,113 @@
+"""
+Benchmark for the medicine storage backends
+Compares the JSON and SQLite stores on the DatabaseHandler access patterns:
+single-record saves and lookups, and the full loads and streams that build
+the handler's medicine cache and export data (filters and search run on
+the handler's in-memory indexes, not in the store)
+
+Usage:
+    python benchmarks/bench_backends.py [--sizes 1000 100000 1000000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from medicine_store import create_store
+
+FORMS = ['Tablet', 'Capsule', 'Syrup', 'Injection', 'Cream', 'Drops']
+MANUFACTURERS = ['Sun Pharma', 'Cipla', 'Lupin', 'Dr. Reddy\'s', 'Mankind', 'Abbott', 'Pfizer', 'GSK']
+NAMES = ['Paracetamol', 'Ibuprofen', 'Amoxicillin', 'Cetirizine', 'Omeprazole', 'Metformin',
+         'Atorvastatin', 'Azithromycin', 'Pantoprazole', 'Losartan']
+
+
+def synthetic_medicines(count, seed=42):
+    """Generate saved-medicine records shaped like DatabaseHandler output"""
+    rng = random.Random(seed)
+    today = datetime.now()
+    records = []
+
+    for i in range(count):
+        name = rng.choice(NAMES)
+        created = today - timedelta(days=rng.randint(0, 720))
+        records.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'name': f"{name} {rng.choice([250, 500, 650])}mg",
+            'manufacturer': rng.choice(MANUFACTURERS),
+            'batch_no': f"B{i:08d}",
+            'dosage': f"{rng.choice([250, 500, 650])}mg",
+            'form': rng.choice(FORMS),
+            'expiry_date': (today + timedelta(days=rng.randint(-180, 900))).strftime('%Y-%m-%d'),
+            'instructions': 'Take after meals',
+            'created_at': created.isoformat(),
+            'updated_at': created.isoformat()
+        })
+
+    return records
+
+
+def time_call(fn, repeat):
+    """Mean wall time of fn in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def bench_backend(backend, records, repeat, rng):
+    """Time the common operations against one populated store"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = create_store(backend, tmp)
+
+        start = time.perf_counter()
+        store.replace_medicines(records)
+        load_ms = (time.perf_counter() - start) * 1e3
+
+        sample = [rng.choice(records) for _ in range(repeat)]
+        ids = iter(sample * 2)
+
+        def save_one():
+            record = dict(next(ids))
+            record['updated_at'] = datetime.now().isoformat()
+            store.upsert_medicines([record])
+
+        results = {
+            'populate_ms': round(load_ms, 1),
+            'save_ms': time_call(save_one, repeat),
+            'get_by_id_ms': time_call(lambda: store.get_medicine(rng.choice(sample)['id']), repeat),
+            'load_all_ms': time_call(store.load_medicines, repeat),
+            'iter_all_ms': time_call(lambda: sum(1 for _ in store.iter_medicines()), repeat)
+        }
+        store.close()
+
+        return {key: round(value, 3) for key, value in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--backends', nargs='+', default=['json', 'sqlite'])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        records = synthetic_medicines(size)
+        for backend in args.backends:
+            timings = bench_backend(backend, records, args.repeat, random.Random(7))
+            results.append({'backend': backend, 'records': size, **timings})
+            print(json.dumps(results[-1]), file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark for ExpiryIndex
+Compares indexed expired/expiring queries against a full scan that parses
+every expiry date
+
+Usage:
+    python benchmarks/bench_expiry.py [--records 100000] [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from bench_backends import synthetic_medicines
+from expiry_index import ExpiryIndex
+from medicine_store import parse_expiry_date
+
+
+def time_call(fn, repeat):
+    """Mean wall time of fn in microseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def linear_expiring(medicines, days_ahead):
+    """Baseline: compute days_until_expiry for every record"""
+    now = datetime.now()
+    result = []
+    for medicine in medicines:
+        expiry_dt = parse_expiry_date(medicine.get('expiry_date'))
+        if expiry_dt is not None and 0 <= (expiry_dt - now).days <= days_ahead:
+            result.append(medicine['id'])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    medicines = synthetic_medicines(args.records)
+    rng = random.Random(11)
+
+    start = time.perf_counter()
+    index = ExpiryIndex()
+    index.rebuild(medicines)
+    results = {'records': args.records, 'indexed': len(index),
+               'build_seconds': round(time.perf_counter() - start, 3), 'queries': []}
+
+    for days_ahead in (7, 30):
+        assert sorted(index.expiring(days_ahead)) == sorted(linear_expiring(medicines, days_ahead))
+        results['queries'].append({
+            'query': f'expiring_{days_ahead}d',
+            'matches': index.count_expiring(days_ahead),
+            'indexed_us': round(time_call(lambda: index.expiring(days_ahead), args.repeat), 1),
+            'count_us': round(time_call(lambda: index.count_expiring(days_ahead), args.repeat), 1),
+            'linear_scan_us': round(time_call(lambda: linear_expiring(medicines, days_ahead),
+                                              max(1, args.repeat // 50)), 1)
+        })
+
+    medicine = dict(rng.choice(medicines))
+    results['update_us'] = round(time_call(lambda: index.add(medicine['id'], medicine), args.repeat), 1)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
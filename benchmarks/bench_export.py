@@ -0,0 +1,87 @@
+"""
+Benchmark for the streaming export
+Compares peak memory and time of DatabaseHandler.export_medicines against
+building the whole CSV in memory from load_medicines(), as the export page
+used to
+
+Usage:
+    python benchmarks/bench_export.py [--records 50000] [--backend sqlite json]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from bench_backends import synthetic_medicines
+from database_handler import DatabaseHandler
+
+
+def measure(fn):
+    """(seconds, peak traced MB) of fn"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(elapsed, 3), round(peak / 1024 / 1024, 1)
+
+
+def in_memory_csv(handler):
+    """Baseline: materialize every record and the whole CSV text"""
+    medicines = handler.load_medicines()
+    columns = list(dict.fromkeys(key for medicine in medicines for key in medicine))
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    writer.writerows(medicines)
+    return buffer.getvalue().encode('utf-8')
+
+
+def streamed_csv(handler, export_format='csv'):
+    """Streaming export written to a temporary file"""
+    with tempfile.TemporaryFile() as f:
+        for chunk in handler.export_medicines(export_format):
+            f.write(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=50000)
+    parser.add_argument('--backend', nargs='+', default=['sqlite', 'json'])
+    args = parser.parse_args()
+
+    medicines = synthetic_medicines(args.records)
+    results = []
+
+    for backend in args.backend:
+        with tempfile.TemporaryDirectory() as data_dir:
+            handler = DatabaseHandler(data_dir=data_dir, storage_backend=backend, dedupe_policy='off')
+            handler.save_medicines(medicines)
+
+            in_memory = measure(lambda: in_memory_csv(handler))
+            streamed = measure(lambda: streamed_csv(handler))
+            jsonl = measure(lambda: streamed_csv(handler, 'jsonl'))
+            handler.close()
+
+        results.append({
+            'backend': backend,
+            'records': args.records,
+            'in_memory_csv': {'seconds': in_memory[0], 'peak_mb': in_memory[1]},
+            'streamed_csv': {'seconds': streamed[0], 'peak_mb': streamed[1]},
+            'streamed_jsonl': {'seconds': jsonl[0], 'peak_mb': jsonl[1]},
+        })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
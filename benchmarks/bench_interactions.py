@@ -0,0 +1,116 @@
+"""
+Benchmark for InteractionChecker
+Compares indexed cabinet checks against a linear scan of the interaction table
+
+Usage:
+    python benchmarks/bench_interactions.py [--pairs 100000] [--drugs 5000]
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from interaction_checker import InteractionChecker
+
+
+def synthetic_name(i):
+    """Letters-only drug name (digits would be stripped as strengths)"""
+    letters = []
+    while True:
+        i, r = divmod(i, 26)
+        letters.append(chr(ord('a') + r))
+        if i == 0:
+            break
+    return 'drug' + ''.join(letters)
+
+
+def build_table(path, pairs, drugs, seed=42):
+    """Write a synthetic interaction table with the given number of unique pairs"""
+    rng = random.Random(seed)
+    names = [synthetic_name(i) for i in range(drugs)]
+    seen = set()
+    rows = []
+
+    while len(rows) < pairs:
+        a, b = rng.sample(names, 2)
+        key = (a, b) if a < b else (b, a)
+        if key in seen:
+            continue
+        seen.add(key)
+        rows.append((a, b, rng.choice(['major', 'moderate', 'minor']), f"{a} interacts with {b}"))
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['drug_a', 'drug_b', 'severity', 'description'])
+        writer.writerows(rows)
+
+    return names, rows
+
+
+def linear_check(rows, medicine, cabinet):
+    """Baseline: scan the whole table for every cabinet entry"""
+    warnings = []
+    for other in cabinet:
+        for a, b, severity, description in rows:
+            if (a == medicine and b == other) or (a == other and b == medicine):
+                warnings.append((other, severity))
+                break
+    return warnings
+
+
+def time_call(fn, repeat):
+    """Mean wall time of fn in microseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pairs', type=int, default=100000)
+    parser.add_argument('--drugs', type=int, default=5000)
+    parser.add_argument('--cabinets', type=int, nargs='+', default=[5, 20, 100])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    results = {'pairs': args.pairs, 'drugs': args.drugs, 'cabinets': []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        table_path = os.path.join(tmp, 'interactions.csv')
+        names, rows = build_table(table_path, args.pairs, args.drugs)
+
+        start = time.perf_counter()
+        checker = InteractionChecker(interactions_file=table_path, catalog_file=os.path.join(tmp, 'none.csv'))
+        results['load_seconds'] = round(time.perf_counter() - start, 3)
+        results['index'] = checker.get_stats()
+
+        for k in args.cabinets:
+            cabinet_names = rng.sample(names, k)
+            cabinet = [{'id': str(i), 'name': name} for i, name in enumerate(cabinet_names)]
+            medicine = {'name': rng.choice(names)}
+
+            indexed_us = time_call(lambda: checker.check_against_cabinet(medicine, cabinet), args.repeat)
+            linear_us = time_call(lambda: linear_check(rows, medicine['name'], cabinet_names),
+                                  max(1, args.repeat // 100))
+
+            results['cabinets'].append({
+                'cabinet_size': k,
+                'indexed_us': round(indexed_us, 2),
+                'linear_scan_us': round(linear_us, 2),
+                'speedup': round(linear_us / indexed_us, 1) if indexed_us else None
+            })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark for composed medicine queries
+Compares one MedicineQuery with the separate per-filter calls it replaces
+(each a full pass or copy) for a combined form + expiry + text filter
+
+Usage:
+    python benchmarks/bench_medicine_query.py [--sizes 1000 20000] [--repeat 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from bench_backends import synthetic_medicines, time_call
+from database_handler import DatabaseHandler
+from medicine_query import MedicineQuery
+
+
+def separate_calls(handler):
+    """Combined filter the old way: one call per filter, intersected by id"""
+    by_form = handler.get_medicines_by_form('Tablet')
+    expiring = {m['id'] for m in handler.get_expiring_medicines(365)}
+    matches = {m['id'] for m in handler.search_medicines('paracetamol')}
+    result = [m for m in by_form if m['id'] in expiring and m['id'] in matches]
+    return sorted(result, key=lambda m: (m['days_until_expiry'], m['id']))[:25]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 20000])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    query = (MedicineQuery().form('Tablet').expiring_within(365).text('paracetamol')
+             .order_by('expiry').limit(25))
+    results = []
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as data_dir:
+            handler = DatabaseHandler(data_dir=data_dir, dedupe_policy='off')
+            handler.save_medicines(synthetic_medicines(size))
+
+            # Warm the cache and indexes
+            expected = [m['id'] for m in separate_calls(handler)]
+            page = handler.query_medicines(query)
+            assert [m['id'] for m in page['medicines']] == expected
+
+            results.append({
+                'medicines': size,
+                'matches': page['total'],
+                'separate_calls_ms': round(time_call(lambda: separate_calls(handler), args.repeat), 2),
+                'query_ms': round(time_call(lambda: handler.query_medicines(query), args.repeat), 2),
+                'first_page_all_ms': round(time_call(
+                    lambda: handler.query_medicines(MedicineQuery().order_by('name')), args.repeat), 2),
+                'load_all_ms': round(time_call(handler.load_medicines, args.repeat), 2),
+            })
+            handler.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark for the Medicine record type
+Compares memory and build time of cached medicine records against plain
+dicts with eagerly calculated fields, as the medicine cache used to hold
+
+Usage:
+    python benchmarks/bench_medicine_record.py [--records 100000]
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from bench_backends import synthetic_medicines
+from medicine_record import Medicine, calculated_fields
+
+
+def eager_dicts(medicines):
+    """Baseline: a dict per record with calculated fields written into it"""
+    records = [dict(medicine) for medicine in medicines]
+    for record in records:
+        record.update(calculated_fields(record.get('expiry_date'), record.get('created_at')))
+    return records
+
+
+def copy_dict(medicine):
+    """Caller copy of a cached dict, as load_medicines used to hand out"""
+    return {key: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+            for key, value in medicine.items()}
+
+
+def copy_record(medicine):
+    """Caller copy of a cached Medicine"""
+    return medicine.to_dict()
+
+
+def slotted_records(medicines):
+    """Medicine records; calculated fields wait until first read"""
+    return [Medicine.from_dict(medicine) for medicine in medicines]
+
+
+def retained_bytes(build, medicines):
+    """Traced bytes still held after building the records"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = build(medicines)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del records
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=100000)
+    args = parser.parse_args()
+
+    # Fresh copies per run, as a store load would return
+    raw = json.dumps(synthetic_medicines(args.records))
+    results = {'records': args.records}
+
+    variants = (('eager_dicts', eager_dicts, copy_dict), ('medicine_records', slotted_records, copy_record))
+    for name, build, copy_one in variants:
+        # Timed separately: tracing slows allocation several times over
+        retained = retained_bytes(build, json.loads(raw))
+        medicines = json.loads(raw)
+        start = time.perf_counter()
+        records = build(medicines)
+        build_seconds = time.perf_counter() - start
+        del medicines
+
+        start = time.perf_counter()
+        for record in records:
+            record['expiry_status']
+        first_read = time.perf_counter() - start
+
+        start = time.perf_counter()
+        copies = [copy_one(record) for record in records]
+        copy_seconds = time.perf_counter() - start
+        del copies
+
+        results[name] = {
+            'build_seconds': round(build_seconds, 3),
+            'bytes_per_record': round(retained / args.records),
+            'first_status_read_seconds': round(first_read, 3),
+            'copy_all_seconds': round(copy_seconds, 3),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
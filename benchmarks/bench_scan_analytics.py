@@ -0,0 +1,100 @@
+"""
+Benchmark for ScanColumns
+Compares vectorized scan analytics against the per-dict loops the
+analytics page used to run over get_scan_history()
+
+Usage:
+    python benchmarks/bench_scan_analytics.py [--scans 1000000] [--days 30]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from scan_analytics import ScanColumns
+
+ENGINES = ['easyocr', 'google_vision', 'tesseract', 'unknown']
+
+
+def synthetic_scans(count, seed=7):
+    """Scan history entries shaped like DatabaseHandler.save_scan_history output, oldest first"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    scans = []
+    for i in range(count):
+        scans.append({
+            'id': str(i),
+            'timestamp': (now - timedelta(seconds=rng.randint(0, 365 * 86400))).isoformat(),
+            'scan_type': rng.choice(['label', 'prescription']),
+            'success': rng.random() < 0.8,
+            'medicines_found': rng.randint(0, 3),
+            'confidence': rng.random(),
+            'ocr_engine': rng.choice(ENGINES),
+            'processing_time': rng.expovariate(1.0),
+        })
+    scans.sort(key=lambda scan: scan['timestamp'])
+    return scans
+
+
+def dict_loop(scans, since):
+    """Baseline: filter, bucket and aggregate entry by entry"""
+    since_iso = since.isoformat()
+    recent = [scan for scan in scans if scan['timestamp'] >= since_iso]
+
+    by_date = {}
+    for scan in recent:
+        by_date[scan['timestamp'][:10]] = by_date.get(scan['timestamp'][:10], 0) + 1
+    successful = len([scan for scan in recent if scan.get('success', False)])
+
+    latencies = {}
+    for scan in recent:
+        latencies.setdefault(scan['ocr_engine'], []).append(scan['processing_time'])
+    percentiles = {}
+    for engine, values in latencies.items():
+        values.sort()
+        percentiles[engine] = [values[min(len(values) - 1, int(len(values) * p / 100))] for p in (50, 90, 99)]
+
+    histogram = [0] * 10
+    for scan in recent:
+        histogram[min(9, int(scan['confidence'] * 10))] += 1
+    return by_date, successful, percentiles, histogram
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scans', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    scans = synthetic_scans(args.scans)
+    columns = ScanColumns()
+    start = time.perf_counter()
+    columns.rebuild(iter(scans))
+    results = {'scans': args.scans, 'build_seconds': round(time.perf_counter() - start, 3),
+               'column_mb': round(columns.nbytes() / 1024 / 1024, 1), 'queries': []}
+
+    for days in (args.days, 0):
+        since = datetime.now() - timedelta(days=days) if days else datetime.min
+        start = time.perf_counter()
+        summary = columns.summary(since if days else None)
+        vectorized_ms = (time.perf_counter() - start) * 1e3
+
+        start = time.perf_counter()
+        by_date, successful, _, _ = dict_loop(scans, since)
+        loop_ms = (time.perf_counter() - start) * 1e3
+
+        assert summary['daily_counts'] == by_date and summary['success']['successful'] == successful
+        results['queries'].append({'window_days': days or 'all', 'scans': summary['success']['total'],
+                                   'vectorized_ms': round(vectorized_ms, 1), 'dict_loop_ms': round(loop_ms, 1)})
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark for the write-behind scan history recorder
+Compares the latency a scan sees when its history entry is saved
+synchronously with queueing it on a ScanHistoryRecorder
+
+Usage:
+    python benchmarks/bench_scan_recorder.py [--scans 500] [--backend json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from database_handler import DatabaseHandler
+from scan_recorder import ScanHistoryRecorder
+
+
+def scan_entry(i):
+    """History entry shaped like App.process_scan's"""
+    return {
+        'scan_type': 'Medicine Label',
+        'success': i % 5 != 0,
+        'medicines_found': 1,
+        'confidence': 0.9,
+        'ocr_engine': 'easyocr',
+        'processing_time': 1.2,
+        'filename': f'scan_{i}.jpg'
+    }
+
+
+def latencies(save, scans):
+    """Per-call latency of save in milliseconds"""
+    result = []
+    for i in range(scans):
+        start = time.perf_counter()
+        save(scan_entry(i))
+        result.append((time.perf_counter() - start) * 1e3)
+    return result
+
+
+def summary(values):
+    """Mean and tail latency"""
+    values = sorted(values)
+    return {
+        'mean_ms': round(statistics.mean(values), 3),
+        'p99_ms': round(values[int(len(values) * 0.99) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scans', type=int, default=500)
+    parser.add_argument('--backend', default='json', choices=['json', 'sqlite'])
+    parser.add_argument('--durability', default='normal', choices=['full', 'normal', 'deferred'])
+    args = parser.parse_args()
+
+    results = {'scans': args.scans, 'backend': args.backend, 'durability': args.durability}
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        handler = DatabaseHandler(data_dir=data_dir, storage_backend=args.backend, durability=args.durability)
+        results['synchronous'] = summary(latencies(handler.save_scan_history, args.scans))
+        handler.close()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        handler = DatabaseHandler(data_dir=data_dir, storage_backend=args.backend, durability=args.durability)
+        recorder = ScanHistoryRecorder(handler)
+        results['write_behind'] = summary(latencies(recorder.record, args.scans))
+
+        start = time.perf_counter()
+        recorder.close()
+        results['write_behind']['final_flush_ms'] = round((time.perf_counter() - start) * 1e3, 1)
+        results['write_behind']['recorder'] = recorder.get_stats()
+        assert len(handler.get_scan_history(days=1)) == args.scans
+        handler.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
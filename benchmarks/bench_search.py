@@ -0,0 +1,74 @@
+"""
+Benchmark for SearchIndex
+Compares indexed medicine search against the linear substring scan it replaced
+
+Usage:
+    python benchmarks/bench_search.py [--records 100000] [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from bench_backends import synthetic_medicines
+from medicine_store import matches_query
+from search_index import SearchIndex
+
+
+def time_call(fn, repeat):
+    """Mean wall time of fn in microseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    medicines = synthetic_medicines(args.records)
+    rng = random.Random(7)
+
+    start = time.perf_counter()
+    index = SearchIndex()
+    index.rebuild(medicines)
+    results = {'records': args.records, 'build_seconds': round(time.perf_counter() - start, 3), 'queries': []}
+
+    batch = rng.choice(medicines)['batch_no'].lower()
+    queries = [
+        ('batch_exact', batch, 0),
+        ('batch_prefix', batch[:-2], 0),
+        ('name_prefix', 'parac', 0),
+        ('two_words', 'amoxicillin cipla', 0),
+        ('typo', 'amoxicilin', 1),
+    ]
+
+    for label, query, max_typos in queries:
+        # Warm-up builds the lazily created typo index outside the timing
+        index.search(query, limit=args.limit, max_typos=max_typos)
+        indexed_us = time_call(lambda: index.search(query, limit=args.limit, max_typos=max_typos), args.repeat)
+        linear_us = time_call(lambda: [m for m in medicines if matches_query(m, query)], max(1, args.repeat // 50))
+        results['queries'].append({
+            'query': label,
+            'matches': len(index.search(query, max_typos=max_typos)),
+            'indexed_us': round(indexed_us, 1),
+            'linear_scan_us': round(linear_us, 1)
+        })
+
+    medicine = dict(rng.choice(medicines))
+    results['update_us'] = round(time_call(lambda: index.add(medicine['id'], medicine), args.repeat), 1)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
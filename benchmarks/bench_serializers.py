@@ -0,0 +1,66 @@
+"""
+Benchmark for the data file serializers
+Times encoding, decoding and an atomic file write of a medicines file in
+every available format against the original pretty-printed JSON
+
+Usage:
+    python benchmarks/bench_serializers.py [--records 1000 10000 50000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from bench_backends import synthetic_medicines
+from serializers import SERIALIZERS
+from storage import atomic_write_bytes
+
+
+def best_ms(fn, repeat):
+    """Fastest of repeat runs of fn in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1e3, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.records:
+            medicines = synthetic_medicines(count)
+            for serializer in SERIALIZERS.values():
+                if not serializer.available:
+                    results.append({'records': count, 'serializer': serializer.name, 'available': False})
+                    continue
+
+                data = serializer.dumps(medicines)
+                assert serializer.loads(data) == medicines
+                path = os.path.join(directory, 'medicines' + serializer.extension)
+                results.append({
+                    'records': count,
+                    'serializer': serializer.name,
+                    'bytes': len(data),
+                    'encode_ms': best_ms(lambda: serializer.dumps(medicines), args.repeat),
+                    'decode_ms': best_ms(lambda: serializer.loads(data), args.repeat),
+                    'write_file_ms': best_ms(
+                        lambda: atomic_write_bytes(path, serializer.dumps(medicines), 'normal'), args.repeat),
+                })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
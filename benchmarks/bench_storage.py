@@ -0,0 +1,284 @@
+"""
+Storage benchmark and load generator for DatabaseHandler
+Builds synthetic medicine cabinets and scan histories, drives the
+handler's main operations from one or more threads, and reports
+throughput, latency percentiles and data file sizes as JSON, so storage
+changes can be compared run against run
+
+Every (backend, size, threads) run starts from a fresh copy of the same
+populated data directory. Backups and cleanup run on the main thread
+while the other threads keep a mixed save/search/statistics load going.
+
+Usage:
+    python benchmarks/bench_storage.py [--sizes 1000 10000 100000 1000000] [--threads 1 8]
+        [--backends json sqlite] [--ops 50] [--durability normal] > results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from database_handler import DatabaseHandler
+from medicine_store import create_store
+from bench_backends import FORMS, MANUFACTURERS, NAMES, synthetic_medicines
+from bench_scan_analytics import synthetic_scans
+
+
+def new_medicine(rng, worker, i):
+    """Medicine as a scan hands it to save_medicine (no id or timestamps)"""
+    name = rng.choice(NAMES)
+    return {
+        'name': f"{name} {rng.choice([250, 500, 650])}mg",
+        'manufacturer': rng.choice(MANUFACTURERS),
+        'batch_no': f"L{worker:03d}{i:07d}",
+        'dosage': f"{rng.choice([250, 500, 650])}mg",
+        'form': rng.choice(FORMS),
+        'expiry_date': f"20{rng.randint(26, 30)}-{rng.randint(1, 12):02d}-28",
+        'instructions': 'Take after meals'
+    }
+
+
+# Operations driven concurrently by every load thread:
+# name -> fn(handler, rng, worker, i)
+LOAD_OPERATIONS = {
+    'save_medicine': lambda handler, rng, worker, i: handler.save_medicine(new_medicine(rng, worker, i)),
+    'load_medicines': lambda handler, rng, worker, i: handler.load_medicines(),
+    'search_medicines': lambda handler, rng, worker, i: handler.search_medicines(rng.choice(NAMES).lower(), limit=50),
+    'get_statistics': lambda handler, rng, worker, i: handler.get_statistics(),
+    'get_expiring_medicines': lambda handler, rng, worker, i: handler.get_expiring_medicines(30),
+}
+
+# Background mix while the maintenance operations run
+BACKGROUND_MIX = ('save_medicine', 'search_medicines', 'get_statistics')
+
+# Synthetic records are kept this many days clear of the cleanup cutoff,
+# so the expected cleanup count holds however long the runs take
+CUTOFF_GAP_DAYS = 7
+
+
+def clear_cutoff(records, field, cutoff_days):
+    """
+    Move records within CUTOFF_GAP_DAYS of the cutoff to just past it
+
+    Returns:
+        Number of records older than the cutoff (what cleanup should remove)
+    """
+    now = datetime.now()
+    cutoff = now - timedelta(days=cutoff_days)
+    band_start = (cutoff + timedelta(days=CUTOFF_GAP_DAYS)).isoformat()
+    past = (cutoff - timedelta(days=CUTOFF_GAP_DAYS)).isoformat()
+
+    expired = 0
+    for record in records:
+        if past < record[field] < band_start:
+            record[field] = past
+        expired += record[field] <= past
+    return expired
+
+
+def summary(latencies, elapsed):
+    """Throughput and latency percentiles of a set of calls"""
+    values = sorted(latencies)
+    if not values:
+        return {'calls': 0}
+
+    def percentile(p):
+        return round(values[min(len(values) - 1, int(len(values) * p / 100))], 3)
+
+    return {
+        'calls': len(values),
+        'throughput_ops_s': round(len(values) / elapsed, 1) if elapsed > 0 else None,
+        'mean_ms': round(sum(values) / len(values), 3),
+        'p50_ms': percentile(50),
+        'p90_ms': percentile(90),
+        'p99_ms': percentile(99),
+        'max_ms': round(values[-1], 3)
+    }
+
+
+def run_load(handler, operation, threads, ops_per_thread, seed):
+    """Call an operation from several threads at once, recording each call's latency"""
+    barrier = threading.Barrier(threads + 1)
+    latencies = [[] for _ in range(threads)]
+
+    def worker(worker_id):
+        rng = random.Random(seed + worker_id)
+        barrier.wait()
+        for i in range(ops_per_thread):
+            start = time.perf_counter()
+            operation(handler, rng, worker_id, i)
+            latencies[worker_id].append((time.perf_counter() - start) * 1e3)
+
+    workers = [threading.Thread(target=worker, args=(worker_id,)) for worker_id in range(threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker_thread in workers:
+        worker_thread.join()
+    elapsed = time.perf_counter() - start
+
+    return summary([value for values in latencies for value in values], elapsed)
+
+
+class BackgroundLoad:
+    """Threads cycling through BACKGROUND_MIX until stopped"""
+
+    def __init__(self, handler, threads, seed):
+        self.handler = handler
+        self.stop_event = threading.Event()
+        self.latencies = [[] for _ in range(threads)]
+        self.workers = [threading.Thread(target=self._worker, args=(worker_id, seed)) for worker_id in range(threads)]
+
+    def _worker(self, worker_id, seed):
+        rng = random.Random(seed + worker_id)
+        i = 0
+        while not self.stop_event.is_set():
+            operation = LOAD_OPERATIONS[BACKGROUND_MIX[i % len(BACKGROUND_MIX)]]
+            start = time.perf_counter()
+            # Offset worker ids so saved batch numbers never repeat the foreground's
+            operation(self.handler, rng, 100 + worker_id, i)
+            self.latencies[worker_id].append((time.perf_counter() - start) * 1e3)
+            i += 1
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        for worker_thread in self.workers:
+            worker_thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        for worker_thread in self.workers:
+            worker_thread.join()
+        self.elapsed = time.perf_counter() - self.start
+
+    def summary(self):
+        return summary([value for values in self.latencies for value in values], self.elapsed)
+
+
+def timed(fn):
+    """(result, milliseconds) of one call"""
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1e3
+
+
+def file_sizes(data_dir):
+    """Bytes on disk of each top-level entry of a data directory, plus the total"""
+    sizes = {}
+    for entry in sorted(os.listdir(data_dir)):
+        path = os.path.join(data_dir, entry)
+        if os.path.isdir(path):
+            sizes[entry] = sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, names in os.walk(path) for name in names
+            )
+        else:
+            sizes[entry] = os.path.getsize(path)
+    sizes['total'] = sum(sizes.values())
+    return sizes
+
+
+def populate(data_dir, backend, medicines, scans):
+    """Write a synthetic cabinet and scan history straight into a store"""
+    store = create_store(backend, data_dir)
+    store.replace_medicines(medicines)
+    store.replace_scans(scans)
+    store.close()
+
+
+def bench_run(template_dir, backend, threads, args, expected_removed):
+    """One run against a fresh copy of the populated data directory"""
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, 'data')
+        shutil.copytree(template_dir, data_dir)
+
+        # Opening includes the first load, which builds the medicine cache
+        handler, open_ms = timed(lambda: DatabaseHandler(
+            data_dir=data_dir, storage_backend=backend, dedupe_policy=args.dedupe, durability=args.durability
+        ))
+        _, first_load_ms = timed(handler.load_medicines)
+        result['open_ms'] = round(open_ms + first_load_ms, 1)
+
+        operations = {}
+        for offset, (name, operation) in enumerate(LOAD_OPERATIONS.items()):
+            operations[name] = run_load(handler, operation, threads, args.ops, seed=1000 * offset)
+        result['operations'] = operations
+
+        maintenance = {}
+        with BackgroundLoad(handler, threads - 1, seed=99) as load:
+            backup_latencies = []
+            for _ in range(args.backups):
+                succeeded, elapsed = timed(handler.backup_data)
+                assert succeeded, "backup_data failed"
+                backup_latencies.append(elapsed)
+            maintenance['backup_data'] = summary(backup_latencies, sum(backup_latencies) / 1e3)
+            maintenance['backup_data']['bytes_written'] = sum(
+                snapshot['stats'].get('bytes_written', 0) for snapshot in handler.list_backups()
+            )
+
+            removed, elapsed = timed(lambda: handler.cleanup_old_data(args.cleanup_days))
+            # Every backend must remove exactly the synthetic records past the cutoff
+            assert removed == expected_removed, f"{backend} removed {removed} of {expected_removed} old records"
+            maintenance['cleanup_old_data'] = {'ms': round(elapsed, 3), 'records_removed': removed,
+                                               'retention': handler.get_retention_stats()}
+        if threads > 1:
+            maintenance['background_load'] = load.summary()
+        result['maintenance'] = maintenance
+
+        handler.close()
+        result['final_sizes'] = file_sizes(data_dir)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Medicines in the cabinet (up to 1000000)")
+    parser.add_argument('--scans', type=float, default=1.0, help="Scan history entries per medicine")
+    parser.add_argument('--backends', nargs='+', default=['json', 'sqlite'])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--ops', type=int, default=50, help="Calls per thread of each load operation")
+    parser.add_argument('--backups', type=int, default=3, help="Backups per run (the first is full)")
+    parser.add_argument('--cleanup-days', type=int, default=365)
+    parser.add_argument('--dedupe', default='off', choices=['merge', 'flag', 'off'])
+    parser.add_argument('--durability', default='normal', choices=['full', 'normal', 'deferred'])
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        medicines = synthetic_medicines(size)
+        scans = synthetic_scans(int(size * args.scans))
+        expected_removed = (clear_cutoff(medicines, 'created_at', args.cleanup_days)
+                            + clear_cutoff(scans, 'timestamp', args.cleanup_days))
+
+        for backend in args.backends:
+            with tempfile.TemporaryDirectory() as template_dir:
+                _, populate_ms = timed(lambda: populate(template_dir, backend, medicines, scans))
+                sizes = file_sizes(template_dir)
+
+                for threads in args.threads:
+                    result = {'backend': backend, 'records': size, 'scans': len(scans), 'threads': threads,
+                              'durability': args.durability, 'populate_ms': round(populate_ms, 1),
+                              'populated_sizes': sizes}
+                    result.update(bench_run(template_dir, backend, threads, args, expected_removed))
+                    results.append(result)
+                    print(json.dumps({key: result[key] for key in ('backend', 'records', 'threads', 'open_ms')}),
+                          file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
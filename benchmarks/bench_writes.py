@@ -0,0 +1,155 @@
+"""
+Benchmark for the persistence write path
+Compares in-place json.dump rewrites against atomic group-commit writes
+under bursty concurrent load, then measures DatabaseHandler.save_medicine
+itself: group-committed saves against one save_medicines call per medicine
+
+Usage:
+    python benchmarks/bench_writes.py [--records 500] [--threads 1 8] [--writes 200]
+        [--backends json sqlite]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from storage import GroupCommitWriter, atomic_write_json, DURABILITY_LEVELS
+from database_handler import DatabaseHandler
+
+
+def synthetic_records(count):
+    """Medicine-shaped records to serialize"""
+    return [
+        {'id': f"id-{i}", 'name': f"Medicine {i}", 'manufacturer': 'Generic Labs',
+         'expiry_date': '2027-01-31', 'form': 'Tablet', 'dosage': '500mg',
+         'instructions': 'Take after meals', 'created_at': '2026-01-01T09:00:00'}
+        for i in range(count)
+    ]
+
+
+def in_place_write(path, records, lock):
+    """Baseline: what DatabaseHandler and ReminderSystem used to do"""
+    with lock:
+        with open(path, 'w') as f:
+            json.dump(records, f, indent=2, default=str)
+
+
+def new_medicine(counter):
+    """A distinct medicine as a scan hands it to save_medicine"""
+    i = next(counter)
+    return {'name': f"Medicine {i}", 'manufacturer': 'Generic Labs', 'batch_no': f"B{i:07d}",
+            'expiry_date': '2027-01-31', 'form': 'Tablet', 'dosage': '500mg'}
+
+
+def bench_handler(backend, durability, records, threads, per_thread):
+    """
+    save_medicine throughput on a cabinet of records medicines
+
+    Returns:
+        (group-committed saves/s, single-medicine save_medicines calls/s)
+    """
+    rates = []
+    for save in ('group', 'single'):
+        with tempfile.TemporaryDirectory() as data_dir:
+            handler = DatabaseHandler(data_dir=data_dir, storage_backend=backend,
+                                      dedupe_policy='off', durability=durability)
+            handler.save_medicines(synthetic_records(records))
+            counter = itertools.count()
+
+            if save == 'group':
+                rate = run_burst(lambda: handler.save_medicine(new_medicine(counter)), threads, per_thread)
+            else:
+                rate = run_burst(lambda: handler.save_medicines([new_medicine(counter)]), threads, per_thread)
+            assert len(handler.load_medicines()) == records + threads * per_thread
+            handler.close()
+        rates.append(rate)
+    return tuple(rates)
+
+
+def run_burst(write_fn, threads, writes_per_thread):
+    """Writes per second with threads writing concurrently"""
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        for _ in range(writes_per_thread):
+            write_fn()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    elapsed = time.perf_counter() - start
+
+    return threads * writes_per_thread / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=500)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--writes', type=int, default=200, help="Total writes per run")
+    parser.add_argument('--backends', nargs='+', default=['json', 'sqlite'],
+                        help="Storage backends for the save_medicine runs")
+    args = parser.parse_args()
+
+    records = synthetic_records(args.records)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'medicines.json')
+
+        for threads in args.threads:
+            per_thread = max(1, args.writes // threads)
+
+            lock = threading.Lock()
+            results.append({
+                'mode': 'in_place', 'threads': threads,
+                'writes_per_sec': round(run_burst(lambda: in_place_write(path, records, lock), threads, per_thread), 1)
+            })
+
+            for durability in ('full', 'normal'):
+                results.append({
+                    'mode': f'atomic_{durability}', 'threads': threads,
+                    'writes_per_sec': round(run_burst(
+                        lambda: atomic_write_json(path, records, durability), threads, per_thread), 1)
+                })
+
+            for durability in DURABILITY_LEVELS:
+                writer = GroupCommitWriter(durability)
+                rate = run_burst(lambda: writer.write(path, records), threads, per_thread)
+                writer.flush()
+                stats = writer.get_stats()
+                results.append({
+                    'mode': f'group_{durability}', 'threads': threads,
+                    'writes_per_sec': round(rate, 1),
+                    'flushes': stats['flushes'],
+                    'coalesced': stats['coalesced']
+                })
+
+            with open(path) as f:
+                assert len(json.load(f)) == args.records
+
+            for backend in args.backends:
+                for durability in ('full', 'normal'):
+                    group, single = bench_handler(backend, durability, args.records, threads, per_thread)
+                    results.append({
+                        'mode': f'save_medicine_{backend}_{durability}', 'threads': threads,
+                        'writes_per_sec': round(group, 1),
+                        'one_batch_per_save_writes_per_sec': round(single, 1)
+                    })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Multi-process stress test for the shared data directory
+Several processes save medicines, scans and reminders into one data
+directory while reading it back, then the parent checks that no write
+was lost
+
+Usage:
+    python benchmarks/stress_multiprocess.py [--processes 8] [--saves 50] [--backend json sqlite]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from database_handler import DatabaseHandler
+from reminder_system import ReminderSystem
+
+
+def worker(data_dir, backend, worker_id, saves, results):
+    """Interleave writes and reads against the shared data directory"""
+    handler = DatabaseHandler(data_dir=data_dir, storage_backend=backend, dedupe_policy='off')
+    reminders = ReminderSystem(data_dir=data_dir)
+    failures = 0
+    reads = 0
+
+    for i in range(saves):
+        name = f"Worker{worker_id}Medicine{i}"
+        medicine = {'name': name, 'batch_no': f"W{worker_id}B{i}", 'manufacturer': 'Stress Labs',
+                    'expiry_date': '2030-01-31'}
+        if not handler.save_medicine(medicine):
+            failures += 1
+        if not handler.save_scan_history({'scan_type': 'stress', 'success': True}):
+            failures += 1
+        if i % 5 == 0 and not reminders.create_reminder(
+                {'medicine_name': name, 'dosage': '1 tablet', 'frequency': 'daily', 'times': ['09:00']}):
+            failures += 1
+
+        # Reads between writes: our own write must be visible at once
+        if not handler.search_medicines(name.lower()):
+            failures += 1
+        handler.get_statistics()
+        reminders.get_active_reminders()
+        reads += 3
+
+    handler.close()
+    results.put({'worker': worker_id, 'failures': failures, 'reads': reads,
+                 'lock': handler._file_lock.get_stats()})
+
+
+def run(backend, processes, saves):
+    """Run one stress round and verify the final state"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        # Create the files once so workers only race on data, not setup
+        DatabaseHandler(data_dir=data_dir, storage_backend=backend).close()
+
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=worker, args=(data_dir, backend, worker_id, saves, results))
+            for worker_id in range(processes)
+        ]
+
+        start = time.perf_counter()
+        for process in workers:
+            process.start()
+        reports = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        handler = DatabaseHandler(data_dir=data_dir, storage_backend=backend)
+        stats = handler.get_statistics()
+        expected = processes * saves
+        reminders = len(ReminderSystem(data_dir=data_dir).get_all_reminders())
+        expected_reminders = processes * len(range(0, saves, 5))
+
+        return {
+            'backend': backend,
+            'processes': processes,
+            'seconds': round(elapsed, 2),
+            'writes_per_sec': round((2 * expected + expected_reminders) / elapsed, 1),
+            'medicines': f"{stats['total_medicines']}/{expected}",
+            'scans': f"{len(handler.get_scan_history(days=0))}/{expected}",
+            'reminders': f"{reminders}/{expected_reminders}",
+            'failed_operations': sum(report['failures'] for report in reports),
+            'contended_lock_acquisitions': sum(report['lock']['contended'] for report in reports),
+            'statistics_verified': handler.verify_statistics(),
+            'ok': (stats['total_medicines'] == expected
+                   and len(handler.get_scan_history(days=0)) == expected
+                   and reminders == expected_reminders
+                   and not any(report['failures'] for report in reports))
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--saves', type=int, default=50, help="Medicines saved per process")
+    parser.add_argument('--backend', nargs='+', default=['json', 'sqlite'])
+    args = parser.parse_args()
+
+    results = [run(backend, args.processes, args.saves) for backend in args.backend]
+    print(json.dumps(results, indent=2))
+    if not all(result['ok'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()